@@ -0,0 +1,177 @@
+"""
+Benchmarks of the steam net model.
+
+Records wall time and peak memory (tracemalloc, in a separate untimed run) of the
+phases of the model for one scenario per topology (plain, cond_inj, trap)::
+
+    python benchmarks/bench_steam_net.py --output bench.json
+    python benchmarks/bench_steam_net.py --compare bench.json --threshold 0.2
+
+With `--compare`, phases that got slower than the threshold compared to the
+baseline file are reported and the script exits with 1.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+from utilitylca.models.steam_net import steam_network_model as snwm
+from utilitylca.models.steam_net.steam_distribution_conventional import steam_net
+
+SCENARIOS = {
+    'plain': {'params': {'needed_temperature': 180}, 'desuperheat_steam': False},
+    'cond_inj': {'params': {'needed_temperature': 150}, 'desuperheat_steam': True},
+    'trap': {'params': {'needed_temperature': 220, 'Tamb': 0, 'wind_velocity': 10,
+                        'insulation_thickness': 0.01, 'pipe_length': 5000},
+             'desuperheat_steam': False},
+}
+
+
+def _new_model(scenario, use_templates=True):
+    model = steam_net('steam net', **scenario['params'])
+    model.init_model()
+    model.desuperheat_steam = scenario['desuperheat_steam']
+    model.use_templates = use_templates
+    return model
+
+
+def _measure(func, repeat):
+    """
+    Time `repeat` calls of func and measure the peak memory in one more call. Tracing the
+    allocations slows the calls down, so it is not done in the timed calls.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'time_min': min(times), 'time_median': statistics.median(times), 'peak_memory': peak}
+
+
+def bench_scenario(scenario, repeat=3, flow_evaluations=1000, plot=True):
+    """
+    Benchmark all phases for one scenario.
+    """
+    result = {}
+
+    def calc_mains():
+        model = _new_model(scenario)
+        model._calc_mains()
+    result['_calc_mains'] = _measure(calc_mains, repeat)
+
+    def create():
+        model = _new_model(scenario, use_templates=False)
+        model._validate_params()
+        model._calc_mains()
+        snwm.create_steam_net(model)
+    result['create_steam_net'] = _measure(create, repeat)
+
+    def calculate():
+        model = _new_model(scenario)
+        model.calculate_model()
+    result['calculate_model'] = _measure(calculate, repeat)
+
+    model = _new_model(scenario)
+    model.calculate_model()
+    temperatures = iter([scenario['params']['needed_temperature'] - 1 - i for i in range(repeat + 1)])
+
+    def recalculate():
+        model.params['needed_temperature'] = next(temperatures)
+        model.recalculate_model()
+    result['recalculate_model'] = _measure(recalculate, repeat)
+
+    def flows():
+        model.define_flows()
+        for _ in range(flow_evaluations):
+            for flow in [*model._technosphere.values(), *model._biosphere.values()]:
+                flow.amount()
+    result['define_flows'] = _measure(flows, repeat)
+
+    if plot:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        def plot_ts():
+            plt.close(model.plot_Ts())
+        result['plot_Ts'] = _measure(plot_ts, repeat)
+
+    result['topology'] = snwm.current_topology(model)
+    return result
+
+
+def _versions():
+    from importlib.metadata import PackageNotFoundError, version
+
+    versions = {}
+    for dist in ['tespy', 'CoolProp', 'utilityLCA', 'simodin', 'fluprodia']:
+        try:
+            versions[dist] = version(dist)
+        except PackageNotFoundError:
+            versions[dist] = 'unknown'
+    return versions
+
+
+def compare(results, baseline, threshold):
+    """
+    Return the phases whose median time increased by more than threshold compared to the baseline.
+    """
+    regressions = []
+    for name, phases in results['scenarios'].items():
+        for phase, values in phases.items():
+            old = baseline['scenarios'].get(name, {}).get(phase)
+            if not isinstance(values, dict) or not old:
+                continue
+            ratio = values['time_median'] / old['time_median']
+            if ratio > 1 + threshold:
+                regressions.append((name, phase, ratio))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Benchmark the steam net model.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help='Scenario to run, can be given several times. Default: all.')
+    parser.add_argument('--no-plot', action='store_true', help='Skip plot_Ts.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--compare', help='Baseline JSON file of an earlier run.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed relative increase of the median time. Default: 0.2')
+    args = parser.parse_args(args)
+
+    results = {'versions': _versions(), 'scenarios': {}}
+    for name in args.scenario or list(SCENARIOS):
+        results['scenarios'][name] = bench_scenario(SCENARIOS[name], args.repeat, plot=not args.no_plot)
+        for phase, values in results['scenarios'][name].items():
+            if isinstance(values, dict):
+                print(f"{name:10s} {phase:20s} {values['time_median'] * 1e3:10.2f} ms "
+                      f"{values['peak_memory'] / 1e6:8.2f} MB")
+            else:
+                print(f"{name:10s} {phase:20s} {values}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, phase, ratio in regressions:
+            print(f'Regression: {name} {phase} is {ratio:.2f} times slower than the baseline.')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,25 @@
+import importlib
 import sys
-from simodin import interface
-from .models.steam_net import steam_distribution_conventional, steam_network_model
+
+# Submodules are imported on first access, so that `import utilitylca` does not load
+# TESPy, CoolProp or simodin:
+from .models.steam_net import _modules as _steam_net_modules
+
+
+def __getattr__(name):
+    if name in _steam_net_modules:
+        module = importlib.import_module(f'.models.steam_net.{name}', __name__)
+    elif name == 'interface':
+        module = importlib.import_module('simodin.interface')
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = module
+    return module
+
+
+def __dir__():
+    return sorted(list(globals()) + _steam_net_modules + ['interface'])
+
 if sys.version_info[:2] >= (3, 8):
     # TODO: Import directly (no need for conditional) when `python_requires = >= 3.8`
     from importlib.metadata import PackageNotFoundError, version  # pragma: no cover
@@ -1 +1,16 @@
-from .steam_net import steam_distribution_conventional, steam_network_model
+import importlib
+
+# Submodules are imported on first access, see utilitylca/__init__.py:
+_modules = ['steam_distribution_conventional', 'steam_network_model', 'steam_distribution_multi_consumer',
+            'batch', 'properties', 'surrogate', 'results', 'cache', 'stats', 'impact_curve', 'uncertainty',
+            'sensitivity', 'timeseries', 'analytical', 'columnar', 'bw_export', 'background', 'ts_diagram']
+
+
+def __getattr__(name):
+    if name not in _modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return importlib.import_module(f'.{name}', __name__)
+
+
+def __dir__():
+    return sorted(list(globals()) + _modules)
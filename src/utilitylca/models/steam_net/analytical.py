@@ -0,0 +1,325 @@
+"""
+Reduced-order analytical model of the steam net for fast screening.
+
+The plain topology of :mod:`steam_network_model` is calculated by closed-form mass
+and energy balances with IF97 properties, without tespy:
+
+- boiler outlet on the isentrope through saturated steam at the lowest main at max pressure,
+- back pressure turbine with eta_s = 0.85 to the main pressure and generator with eta = 0.9,
+- steam pipe and condensate pipe with pr = 0.95, the diameter from the Darcy-Weisbach
+  equation (Swamee-Jain friction factor) and the heat loss of an insulated pipe,
+- leakage, make-up water and blowdown as in the network, feed pump with eta_s = 0.95.
+
+All parameters can be numpy arrays, so many scenarios are calculated in one call.
+The condensate injection and the condensate trap are not considered. The deviations
+from the full model are reported by :func:`accuracy_report`.
+"""
+
+from functools import lru_cache
+import logging
+
+import numpy as np
+from CoolProp.CoolProp import PropsSI
+
+from . import results
+from .properties import BACKEND
+
+logger = logging.getLogger(__name__)
+
+# pipe settings of steam_network_model._build_network:
+PIPE_PR = 0.95
+PIPE_KS = 4.57e-5
+PIPE_THICKNESS = 0.004
+INSULATION_TC = 0.035
+ETA_TURBINE = 0.85
+ETA_PUMP = 0.95
+ETA_GENERATOR = 0.9
+# heat transfer coefficients at the outside of the insulation in W/m²K:
+WATER_HTC = 500
+
+
+def _props(output, name1, value1, name2, value2):
+    value1, value2 = np.broadcast_arrays(np.asarray(value1, dtype=float), np.asarray(value2, dtype=float))
+    # CoolProp fails if all states are invalid, scenarios without a main (NaN) are left NaN:
+    valid = np.isfinite(value1) & np.isfinite(value2)
+    result = np.full(value1.shape, np.nan)
+    if valid.any():
+        result[valid] = PropsSI(output, name1, value1[valid], name2, value2[valid], BACKEND)
+    return result
+
+
+def saturation(p):
+    """
+    Properties of saturated liquid (_f) and vapour (_g) at pressure p in Pa.
+    """
+    return {
+        'T': _props('T', 'P', p, 'Q', 0),
+        'h_f': _props('H', 'P', p, 'Q', 0),
+        'h_g': _props('H', 'P', p, 'Q', 1),
+        's_f': _props('S', 'P', p, 'Q', 0),
+        's_g': _props('S', 'P', p, 'Q', 1),
+        'cp_f': _props('C', 'P', p, 'Q', 0),
+        'cp_g': _props('C', 'P', p, 'Q', 1),
+        'rho_f': _props('D', 'P', p, 'Q', 0),
+        'mu_f': _props('V', 'P', p, 'Q', 0),
+    }
+
+
+@lru_cache(maxsize=1)
+def _saturation_table(T_min=273.16, T_max=640, n=4000):
+    T = np.linspace(T_min, T_max, n)
+    p = _props('P', 'T', T, 'Q', 0)
+    return T, {'P': p, **saturation(p), 'T': T}
+
+
+def saturation_at_temperature(T):
+    """
+    Properties of :func:`saturation` and the pressure 'P' at temperature T in K,
+    interpolated linearly in a table of the saturation line.
+    """
+    grid, table = _saturation_table()
+    x = (np.asarray(T, dtype=float) - grid[0]) / (grid[1] - grid[0])
+    i = np.clip(x.astype(int), 0, len(grid) - 2)
+    w = x - i
+    return {key: values[i] * (1 - w) + values[i + 1] * w for key, values in table.items()}
+
+
+def liquid_enthalpy(p, T):
+    """
+    Enthalpy in J/kg of liquid water at pressure p in Pa and temperature T in K.
+    """
+    sat = saturation_at_temperature(T)
+    return sat['h_f'] + (p - sat['P']) / sat['rho_f']
+
+
+def temperature_entropy(h, sat):
+    """
+    Temperature in K and entropy in J/kgK at enthalpy h close to the saturation line of `sat`:
+    exact for wet steam, with the heat capacity at saturation for liquid and superheated steam.
+    """
+    liquid = h < sat['h_f']
+    vapour = h > sat['h_g']
+    T = np.where(liquid, sat['T'] - (sat['h_f'] - h) / sat['cp_f'],
+                 np.where(vapour, sat['T'] + (h - sat['h_g']) / sat['cp_g'], sat['T']))
+    s = np.where(liquid, sat['s_f'] - sat['cp_f'] * np.log(sat['T'] / T),
+                 np.where(vapour, sat['s_g'] + sat['cp_g'] * np.log(T / sat['T']),
+                          sat['s_f'] + (h - sat['h_f']) / sat['T']))
+    return T, s
+
+
+def pipe_diameter(m, rho, mu, dp, L, ks=PIPE_KS, iterations=4):
+    """
+    Inner diameter in m of a pipe with the pressure drop dp in Pa at mass flow m in kg/s (Darcy-Weisbach).
+    """
+    f = 0.02
+    for _ in range(iterations):
+        D = (8 * f * L * m ** 2 / (rho * np.pi ** 2 * dp)) ** 0.2
+        Re = 4 * m / (np.pi * D * mu)
+        f = 0.25 / np.log10(ks / (3.7 * D) + 5.74 / Re ** 0.9) ** 2
+    return D
+
+
+def pipe_heat_loss(T_fluid, Tamb, D, L, insulation_thickness, wind_velocity, environment_media='air'):
+    """
+    Heat loss in W of an insulated pipe by the thermal resistances of the insulation and
+    the outer convection (forced convection in air, 5.7 + 3.8 v in W/m²K, or water).
+    Temperatures in K or °C, both the same.
+    """
+    r_pipe = D / 2 + PIPE_THICKNESS
+    r_insulation = r_pipe + insulation_thickness
+    htc = WATER_HTC if environment_media == 'water' else 5.7 + 3.8 * np.asarray(wind_velocity, dtype=float)
+    resistance = (np.log(r_insulation / r_pipe) / (2 * np.pi * INSULATION_TC)
+                  + 1 / (2 * np.pi * r_insulation * htc))
+    return (T_fluid - Tamb) * L / resistance
+
+
+def network_states(iterations=4, **params):
+    """
+    Connection states of the plain topology in the form of :func:`results.network_states`.
+    The numeric parameters are broadcast against each other.
+    """
+    numeric = {key: np.asarray(value, dtype=float) for key, value in params.items()
+               if key not in ('mains', 'environment_media')}
+    shape = np.broadcast_shapes(*(value.shape for value in numeric.values()))
+    v = {key: np.broadcast_to(value, shape) for key, value in numeric.items()}
+    mains = np.array(sorted(params['mains']), dtype=float) * 1E5
+    Tamb = v['Tamb'] + 273.15
+    heat = v['heat']
+    heat_nw = v['heat_capacity_pipe_network'] - heat
+
+    def heat_loss(T, D):
+        return pipe_heat_loss(T, Tamb, D, v['pipe_length'], v['insulation_thickness'],
+                              v['wind_velocity'], params['environment_media'])
+
+    # needed pressure and main as in steam_net._calc_pressure and _calc_mains:
+    sat_needed = saturation_at_temperature(v['needed_temperature'] + 273)
+    p_needed = sat_needed['P']
+    index = np.searchsorted(mains, p_needed * 1.01, side='left')
+    main = np.where(index < len(mains), mains[np.minimum(index, len(mains) - 1)], np.nan)
+    p_max = v['max_pressure'] * 1E5
+    p_cond = PIPE_PR * main
+
+    # states that only depend on main and max pressure are calculated once per distinct plant:
+    max_pressures, max_index = np.unique(p_max, return_inverse=True)
+    plants, plant = np.unique(index.ravel() * len(max_pressures) + max_index.ravel(), return_inverse=True)
+    plant = plant.reshape(shape)
+    plant_main = np.append(mains, np.nan)[plants // len(max_pressures)]
+    plant_max = max_pressures[plants % len(max_pressures)]
+
+    # boiler outlet and turbine:
+    s_sat = PropsSI('S', 'P', mains[0], 'Q', 1, BACKEND)
+    h_boil = _props('H', 'P', plant_max, 'S', s_sat)
+    s_boil = _props('S', 'P', plant_max, 'H', h_boil)
+    h_turb = h_boil - ETA_TURBINE * (h_boil - _props('H', 'P', plant_main, 'S', s_boil))
+    with np.errstate(invalid='ignore'):
+        plant_states = {
+            'h_boil': h_boil,
+            's_boil': s_boil,
+            'h_turb': h_turb,
+            's_turb': _props('S', 'P', plant_main, 'H', h_turb),
+            'T_turb': _props('T', 'P', plant_main, 'H', h_turb),
+            'rho_turb': _props('D', 'P', plant_main, 'H', h_turb),
+            'mu_turb': _props('V', 'P', plant_main, 'H', h_turb),
+        }
+        sat_main = {key: value[plant] for key, value in saturation(plant_main).items()}
+        sat_pipe = {key: value[plant] for key, value in saturation(PIPE_PR * plant_main).items()}
+    h_boil, s_boil, h_turb, s_turb, T_turb, rho_turb, mu_turb = (value[plant] for value in plant_states.values())
+
+    # steam pipe, the mass flow depends on the heat loss of the pipe:
+    h_pipe = h_turb
+    for _ in range(iterations):
+        m_hs = heat / (h_pipe - sat_needed['h_f'])
+        m_nw = heat_nw / (h_pipe - sat_pipe['h_f'])
+        m = (m_hs + m_nw) / (1 - v['leakage_factor'])
+        Q_steam = heat_loss(T_turb, pipe_diameter(m, rho_turb, mu_turb, (1 - PIPE_PR) * main, v['pipe_length']))
+        h_pipe = h_turb - Q_steam / m
+    m_leak = v['leakage_factor'] * m
+
+    # condensate return: condensate pump of the heat sink and relaxation of the network condensate:
+    h_pump = sat_needed['h_f'] + (main - p_needed) / sat_needed['rho_f'] / ETA_PUMP
+    m_cond = m_hs + m_nw
+    h_cond = (m_hs * h_pump + m_nw * sat_pipe['h_f']) / m_cond
+    T_cond_in, _ = temperature_entropy(h_cond, sat_main)
+    D_cond = pipe_diameter(m_cond, sat_main['rho_f'], sat_main['mu_f'], (1 - PIPE_PR) * main, v['pipe_length'])
+    Q_cond = heat_loss(T_cond_in, D_cond)
+    h_cond_out = h_cond - Q_cond / m_cond
+    T_cond, _ = temperature_entropy(h_cond_out, sat_pipe)
+
+    # make-up water (20 K below the condensate), leak make-up at ambient temperature and blowdown:
+    m_makeup = v['makeup_factor'] * m
+    h_makeup = liquid_enthalpy(p_cond, T_cond - 20)
+    h_leak_makeup = liquid_enthalpy(p_cond, Tamb)
+    h_feed = ((m_cond - m_makeup) * h_cond_out + m_makeup * h_makeup + m_leak * h_leak_makeup) / m
+    h_feed_out = h_feed + (p_max - p_cond) / sat_pipe['rho_f'] / ETA_PUMP
+
+    E_turb = m * (h_boil - h_turb)
+    return {
+        'c_leak.m': m_leak,
+        'c_leak.h': h_pipe,
+        'muw.m': m_makeup,
+        'muw2.h': h_leak_makeup,
+        'c1_5.m': m,
+        'c1_5.h': h_turb,
+        'c1_5.s': s_turb,
+        'c1_6.h': h_boil,
+        'c1_6.s': s_boil,
+        'hs_in.m': m_hs,
+        'hs_in.h': h_pipe,
+        'hs_in.s': temperature_entropy(h_pipe, sat_needed)[1],
+        'hs_out.h': sat_needed['h_f'],
+        'hs_out.s': sat_needed['s_f'],
+        'cnw1.m': m_nw,
+        'cnw1.h': h_pipe,
+        'cnw1.s': temperature_entropy(h_pipe, sat_pipe)[1],
+        'cnw2.h': sat_pipe['h_f'],
+        'cnw2.s': sat_pipe['s_f'],
+        'e_boil.E': m * (h_boil - h_feed_out),
+        'e_pump.E': m * (h_feed_out - h_feed),
+        'e_turb.E': E_turb,
+        'e_turb_grid.E': ETA_GENERATOR * E_turb,
+        'e_heat_sink.E': heat,
+        'e_nw_heat_sink.E': heat_nw,
+        'e_pi_sink.E': Q_steam + Q_cond,
+        'Q_hex': -heat,
+        'Q_nw': -heat_nw,
+    }
+
+
+def _defaults():
+    from .steam_distribution_conventional import steam_net
+
+    return {name: parameter.default for name, parameter in steam_net.parameters.items()}
+
+
+def calculate(**params):
+    """
+    Calculate the result records of the reduced-order model.
+
+    Parameters
+    ----------
+    **params
+        Parameters of :class:`steam_net`, numeric parameters can be arrays.
+        Missing parameters use the defaults of `steam_net.parameters`.
+
+    Returns
+    -------
+    numpy.ndarray
+        Structured array with dtype `results.RESULT_DTYPE`, one record per scenario.
+        Scenarios without a suitable main are NaN.
+    """
+    params = {**_defaults(), **params}
+    states = network_states(**params)
+    shape = np.shape(states['c1_5.m'])
+    flat = {key: np.ravel(np.broadcast_to(value, shape)) for key, value in states.items()}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        records = results.postprocess(flat, np.ravel(np.broadcast_to(params['Tamb'], shape)))
+    return records.reshape(shape)
+
+
+def flows(records):
+    """
+    Amounts of all flows of `define_flows` and the allocation factors as arrays,
+    in the columns of :func:`batch.run_batch`.
+    """
+    table = {name: factor * records[field] for name, (field, factor, _) in results.FLOW_SCHEMA.items()}
+    total = records['Q_nw'] + records['Q_hex']
+    table['distributed steam allocationfactor'] = records['Q_hex'] / total
+    table['network steam allocationfactor'] = records['Q_nw'] / total
+    return table
+
+
+def accuracy_report(scenarios, processes=None, fields=None):
+    """
+    Compare the reduced-order model with the full model.
+
+    Parameters
+    ----------
+    scenarios : list
+        List of parameter dicts, e.g. created by :func:`batch.parameter_grid`.
+    processes : int, optional
+        Number of worker processes of :func:`batch.run_batch`.
+    fields : list, optional
+        Result fields and flows to compare. Defaults to `batch.RESULT_FIELDS` and all flows.
+
+    Returns
+    -------
+    dict
+        Per field the mean and maximum relative deviation over the converged scenarios
+        and the relative deviations of all scenarios.
+    """
+    from . import batch
+
+    fields = list(fields or batch.RESULT_FIELDS + list(results.FLOW_SCHEMA))
+    table = batch.run_batch(scenarios, processes=processes)
+    records = np.concatenate([calculate(**params).reshape(1) for params in scenarios])
+    fast = {**{name: records[name] for name in records.dtype.names}, **flows(records)}
+    mask = table['converged']
+    report = {}
+    for field in fields:
+        deviation = np.abs(fast[field] / table[field] - 1)
+        report[field] = {
+            'mean': float(np.nanmean(deviation[mask])) if mask.any() else np.nan,
+            'max': float(np.nanmax(deviation[mask])) if mask.any() else np.nan,
+            'deviation': deviation,
+        }
+    return report
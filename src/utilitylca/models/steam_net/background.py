@@ -0,0 +1,96 @@
+"""
+Background impact per unit of the linked datasets for the LCIA of many scenarios.
+
+The background LCA of :meth:`modelInterface.calculate_background_impact` only depends
+on the linked datasets and the methods, not on the parameters of the model. It is
+calculated once and stored as a matrix of the scores per unit of each flow (in the
+units of `batch.FLOW_UNITS`) and method. The impacts of all scenarios of a results
+table are then one matrix product of the flow amounts with this matrix.
+"""
+
+import logging
+
+import bw2data as bd
+import numpy as np
+
+from .bw_export import linked_flows
+
+logger = logging.getLogger(__name__)
+
+
+def _characterization_factors(method):
+    factors = {}
+    for flow in bd.Method(method).load():
+        factors[flow[0]] = flow[1]
+    return factors
+
+
+def unit_scores(interface):
+    """
+    Background scores per unit of the linked flows for all methods of the interface.
+
+    The scores of the technosphere flows are taken from the MultiLCA of the interface,
+    which is calculated if necessary. Biosphere flows are characterized directly.
+
+    Parameters
+    ----------
+    interface : simodin.interface.modelInterface
+        Interface of a model with `define_flows` called, the datasets linked and `methods` set.
+
+    Returns
+    -------
+    dict
+        `flows` and `methods` of the rows and columns of the score `matrix`, the `functional`
+        flows and the `reference` flow of the model.
+    """
+    if interface.lca is None:
+        interface.calculate_background_impact()
+    methods = [tuple(method) for method in interface.methods]
+    flows = linked_flows(interface)
+    matrix = np.zeros((len(flows), len(methods)))
+    for j, method in enumerate(methods):
+        factors = None
+        for i, (name, kind, key, factor) in enumerate(flows):
+            if kind == 'technosphere':
+                matrix[i, j] = interface.lca.scores[(method, name)] * factor
+            else:
+                factors = factors if factors is not None else _characterization_factors(method)
+                matrix[i, j] = factors.get(bd.get_id(key), factors.get(key, 0)) * factor
+    functional = [name for name, ex in interface.model._technosphere.items() if ex.functional]
+    reference = [name for name, ex in interface.model._technosphere.items() if ex.reference]
+    logger.info(f'Background scores of {len(flows)} flows for {len(methods)} methods.')
+    return {'flows': [name for name, *_ in flows], 'methods': methods, 'matrix': matrix,
+            'functional': functional, 'reference': reference[0]}
+
+
+def scenario_impacts(table, scores):
+    """
+    Impacts of all scenarios of a results table.
+
+    Parameters
+    ----------
+    table : dict
+        Results table with the flow amounts and allocation factors, e.g. of :func:`batch.run_batch`,
+        :func:`columnar.load_table` or :func:`analytical.flows`.
+    scores : dict
+        Background scores of :func:`unit_scores`.
+
+    Returns
+    -------
+    dict
+        `impact` per method (array of the total impact per scenario), `allocated` per method
+        and functional flow (array of the allocated impact per unit of the reference flow, as
+        `modelInterface.impact_allocated`) and the `contributions` per method and flow.
+    """
+    amounts = np.column_stack([np.asarray(table[name], dtype=float) for name in scores['flows']])
+    total = amounts @ scores['matrix']
+    reference = np.asarray(table[scores['reference']], dtype=float)
+    result = {'impact': {}, 'allocated': {}, 'contributions': {}}
+    for j, method in enumerate(scores['methods']):
+        result['impact'][method] = total[:, j]
+        result['contributions'][method] = {name: amounts[:, i] * scores['matrix'][i, j]
+                                           for i, name in enumerate(scores['flows'])}
+        result['allocated'][method] = {
+            name: total[:, j] * np.asarray(table[f'{name} allocationfactor'], dtype=float) / reference
+            for name in scores['functional']}
+    return result
@@ -0,0 +1,296 @@
+"""
+Batch calculation of the steam net model.
+
+Runs many parameter sets of :class:`steam_net` across a process pool and
+collects the results in one table (a dictionary of numpy columns).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+import itertools
+import logging
+import os
+
+import numpy as np
+
+from . import properties as props
+from . import results
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = ['elec_factor', 'boiler_factor', 'losses', 'diss_losses', 'leak_losses',
+                 'watertreatment_factor', 'alloc_ex']
+
+# Unit in which the amount of each flow of define_flows is written to the table:
+FLOW_UNITS = {name: unit for name, (_, _, unit) in results.FLOW_SCHEMA.items()}
+
+# amounts of all flows and the allocation factors, the default outputs of surrogate and uncertainty:
+DEFAULT_OUTPUTS = list(FLOW_UNITS) + ['distributed steam allocationfactor', 'network steam allocationfactor']
+
+# result columns of every table, NaN (or False) for failed scenarios, see scenario_results:
+RESULT_COLUMNS = RESULT_FIELDS + ['cond_inj', 'trap'] + DEFAULT_OUTPUTS
+
+
+def parameter_grid(**values):
+    """
+    Create the full factorial grid of parameter sets.
+
+    Parameters
+    ----------
+    **values
+        Parameter names with a list of values each. Scalars are kept constant.
+        Since `mains` is already a list, several mains configurations have to
+        be passed as list of lists.
+
+    Returns
+    -------
+    list
+        List of parameter dicts.
+    """
+    axes = {}
+    for key, val in values.items():
+        if key == 'mains':
+            axes[key] = val if val and isinstance(val[0], (list, tuple)) else [val]
+        elif isinstance(val, (list, tuple, np.ndarray)):
+            axes[key] = list(val)
+        else:
+            axes[key] = [val]
+    return [dict(zip(axes.keys(), combination)) for combination in itertools.product(*axes.values())]
+
+
+def scenario_results(model):
+    """
+    Collect the results, flow amounts and allocation factors of a calculated model in a flat dict.
+    """
+    record = model.record
+    row = {key: float(record[key]) for key in RESULT_FIELDS}
+    row['cond_inj'] = model.cond_inj
+    row['trap'] = model.trap
+    for name in results.FLOW_SCHEMA:
+        row[name] = results.flow_amount(record, name)
+    for name, factor in results.allocation_factors(record).items():
+        row[f'{name} allocationfactor'] = factor
+    return row
+
+
+def solve_scenario(params, warm_start=None, cache_path=None):
+    """
+    Solve one parameter set in this process.
+
+    Parameters
+    ----------
+    params : dict
+        Parameters of the scenario.
+    warm_start : dict, optional
+        Network state to start from, see `steam_network_model.network_state`. Warm started
+        solves are aborted after `steam_network_model.PROBE_ITER` iterations if they diverge.
+    cache_path : str, optional
+        Path of a :class:`cache.result_cache` database.
+
+    Returns
+    -------
+    tuple
+        Row of the results table (see :func:`scenario_results`, with the `converged` flag
+        and the solver statistics) and the converged network state, None if it failed.
+    """
+    from .steam_distribution_conventional import steam_net
+    from . import steam_network_model as snwm
+    from .cache import result_cache
+
+    row = {'converged': False}
+    state = None
+    model = None
+    try:
+        model = steam_net('steam net', **params)
+        model.init_model()
+        model.warm_start = warm_start
+        if warm_start is not None:
+            model.probe_iter = snwm.PROBE_ITER
+        if cache_path is not None:
+            model.result_cache = result_cache(cache_path)
+        model.calculate_model()
+        row.update(scenario_results(model))
+    except Exception as e:
+        logger.info(f'Scenario {params} failed: {e}')
+    else:
+        row['converged'] = True
+        state = model.converged_state
+    finally:
+        if model is not None:
+            row.update(model.stats.summary())
+    return row, state
+
+
+def _solve_chunk(chunk, cache_path=None):
+    """
+    Solve a list of (vector, params) in sequence. Each scenario starts from the 
+    converged state of the nearest scenario already solved in this chunk.
+    """
+    rows = []
+    vectors = []
+    states = []
+    for vector, params in chunk:
+        warm_start = None
+        if states:
+            distance = np.linalg.norm(np.array(vectors) - vector, axis=1)
+            warm_start = states[int(np.argmin(distance))]
+        row, state = solve_scenario(params, warm_start, cache_path)
+        if state is not None:
+            vectors.append(vector)
+            states.append(state)
+        rows.append(row)
+    return rows
+
+
+def _executor(workers, property_table=None):
+    # the property table is process global, it is activated in each worker:
+    return ProcessPoolExecutor(max_workers=workers, initializer=props.use_table, initargs=(property_table,))
+
+
+@contextmanager
+def _local_table(property_table):
+    """
+    Activate the property table in this process for the scenarios solved without workers.
+    """
+    if property_table is None:
+        yield
+        return
+    previous = props._table
+    props.use_table(property_table)
+    try:
+        yield
+    finally:
+        props.use_table(previous)
+
+
+def _scenario_vectors(scenarios):
+    """
+    Numeric parameters of the scenarios, normalized to the range of the batch.
+    """
+    keys = [key for key in dict.fromkeys(key for params in scenarios for key in params)
+            if all(isinstance(params.get(key), (int, float)) and not isinstance(params.get(key), bool)
+                   for params in scenarios)]
+    if not keys:
+        return np.zeros((len(scenarios), 0))
+    values = np.array([[params[key] for key in keys] for params in scenarios], dtype=float)
+    span = values.max(axis=0) - values.min(axis=0)
+    span[span == 0] = 1
+    return (values - values.min(axis=0)) / span
+
+
+def _to_table(scenarios, rows):
+    table = {}
+    param_keys = list(dict.fromkeys(key for params in scenarios for key in params))
+    for key in param_keys:
+        values = [params.get(key) for params in scenarios]
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            table[key] = np.array(values, dtype=float)
+        else:
+            column = np.empty(len(values), dtype=object)
+            column[:] = values
+            table[key] = column
+    result_keys = list(dict.fromkeys(['converged', *RESULT_COLUMNS, *(key for row in rows for key in row)]))
+    for key in result_keys:
+        if key in ('converged', 'cond_inj', 'trap'):
+            table[key] = np.array([bool(row.get(key, False)) for row in rows])
+        else:
+            table[key] = np.array([row.get(key, np.nan) for row in rows], dtype=float)
+    return table
+
+
+def run_batch(scenarios, processes=None, chunksize=None, warm_start=True, cache=None, out=None,
+              property_table=None):
+    """
+    Calculate many parameter sets of the steam net model in parallel.
+
+    Neighbouring scenarios are solved in sequence by the same worker, each 
+    starting from the converged state of the nearest scenario already solved.
+
+    Parameters
+    ----------
+    scenarios : list
+        List of parameter dicts, e.g. created by :func:`parameter_grid`.
+        Parameters that are not given use the defaults of the model.
+    processes : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+        With `processes=1` the scenarios are calculated in this process.
+    chunksize : int, optional
+        Number of neighbouring scenarios solved in sequence by one worker.
+        Defaults to an even split in four chunks per worker.
+    warm_start : bool, optional
+        Start each solve from the nearest solved scenario. Default is True.
+    cache : str, optional
+        Path of a :class:`cache.result_cache` database. Cached scenarios are not solved
+        and solved scenarios are added to the cache.
+    out : str, optional
+        Directory to write the table to, see :mod:`columnar`. The rows are written chunk
+        by chunk as they are solved and the returned columns are memory-mapped.
+    property_table : properties.property_table, optional
+        Lookup table of the water properties, activated with :func:`properties.use_table`
+        in every worker process. By default the properties are calculated with CoolProp.
+
+    Returns
+    -------
+    dict
+        Results table with one numpy array per column in the order of `scenarios`. 
+        It contains the given parameters, the result factors, the topology flags, 
+        the amounts of all flows (see `FLOW_UNITS`), the allocation factors of the
+        functional flows (`'<flow> allocationfactor'`), the solver statistics of
+        :meth:`stats.solver_stats.summary` and a `converged` column. 
+        Failed scenarios have `converged=False` and NaN results. The columns of `RESULT_COLUMNS`
+        are always created, also if all scenarios failed.
+    """
+    scenarios = [dict(params) for params in scenarios]
+    vectors = _scenario_vectors(scenarios)
+    order = np.lexsort(vectors.T[::-1]) if vectors.shape[1] else np.arange(len(scenarios))
+    workers = 1 if processes == 1 else (processes or os.cpu_count() or 1)
+    if chunksize is None:
+        chunksize = max(1, -(-len(scenarios) // (4 * workers)))
+    if not warm_start:
+        chunksize = 1
+    chunks = [[(vectors[i], scenarios[i]) for i in order[start:start + chunksize]]
+              for start in range(0, len(scenarios), chunksize)]
+
+    if out is not None:
+        return _run_to_disk(scenarios, order, chunks, workers, cache, out, property_table)
+    if workers == 1:
+        with _local_table(property_table):
+            chunk_rows = [_solve_chunk(chunk, cache) for chunk in chunks]
+    else:
+        with _executor(workers, property_table) as executor:
+            chunk_rows = list(executor.map(partial(_solve_chunk, cache_path=cache), chunks))
+    rows = [None] * len(scenarios)
+    for i, row in zip(order, itertools.chain.from_iterable(chunk_rows)):
+        rows[i] = row
+
+    failed = sum(not row['converged'] for row in rows)
+    if failed:
+        logger.info(f'{failed} of {len(rows)} scenarios failed.')
+    return _to_table(scenarios, rows)
+
+
+def _run_to_disk(scenarios, order, chunks, workers, cache, out, property_table=None):
+    from .columnar import load_table, table_writer
+
+    failed = 0
+    with table_writer(out, len(scenarios)) as writer:
+        writer.write_columns(np.arange(len(scenarios)), _to_table(scenarios, [{}] * len(scenarios)))
+        if workers == 1:
+            with _local_table(property_table):
+                start = 0
+                for chunk in chunks:
+                    rows = _solve_chunk(chunk, cache)
+                    writer.write_rows(order[start:start + len(rows)], rows)
+                    failed += sum(not row['converged'] for row in rows)
+                    start += len(rows)
+        else:
+            with _executor(workers, property_table) as executor:
+                start = 0
+                for rows in executor.map(partial(_solve_chunk, cache_path=cache), chunks):
+                    writer.write_rows(order[start:start + len(rows)], rows)
+                    failed += sum(not row['converged'] for row in rows)
+                    start += len(rows)
+    if failed:
+        logger.info(f'{failed} of {len(scenarios)} scenarios failed.')
+    return load_table(out)
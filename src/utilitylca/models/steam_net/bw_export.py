@@ -0,0 +1,204 @@
+"""
+Bulk export of many steam net scenarios to a brightway25 database.
+
+The datasets linked to the flows of `define_flows` with `modelInterface.add_dataset`
+are used for all scenarios. The scenarios are solved with :func:`batch.run_batch`,
+the activities of all scenarios and functional flows are built as one dict in the
+form of :meth:`modelInterface.export_to_bw`. A new database is written with one
+`Database.write`. Into an existing database, only the exported activities are
+written with bulk inserts, after removing earlier activities with the same codes,
+instead of saving every node and exchange separately.
+"""
+
+import logging
+
+import bw2data as bd
+
+from . import batch
+from .cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+
+def _linked_dataset(model, ex):
+    # the brightway activity of a flow, None if no dataset is linked:
+    dataset = ex.source if ex.target is model else ex.target
+    return dataset if isinstance(dataset, bd.backends.proxies.Activity) else None
+
+
+def _unit_factor(model, ex, dataset):
+    """
+    Conversion factor from the table unit of the flow (`batch.FLOW_UNITS`) to the unit of the dataset.
+    """
+    dataset_unit = ex.dataset_unit if isinstance(ex.dataset_unit, str) else dataset.get('unit')
+    if dataset_unit is None:
+        raise ValueError(f'No dataset unit available for {ex.name}.')
+    return model.ureg.Quantity(1, batch.FLOW_UNITS[ex.name]).m_as(dataset_unit)
+
+
+def linked_flows(interface):
+    """
+    Non functional flows of the model of the interface that are linked to a dataset.
+
+    Returns
+    -------
+    list
+        (flow name, exchange type, input key, factor) with the factor converting the amount
+        of the results table into the unit of the dataset, incl. the dataset correction of
+        technosphere flows.
+    """
+    model = interface.model
+    flows = []
+    for kind, edges in [('technosphere', model._technosphere), ('biosphere', model._biosphere)]:
+        for name, ex in edges.items():
+            if getattr(ex, 'functional', False):
+                continue
+            dataset = _linked_dataset(model, ex)
+            if dataset is None:
+                if kind == 'biosphere':
+                    raise ValueError(f'No dataset available for {name}.')
+                continue
+            factor = _unit_factor(model, ex, dataset)
+            # the dataset correction is applied to technosphere flows only, as in simodin:
+            if kind == 'technosphere' and ex.dataset_correction is not None:
+                factor *= ex.dataset_correction
+            flows.append((name, kind, dataset.key, factor))
+    return flows
+
+
+def scenario_activities(interface, scenarios, table, database, identifiers=None):
+    """
+    Activities of all converged scenarios and functional flows in the form of `Database.write`.
+
+    Parameters
+    ----------
+    interface : simodin.interface.modelInterface
+        Interface of a model with `define_flows` called and the datasets linked.
+    scenarios : list
+        Parameter dicts of the scenarios.
+    table : dict
+        Results table of the scenarios, see :func:`batch.run_batch`.
+    database : str
+        Name of the database of the activities.
+    identifiers : list, optional
+        Identifier per scenario. The code of an activity is '<functional flow>_<identifier>'.
+        Defaults to a hash of the scenario parameters.
+
+    Returns
+    -------
+    dict
+        Activity data by (database, code). The parameters of the scenario are stored under `parameters`.
+    """
+    model = interface.model
+    flows = linked_flows(interface)
+    functional = {name: ex for name, ex in model._technosphere.items() if ex.functional}
+    if identifiers is None:
+        identifiers = [cache_key(params, versions={})[:16] for params in scenarios]
+    data = {}
+    for i, params in enumerate(scenarios):
+        if not table['converged'][i]:
+            logger.warning(f'Scenario {params} failed and is not exported.')
+            continue
+        params = {**model.params, **params}
+        for fun_name, fun_ex in functional.items():
+            code = f'{fun_name}_{identifiers[i]}'
+            allocation = table[f'{fun_name} allocationfactor'][i] / table[fun_name][i]
+            exchanges = [{'input': key, 'amount': float(table[name][i] * factor * allocation), 'type': kind}
+                         for name, kind, key, factor in flows]
+            exchanges.append({'input': (database, code), 'amount': 1, 'type': 'production'})
+            data[(database, code)] = {
+                'name': fun_name,
+                'unit': str(fun_ex.model_unit),
+                'type': 'process',
+                'parameters': params,
+                'exchanges': exchanges,
+            }
+    return data
+
+
+def _chunks(values, size):
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def _replace_activities(db, data, size=125):
+    """
+    Replace the activities of `data` in the existing database `db`, other activities are kept.
+    """
+    from bw2data.backends import ActivityDataset, ExchangeDataset, sqlite3_lci_db
+    from bw2data.backends.utils import dict_as_activitydataset, dict_as_exchangedataset
+    from bw2data.search import IndexManager
+
+    datasets = [{**ds, 'database': database, 'code': code} for (database, code), ds in data.items()]
+    activities = [dict_as_activitydataset({k: v for k, v in ds.items() if k != 'exchanges'}, add_snowflake_id=True)
+                  for ds in datasets]
+    exchanges = [dict_as_exchangedataset({**ex, 'output': (ds['database'], ds['code'])})
+                 for ds in datasets for ex in ds['exchanges']]
+    codes = [ds['code'] for ds in datasets]
+    with sqlite3_lci_db.db.atomic():
+        for chunk in _chunks(codes, size):
+            ExchangeDataset.delete().where((ExchangeDataset.output_database == db.name)
+                                           & ExchangeDataset.output_code.in_(chunk)).execute()
+            ActivityDataset.delete().where((ActivityDataset.database == db.name)
+                                           & ActivityDataset.code.in_(chunk)).execute()
+        for chunk in _chunks(activities, size):
+            ActivityDataset.insert_many(chunk).execute()
+        for chunk in _chunks(exchanges, size):
+            ExchangeDataset.insert_many(chunk).execute()
+
+    if bd.databases[db.name].get('searchable'):
+        index = IndexManager(db.filename)
+        for ds in datasets:
+            index.delete_dataset(ds)
+        index.add_datasets(datasets)
+    bd.databases[db.name]['number'] = len(db)
+    bd.databases.set_modified(db.name)
+    db.process()
+
+
+def export_to_bw(interface, scenarios, database=None, identifiers=None, table=None, overwrite=False,
+                 processes=None, cache=None):
+    """
+    Export one activity per scenario and functional flow to a brightway25 database in one write.
+
+    Parameters
+    ----------
+    interface : simodin.interface.modelInterface
+        Interface of a model with `define_flows` called and the datasets linked with `add_dataset`.
+        The parameters of the model are used for all parameters not given in a scenario.
+    scenarios : list
+        List of parameter dicts, e.g. one per temperature and site.
+    database : str, optional
+        Name of the database. Default is 'simodin_db' as in `modelInterface.export_to_bw`.
+    identifiers : list, optional
+        Identifier per scenario, see :func:`scenario_activities`.
+    table : dict, optional
+        Results table of the scenarios, e.g. read with `columnar.load_table`. The scenarios
+        are solved with :func:`batch.run_batch` if it is not given.
+    overwrite : bool, optional
+        Replace all activities of the database. By default the existing activities are
+        kept, activities with the same code are replaced. Only the exported activities are
+        written, the existing ones are not read.
+    processes : int, optional
+        Number of worker processes of :func:`batch.run_batch`.
+    cache : str, optional
+        Path of a :class:`cache.result_cache` database.
+
+    Returns
+    -------
+    list
+        Codes of the exported activities.
+    """
+    database = database or 'simodin_db'
+    scenarios = [dict(params) for params in scenarios]
+    if table is None:
+        table = batch.run_batch(scenarios, processes=processes, cache=cache)
+    data = scenario_activities(interface, scenarios, table, database, identifiers)
+    codes = [code for _, code in data]
+
+    db = bd.Database(database)
+    if database in bd.databases and not overwrite:
+        _replace_activities(db, data)
+    else:
+        db.write(data)
+    logger.info(f'{len(codes)} activities exported to {database}.')
+    return codes
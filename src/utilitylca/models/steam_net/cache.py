@@ -0,0 +1,135 @@
+"""
+Persistent result cache of the steam net model.
+
+Results are stored in a local SQLite database, keyed by a hash of the normalized
+parameters, the versions of tespy, CoolProp and utilityLCA and a hash of the source
+files of the model, so a changed model does not read results of an older one.
+"""
+
+from contextlib import contextmanager
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+
+import numpy as np
+
+from . import results
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'utilitylca', 'steam_net_results.sqlite')
+
+# source files of the model that determine the cached results:
+MODEL_SOURCES = ['steam_distribution_conventional.py', 'steam_network_model.py', 'results.py', 'properties.py']
+
+
+def _source_hash():
+    digest = hashlib.sha256()
+    for name in MODEL_SOURCES:
+        with open(os.path.join(os.path.dirname(__file__), name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _versions():
+    from importlib.metadata import PackageNotFoundError, version
+
+    versions = {}
+    for dist in ['tespy', 'CoolProp', 'utilityLCA']:
+        try:
+            versions[dist] = version(dist)
+        except PackageNotFoundError:
+            versions[dist] = 'unknown'
+    versions['model'] = _source_hash()
+    return versions
+
+
+def _normalize(value):
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, (bool, str)) or value is None:
+        return value
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    return str(value)
+
+
+def cache_key(params, versions=None):
+    """
+    Hash of the normalized parameters and the package versions and model sources.
+    Numbers are compared as floats and the mains are sorted. Pass `versions={}` for a 
+    hash of the parameters only.
+    """
+    normalized = {key: _normalize(value) for key, value in params.items()}
+    if 'mains' in normalized:
+        normalized['mains'] = sorted(normalized['mains'])
+    versions = _versions() if versions is None else versions
+    content = json.dumps({'params': normalized, 'versions': versions}, sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class result_cache:
+    """
+    Content addressed store of result records in a SQLite database.
+
+    Only the result record and the topology are stored. A model calculated from the
+    cache has no solved network, its `from_cache` attribute is True.
+
+    Parameters
+    ----------
+    path : str, optional
+        Path of the database file. Defaults to the environment variable
+        `UTILITYLCA_CACHE` or `~/.cache/utilitylca/steam_net_results.sqlite`.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('UTILITYLCA_CACHE', DEFAULT_PATH)
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._versions = _versions()
+        with self._connect() as con:
+            con.execute('CREATE TABLE IF NOT EXISTS results '
+                        '(key TEXT PRIMARY KEY, params TEXT, record BLOB, cond_inj INTEGER, trap INTEGER)')
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def key(self, params):
+        return cache_key(params, self._versions)
+
+    def get(self, params):
+        """
+        Return (record, cond_inj, trap) of the parameters or None if they are not cached.
+        """
+        with self._connect() as con:
+            row = con.execute('SELECT record, cond_inj, trap FROM results WHERE key = ?',
+                              (self.key(params),)).fetchone()
+        if row is None:
+            return None
+        record = np.frombuffer(row[0], dtype=results.RESULT_DTYPE)[0].copy()
+        return record, bool(row[1]), bool(row[2])
+
+    def put(self, params, record, cond_inj=False, trap=False):
+        """
+        Store the result record of the parameters.
+        """
+        with self._connect() as con:
+            con.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                        (self.key(params), json.dumps(params, sort_keys=True, default=str),
+                         np.asarray(record, dtype=results.RESULT_DTYPE).tobytes(), int(cond_inj), int(trap)))
+
+    def clear(self):
+        with self._connect() as con:
+            con.execute('DELETE FROM results')
+
+    def __len__(self):
+        with self._connect() as con:
+            return con.execute('SELECT COUNT(*) FROM results').fetchone()[0]
@@ -0,0 +1,220 @@
+"""
+Columnar storage of results tables of the steam net model.
+
+A table (a dictionary of numpy columns, see :func:`batch.run_batch`) is stored in a
+directory with one .npy file per column and a `schema.json` with the column names,
+dtypes and units. Numeric and boolean columns are read back memory-mapped, so only
+the accessed parts of large tables are loaded. Columns of other values, e.g. the
+mains, are stored as JSON. Parquet files are supported if pyarrow is installed.
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+
+from . import results
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_FILE = 'schema.json'
+
+# units of the result fields and the flow amounts of the table:
+COLUMN_UNITS = {**results.RESULT_SCHEMA,
+                **{name: unit for name, (_, _, unit) in results.FLOW_SCHEMA.items()}}
+
+BOOL_COLUMNS = ['converged', 'cond_inj', 'trap']
+
+
+def _column_dtype(name, values):
+    if name in BOOL_COLUMNS or values.dtype == bool:
+        return np.dtype(bool)
+    if values.dtype.kind in 'iuf':
+        return np.dtype(float)
+    return np.dtype(object)
+
+
+def _json_value(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class table_writer:
+    """
+    Write a table of n rows column by column into a directory of .npy files.
+
+    The numeric columns are preallocated as memory-mapped files, so rows can be
+    written in any order and in parts, e.g. chunk by chunk while a batch is solved.
+    Columns are created when they are written first, unwritten numeric rows are NaN
+    and unwritten boolean rows False.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the table. It is created if it does not exist.
+    n : int
+        Number of rows.
+    """
+
+    def __init__(self, path, n):
+        self.path = path
+        self.n = n
+        self.columns = {}
+        os.makedirs(path, exist_ok=True)
+
+    def _column(self, name, dtype):
+        if name not in self.columns:
+            if dtype == object:
+                self.columns[name] = [None] * self.n
+            else:
+                column = np.lib.format.open_memmap(os.path.join(self.path, f'{name}.npy'), mode='w+',
+                                                   dtype=dtype, shape=(self.n,))
+                column[:] = False if dtype == bool else np.nan
+                self.columns[name] = column
+        return self.columns[name]
+
+    def write_columns(self, indices, table):
+        """
+        Write the columns of a table to the rows `indices`.
+        """
+        indices = np.asarray(indices, dtype=int)
+        for name, values in table.items():
+            values = np.asarray(values) if not isinstance(values, np.ndarray) else values
+            column = self._column(name, _column_dtype(name, values))
+            if isinstance(column, list):
+                for i, value in zip(indices, values):
+                    column[i] = _json_value(value)
+            else:
+                column[indices] = values
+
+    def write_rows(self, indices, rows):
+        """
+        Write rows (dicts of scalars, see `batch.scenario_results`) to the rows `indices`.
+        """
+        names = dict.fromkeys(key for row in rows for key in row)
+        table = {}
+        for name in names:
+            if name in BOOL_COLUMNS:
+                table[name] = np.array([bool(row.get(name, False)) for row in rows])
+            else:
+                table[name] = np.array([row.get(name, np.nan) for row in rows], dtype=float)
+        self.write_columns(indices, table)
+
+    def close(self):
+        """
+        Flush the columns and write the schema.
+        """
+        schema = {'n': self.n, 'columns': {}}
+        for name, column in self.columns.items():
+            if isinstance(column, list):
+                file = f'{name}.json'
+                with open(os.path.join(self.path, file), 'w') as f:
+                    json.dump(column, f)
+                dtype = 'object'
+            else:
+                column.flush()
+                file = f'{name}.npy'
+                dtype = column.dtype.str
+            schema['columns'][name] = {'file': file, 'dtype': dtype, 'unit': COLUMN_UNITS.get(name)}
+        with open(os.path.join(self.path, SCHEMA_FILE), 'w') as f:
+            json.dump(schema, f, indent=1)
+        self.columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _as_table(table):
+    if isinstance(table, np.ndarray) and table.dtype.names:
+        # result records, e.g. of analytical.calculate:
+        return {name: table[name].ravel() for name in table.dtype.names}
+    return table
+
+
+def write_table(table, path, format='npy'):
+    """
+    Write a results table to disk.
+
+    Parameters
+    ----------
+    table : dict or numpy.ndarray
+        Table with one array per column, e.g. of :func:`batch.run_batch`, or a structured
+        array of result records.
+    path : str
+        Directory of the .npy columns or path of the Parquet file.
+    format : str, optional
+        'npy' (default) or 'parquet'. Parquet needs pyarrow.
+    """
+    table = _as_table(table)
+    n = len(next(iter(table.values()))) if table else 0
+    if format == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = {name: pa.array([_json_value(v) for v in values]) if np.asarray(values).dtype == object
+                   else pa.array(np.asarray(values)) for name, values in table.items()}
+        metadata = {'units': json.dumps({name: COLUMN_UNITS.get(name) for name in table})}
+        pq.write_table(pa.table(columns).replace_schema_metadata(metadata), path)
+    elif format == 'npy':
+        with table_writer(path, n) as writer:
+            writer.write_columns(np.arange(n), table)
+    else:
+        raise ValueError(f'Unknown format {format}')
+    logger.info(f'Table with {n} rows and {len(table)} columns written to {path}.')
+
+
+def load_table(path, mmap=True, columns=None):
+    """
+    Read a table written by :func:`write_table`.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the .npy columns or path of a Parquet file.
+    mmap : bool, optional
+        Map the numeric columns read-only into memory instead of reading them. Default is True.
+    columns : list, optional
+        Columns to read. Defaults to all columns.
+
+    Returns
+    -------
+    dict
+        Table with one numpy array per column.
+    """
+    if os.path.isfile(path):
+        import pyarrow.parquet as pq
+
+        data = pq.read_table(path, columns=columns, memory_map=mmap)
+        return {name: data[name].to_numpy() for name in data.column_names}
+
+    with open(os.path.join(path, SCHEMA_FILE)) as f:
+        schema = json.load(f)
+    table = {}
+    for name in columns or schema['columns']:
+        info = schema['columns'][name]
+        file = os.path.join(path, info['file'])
+        if info['dtype'] == 'object':
+            with open(file) as f:
+                values = json.load(f)
+            table[name] = np.empty(len(values), dtype=object)
+            for i, value in enumerate(values):
+                table[name][i] = value
+        else:
+            table[name] = np.load(file, mmap_mode='r' if mmap else None)
+    return table
+
+
+def units(path):
+    """
+    Units of the columns of a table written by :func:`write_table` in its npy format.
+    """
+    with open(os.path.join(path, SCHEMA_FILE)) as f:
+        schema = json.load(f)
+    return {name: info['unit'] for name, info in schema['columns'].items()}
@@ -0,0 +1,204 @@
+"""
+Adaptive curve of the steam impact over the needed temperature.
+
+The steam net changes the main at the temperatures where the needed pressure
+exceeds a main, so the curve is piecewise smooth with jumps at these temperatures.
+:func:`generate` solves both sides of each switch and refines each piece by
+bisection only where the linear interpolation misses the midpoint by more than
+the tolerance. All midpoints of a refinement round are solved together with
+:func:`batch.run_batch`.
+"""
+
+import logging
+
+import numpy as np
+
+from . import batch
+from . import properties as props
+
+logger = logging.getLogger(__name__)
+
+# distance of the solved points to a main switch on both sides:
+SWITCH_OFFSET = 1E-3
+
+
+def lca_impact(scores, functional='distributed steam'):
+    """
+    Create an output function computing the impact per unit of a functional flow.
+
+    Parameters
+    ----------
+    scores : dict
+        Impact per unit (see `batch.FLOW_UNITS`) of the non functional flows,
+        e.g. {'steam generation': 0.07, 'electricity grid': 0.1, 'electricity substitution': 0.1}.
+    functional : str, optional
+        Functional flow the impact is allocated to by its allocation factor. Default is 'distributed steam'.
+
+    Returns
+    -------
+    callable
+        Function of a results table of :func:`batch.run_batch` returning the impacts as array.
+    """
+    def impact(table):
+        total = sum(score * table[name] for name, score in scores.items())
+        return total * table[f'{functional} allocationfactor'] / table[functional]
+    return impact
+
+
+def switch_temperatures(mains):
+    """
+    Needed temperatures in °C above which the steam net changes from a main to the next higher main.
+    """
+    # the needed pressure is calculated from needed_temperature + 273, see steam_net._calc_pressure:
+    return [props.saturation_temperature(main / 1.01 * 1E5) - 273 for main in sorted(mains)[:-1]]
+
+
+def needed_main(temperature, mains):
+    """
+    Main in bar the steam net uses for a needed temperature in °C, None if no main is high enough.
+    """
+    needed_pressure = props.saturation_pressure(temperature + 273) * 1E-5
+    return min((x for x in mains if x >= needed_pressure * 1.01), default=None)
+
+
+class impact_curve:
+    """
+    Piecewise linear interpolation of the steam impact over the needed temperature.
+    Each piece belongs to one main, the pieces meet at the main switches.
+
+    Parameters
+    ----------
+    segments : list
+        Dicts with main, t_min, t_max and the arrays temperature and impact of the solved points.
+    output : str or callable
+        Output of the curve, see :func:`generate`.
+    """
+
+    def __init__(self, segments, output):
+        self.segments = segments
+        self.output = output
+        self._edges = np.array([(left['t_max'] + right['t_min']) / 2 for left, right in zip(segments, segments[1:])])
+
+    @property
+    def temperatures(self):
+        return np.concatenate([segment['temperature'] for segment in self.segments])
+
+    @property
+    def values(self):
+        return np.concatenate([segment['impact'] for segment in self.segments])
+
+    def __call__(self, temperature):
+        """
+        Interpolated impact at the needed temperatures in °C. NaN outside of the curve.
+        """
+        temperature = np.asarray(temperature, dtype=float)
+        result = np.full(temperature.shape, np.nan)
+        index = np.searchsorted(self._edges, temperature, side='left')
+        for i, segment in enumerate(self.segments):
+            mask = (index == i) & (temperature >= self.segments[0]['t_min']) & (temperature <= self.segments[-1]['t_max'])
+            if mask.any() and len(segment['temperature']):
+                result[mask] = np.interp(temperature[mask], segment['temperature'], segment['impact'])
+        return result if result.ndim else float(result)
+
+    def fill_main_dict(self, main_dict):
+        """
+        Store the solved points of each main in `main_dict[main]['impact']`.
+        """
+        for segment in self.segments:
+            if segment['main'] is None:
+                continue
+            main_dict[str(segment['main'])]['impact'] = {
+                'temperature': segment['temperature'], 'impact': segment['impact']}
+
+
+def _evaluate(temperatures, params, output, processes, cache):
+    scenarios = [{**params, 'needed_temperature': float(t)} for t in temperatures]
+    table = batch.run_batch(scenarios, processes=processes, cache=cache)
+    values = np.asarray(table[output] if isinstance(output, str) else output(table), dtype=float)
+    values[~table['converged']] = np.nan
+    return values
+
+
+def generate(model=None, output='boiler_factor', t_min=100, t_max=230, tolerance=0.01, min_step=1,
+             max_rounds=10, processes=None, cache=None, **params):
+    """
+    Compute the impact curve over the needed temperature with adaptive sampling.
+
+    Parameters
+    ----------
+    model : steam_net, optional
+        Model whose parameters are used. If it is initialised, its `main_dict` is filled.
+    output : str or callable, optional
+        Column of the results table of :func:`batch.run_batch` or a function of the table,
+        see :func:`lca_impact`. Default is 'boiler_factor'.
+    t_min, t_max : float, optional
+        Temperature range in °C. Default is 100 to 230 °C.
+    tolerance : float, optional
+        Maximum relative deviation of a midpoint from the linear interpolation. Default is 0.01.
+    min_step : float, optional
+        Intervals smaller than this temperature difference in K are not refined. Default is 1.
+    max_rounds : int, optional
+        Maximum number of refinement rounds.
+    processes : int, optional
+        Number of worker processes of :func:`batch.run_batch`.
+    cache : str, optional
+        Path of a :class:`cache.result_cache` database.
+    **params
+        Further parameters of the model. They override the parameters of `model`.
+
+    Returns
+    -------
+    impact_curve
+    """
+    params = {**(dict(model.params) if model is not None else {}), **params}
+    params.pop('needed_temperature', None)
+    if 'mains' not in params:
+        from .steam_distribution_conventional import steam_net
+        params['mains'] = steam_net.parameters['mains'].default
+    mains = sorted(params['mains'])
+
+    edges = [t_min] + [t for t in switch_temperatures(mains) if t_min < t < t_max] + [t_max]
+    starts = [edges[0]] + [t + SWITCH_OFFSET for t in edges[1:-1]]
+    ends = [t - SWITCH_OFFSET for t in edges[1:-1]] + [edges[-1]]
+
+    # the ends and midpoints of all pieces are solved in the first round:
+    points = {}
+    pending = [(a, b) for a, b in zip(starts, ends)]
+    new = sorted(set(starts) | set(ends) | {(a + b) / 2 for a, b in pending})
+    n_solves = 0
+    for i in range(max_rounds):
+        if not new:
+            break
+        points.update(zip(new, _evaluate(new, params, output, processes, cache)))
+        n_solves += len(new)
+        refine = []
+        for a, b in pending:
+            m = (a + b) / 2
+            va, vb, vm = points.get(a, np.nan), points.get(b, np.nan), points[m]
+            if np.isnan([va, vb, vm]).any():
+                continue
+            error = abs(vm - (va + vb) / 2) / max(abs(vm), 1e-12)
+            if error > tolerance and (b - a) / 2 > min_step:
+                refine += [(a, m), (m, b)]
+        pending = refine
+        new = sorted({(a + b) / 2 for a, b in pending})
+        logger.info(f'Impact curve round {i + 1}: {len(points)} points, {len(pending)} intervals to refine')
+    failed = sum(np.isnan(v) for v in points.values())
+    if failed:
+        logger.warning(f'{failed} points of the impact curve failed and are ignored.')
+
+    segments = []
+    for a, b in zip(starts, ends):
+        temperature = np.array(sorted(t for t, v in points.items() if a <= t <= b and not np.isnan(v)))
+        segments.append({
+            'main': needed_main(b, mains),
+            't_min': a,
+            't_max': b,
+            'temperature': temperature,
+            'impact': np.array([points[t] for t in temperature]),
+        })
+    curve = impact_curve(segments, output)
+    curve.n_solves = n_solves
+    if model is not None and getattr(model, 'main_dict', None):
+        curve.fill_main_dict(model.main_dict)
+    return curve
@@ -0,0 +1,175 @@
+"""
+IF97 water properties used for the mains and pressure calculation of the steam net.
+
+All functions use SI units (K, Pa, J/kg) and keep a bounded cache of their results.
+Optionally, a precomputed :class:`property_table` can be activated with :func:`use_table`.
+Values inside the range of the table are then interpolated instead of calling CoolProp.
+"""
+
+from functools import lru_cache
+import logging
+
+import numpy as np
+from CoolProp.CoolProp import PropsSI
+
+CACHE_SIZE = 4096
+BACKEND = 'IF97::water'
+
+logger = logging.getLogger(__name__)
+
+_table = None
+
+
+def use_table(table):
+    """
+    Activate a :class:`property_table` for all property functions. Pass None to deactivate it.
+    """
+    global _table
+    _table = table
+
+
+def saturation_pressure(T):
+    """
+    Saturation pressure in Pa at temperature T in K.
+    """
+    if _table is not None and _table.T_min <= T <= _table.T_max:
+        return _table.saturation_pressure(T)
+    return _saturation_pressure(T)
+
+
+def saturation_temperature(p):
+    """
+    Saturation temperature in K at pressure p in Pa.
+    """
+    if _table is not None and _table.p_min <= p <= _table.p_max:
+        return _table.saturation_temperature(p)
+    return _saturation_temperature(p)
+
+
+def superheating_enthalpy(p_sat, p):
+    """
+    Enthalpy in J/kg at pressure p on the isentrope through saturated steam at pressure p_sat.
+    """
+    if _table is not None and _table.in_isentrope_range(p_sat, p):
+        return _table.superheating_enthalpy(p_sat, p)
+    return _superheating_enthalpy(p_sat, p)
+
+
+def cache_clear():
+    for func in (_saturation_pressure, _saturation_temperature, _superheating_enthalpy):
+        func.cache_clear()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _saturation_pressure(T):
+    return PropsSI('P', 'Q', 0, 'T', T, BACKEND)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _saturation_temperature(p):
+    return PropsSI('T', 'P', p, 'Q', 1, BACKEND)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _superheating_enthalpy(p_sat, p):
+    s = PropsSI('S', 'P', p_sat, 'Q', 1, BACKEND)
+    return PropsSI('H', 'P', p, 'S', s, BACKEND)
+
+
+def _isentrope_point(p_sat, p):
+    # NaN outside the range of IF97:
+    try:
+        return _superheating_enthalpy(p_sat, p)
+    except ValueError:
+        return np.nan
+
+
+class property_table:
+    """
+    Lookup table of the saturation line and the superheating isentropes of water.
+
+    The saturation line is interpolated linearly in ln(p) over 1/T, the isentropes
+    bilinearly over ln(p_sat) and ln(p). Grid points of the isentropes outside the range 
+    of IF97 (low saturation pressures at high pressures) are masked, their number is 
+    stored in `invalid_points`. Pairs in grid cells with a masked corner are not in 
+    :meth:`in_isentrope_range` and are calculated with CoolProp. The maximum relative 
+    interpolation errors, evaluated at the midpoints of the valid cells of the grid, 
+    are stored in `max_error`.
+
+    Parameters
+    ----------
+    T_min, T_max : float
+        Temperature range of the saturation line in K.
+    n_T : int
+        Number of points on the saturation line.
+    p_sat_min, p_sat_max : float
+        Range of the saturation pressures (lowest main) of the isentropes in Pa.
+    p_min, p_max : float
+        Range of the pressures (max pressure) on the isentropes in Pa.
+    n_p : int
+        Number of points in both pressure directions of the isentropes.
+    """
+
+    def __init__(self, T_min=373.15, T_max=640, n_T=200,
+                 p_sat_min=1E5, p_sat_max=100E5, p_min=10E5, p_max=200E5, n_p=40):
+        self.T_min = T_min
+        self.T_max = T_max
+        self._inv_T = np.linspace(1 / T_max, 1 / T_min, n_T)
+        self._ln_p = np.log([_saturation_pressure(T) for T in 1 / self._inv_T])
+        self.p_min = float(np.exp(self._ln_p[-1]))
+        self.p_max = float(np.exp(self._ln_p[0]))
+
+        self._ln_p_sat = np.linspace(np.log(p_sat_min), np.log(p_sat_max), n_p)
+        self._ln_p_is = np.linspace(np.log(p_min), np.log(p_max), n_p)
+        self._h = np.array([[_isentrope_point(p_sat, p) for p in np.exp(self._ln_p_is)]
+                            for p_sat in np.exp(self._ln_p_sat)])
+        valid = np.isfinite(self._h)
+        self.invalid_points = int((~valid).sum())
+        if self.invalid_points:
+            logger.info(f'{self.invalid_points} isentrope points outside the range of IF97 are masked.')
+        # cells with all four corners valid:
+        self._valid = valid[1:, 1:] & valid[:-1, 1:] & valid[1:, :-1] & valid[:-1, :-1]
+        self.max_error = self._max_error()
+
+    def saturation_pressure(self, T):
+        return float(np.exp(np.interp(1 / T, self._inv_T, self._ln_p)))
+
+    def saturation_temperature(self, p):
+        return float(1 / np.interp(np.log(p), self._ln_p[::-1], self._inv_T[::-1]))
+
+    def _cell(self, x, y):
+        i = min(max(np.searchsorted(self._ln_p_sat, x) - 1, 0), len(self._ln_p_sat) - 2)
+        j = min(max(np.searchsorted(self._ln_p_is, y) - 1, 0), len(self._ln_p_is) - 2)
+        return i, j
+
+    def in_isentrope_range(self, p_sat, p):
+        x, y = np.log(p_sat), np.log(p)
+        if not (self._ln_p_sat[0] <= x <= self._ln_p_sat[-1] and self._ln_p_is[0] <= y <= self._ln_p_is[-1]):
+            return False
+        return bool(self._valid[self._cell(x, y)])
+
+    def superheating_enthalpy(self, p_sat, p):
+        x, y = np.log(p_sat), np.log(p)
+        i, j = self._cell(x, y)
+        tx = (x - self._ln_p_sat[i]) / (self._ln_p_sat[i + 1] - self._ln_p_sat[i])
+        ty = (y - self._ln_p_is[j]) / (self._ln_p_is[j + 1] - self._ln_p_is[j])
+        h = self._h
+        return float((1 - tx) * (1 - ty) * h[i, j] + tx * (1 - ty) * h[i + 1, j]
+                     + (1 - tx) * ty * h[i, j + 1] + tx * ty * h[i + 1, j + 1])
+
+    def _max_error(self):
+        inv_T = (self._inv_T[1:] + self._inv_T[:-1]) / 2
+        p = np.exp((self._ln_p[1:] + self._ln_p[:-1]) / 2)
+        ln_p_sat = (self._ln_p_sat[1:] + self._ln_p_sat[:-1]) / 2
+        ln_p_is = (self._ln_p_is[1:] + self._ln_p_is[:-1]) / 2
+        cells = np.argwhere(self._valid)
+        return {
+            'saturation_pressure': max(abs(self.saturation_pressure(1 / x) / _saturation_pressure(1 / x) - 1)
+                                       for x in inv_T),
+            'saturation_temperature': max(abs(self.saturation_temperature(x) / _saturation_temperature(x) - 1)
+                                          for x in p),
+            'superheating_enthalpy': max((abs(self.superheating_enthalpy(x, y) / _superheating_enthalpy(x, y) - 1)
+                                          for x, y in np.exp(np.column_stack([ln_p_sat[cells[:, 0]],
+                                                                              ln_p_is[cells[:, 1]]]))),
+                                         default=np.nan),
+        }
@@ -0,0 +1,272 @@
+"""
+Schema of the numeric result record of the steam net model and vectorized post-processing.
+
+The record is a numpy structured scalar with one float per field. Units are only
+stored here, in `RESULT_SCHEMA` and `FLOW_SCHEMA`. :func:`postprocess` computes the
+records of N solved scenarios from arrays of their connection states in one pass.
+:func:`multi_consumer_postprocess` computes the record and the consumer records of 
+one network with several consumers.
+"""
+
+import numpy as np
+
+# result fields and their units:
+RESULT_SCHEMA = {
+    'elec_factor': '',
+    'boiler_factor': '',
+    'losses': '',
+    'diss_losses': '',
+    'leak_losses': '',
+    'watertreatment_factor': 'kg/J',
+    'alloc_ex': '',
+    'E_bpt': 'W',
+    'E_hs': 'W',
+    'E_nw_hs': 'W',
+    'E_boil': 'W',
+    'E_pump': 'W',
+    'E_turb': 'W',
+    'E_turb_grid': 'W',
+    'E_heat_sink': 'W',
+    'E_nw_heat_sink': 'W',
+    'Q_hex': 'W',
+    'Q_nw': 'W',
+    'm_leak': 'kg/s',
+}
+
+RESULT_DTYPE = np.dtype([(name, float) for name in RESULT_SCHEMA])
+
+# flows of define_flows: (result field, factor, unit). The amount of a flow refers to
+# one second of operation: amount = factor * record[field] * unit
+FLOW_SCHEMA = {
+    'steam generation': ('E_boil', 1E-6, 'megajoule'),
+    'electricity grid': ('E_pump', 1E-6, 'megajoule'),
+    'electricity substitution': ('E_turb_grid', -1E-6, 'megajoule'),
+    'distributed steam': ('E_heat_sink', 1E-6, 'megajoule'),
+    'network steam': ('E_nw_heat_sink', 1E-6, 'megajoule'),
+    'steam leak': ('m_leak', 1E-3, 'meter**3'),
+}
+
+
+def empty_record():
+    """
+    Return a new result record with all fields set to NaN.
+    """
+    record = np.full(1, np.nan, dtype=RESULT_DTYPE)[0]
+    return record
+
+
+def flow_amount(record, name):
+    """
+    Amount of a flow of define_flows as float in the unit of `FLOW_SCHEMA`.
+    """
+    field, factor, _ = FLOW_SCHEMA[name]
+    return factor * float(record[field])
+
+
+def allocation_factors(record):
+    """
+    Allocation factors of the functional flows 'distributed steam' and 'network steam'
+    by transferred heat.
+    """
+    total = record['Q_nw'] + record['Q_hex']
+    return {'distributed steam': float(record['Q_hex'] / total),
+            'network steam': float(record['Q_nw'] / total)}
+
+
+# connection states used by postprocess (SI units). 'hs_in' and 'hs_out' are the inlet and outlet 
+# of the process heat sink, which depend on the topology: 
+STATE_FIELDS = {
+    'c_leak': ['m', 'h'],
+    'muw': ['m'],
+    'muw2': ['h'],
+    'c1_5': ['m', 'h', 's'],
+    'c1_6': ['h', 's'],
+    'hs_in': ['m', 'h', 's'],
+    'hs_out': ['h', 's'],
+    'cnw1': ['m', 'h', 's'],
+    'cnw2': ['h', 's'],
+    'e_boil': ['E'],
+    'e_pump': ['E'],
+    'e_turb': ['E'],
+    'e_turb_grid': ['E'],
+    'e_heat_sink': ['E'],
+    'e_nw_heat_sink': ['E'],
+    'e_pi_sink': ['E'],
+}
+
+
+def _si(value):
+    return float(value.to_base_units().m) if hasattr(value, 'to_base_units') else float(value)
+
+
+def network_states(model, cond_inj=False):
+    """
+    Read the connection states needed by :func:`postprocess` from a solved network.
+
+    Returns
+    -------
+    dict
+        '<connection>.<property>' and 'Q_hex', 'Q_nw' as SI floats.
+    """
+    labels = {'hs_in': 'cond_5', 'hs_out': 'cond_1'} if cond_inj else {'hs_in': 'c1_1', 'hs_out': 'c0_1'}
+    states = {}
+    for conn, properties in STATE_FIELDS.items():
+        obj = model.get_conn(labels.get(conn, conn))
+        for prop in properties:
+            states[f'{conn}.{prop}'] = _si(getattr(obj, prop)._val)
+    states['Q_hex'] = _si(model.get_comp('hex heat sink').Q._val)
+    states['Q_nw'] = _si(model.get_comp('network condensation').Q._val)
+    return states
+
+
+def stack_states(states):
+    """
+    Combine a list of states of :func:`network_states` to one dict of arrays.
+    """
+    return {key: np.array([state[key] for state in states], dtype=float) for key in states[0]}
+
+
+def postprocess(states, Tamb):
+    """
+    Compute the result records of N solved scenarios in one numpy pass.
+
+    Parameters
+    ----------
+    states : dict
+        Arrays of length N of the connection states, see :func:`network_states` and :func:`stack_states`.
+    Tamb : float or numpy.ndarray
+        Ambient temperature in °C used as reference for the exergy.
+
+    Returns
+    -------
+    numpy.ndarray
+        Structured array of length N with dtype `RESULT_DTYPE`.
+    """
+    st = {key: np.atleast_1d(np.asarray(value, dtype=float)) for key, value in states.items()}
+    t_amb = np.asarray(Tamb, dtype=float) + 273.15
+    out = np.empty(len(st['e_boil.E']), dtype=RESULT_DTYPE)
+
+    E_boil, E_turb, E_pump = st['e_boil.E'], st['e_turb.E'], st['e_pump.E']
+    E_heat_sink, E_nw_heat_sink = st['e_heat_sink.E'], st['e_nw_heat_sink.E']
+    leakage_loss = st['c_leak.m'] * (st['c_leak.h'] - st['muw2.h'])
+    supplied = np.abs(E_boil) - np.abs(E_turb) + E_pump
+
+    out['elec_factor'] = np.abs(st['e_turb_grid.E'] / E_heat_sink)
+    out['boiler_factor'] = np.abs(E_boil / E_heat_sink)
+    out['diss_losses'] = np.abs(st['e_pi_sink.E']) / supplied
+    out['leak_losses'] = np.abs(leakage_loss) / supplied
+    out['losses'] = 1 - (E_heat_sink + E_nw_heat_sink) / (E_boil - E_turb + E_pump)
+    out['watertreatment_factor'] = np.abs(st['muw.m'] / E_heat_sink)
+
+    #exergy reduction:
+    out['E_bpt'] = ((st['c1_5.h'] - st['c1_6.h']) - t_amb * (st['c1_5.s'] - st['c1_6.s'])) * st['c1_5.m']
+    out['E_hs'] = ((st['hs_out.h'] - st['hs_in.h']) - t_amb * (st['hs_out.s'] - st['hs_in.s'])) * st['hs_in.m']
+    out['E_nw_hs'] = ((st['cnw2.h'] - st['cnw1.h']) - t_amb * (st['cnw2.s'] - st['cnw1.s'])) * st['cnw1.m']
+    out['alloc_ex'] = out['E_bpt'] / (out['E_hs'] + out['E_bpt'] + out['E_nw_hs'])
+
+    out['E_boil'] = E_boil
+    out['E_pump'] = E_pump
+    out['E_turb'] = E_turb
+    out['E_turb_grid'] = st['e_turb_grid.E']
+    out['E_heat_sink'] = E_heat_sink
+    out['E_nw_heat_sink'] = E_nw_heat_sink
+    out['Q_hex'] = st['Q_hex']
+    out['Q_nw'] = st['Q_nw']
+    out['m_leak'] = st['c_leak.m']
+    return out
+
+
+# result fields of each consumer of a multi consumer steam net and their units:
+CONSUMER_SCHEMA = {
+    'main': 'bar',
+    'needed_pressure': 'bar',
+    'Q_hex': 'W',
+    'E_heat_sink': 'W',
+    'E_hs': 'W',
+    'allocationfactor': '',
+    'alloc_ex': '',
+}
+
+CONSUMER_DTYPE = np.dtype([(name, float) for name in CONSUMER_SCHEMA])
+
+
+def _exergy_change(inlet, outlet, t_amb):
+    return ((_si(outlet.h._val) - _si(inlet.h._val)) 
+            - t_amb * (_si(outlet.s._val) - _si(inlet.s._val))) * _si(inlet.m._val)
+
+
+def multi_consumer_postprocess(model, consumers, Tamb):
+    """
+    Compute the results of a solved multi consumer steam net.
+
+    Parameters
+    ----------
+    model : tespy.networks.Network
+        Network created by :func:`steam_network_model.create_multi_consumer_net`.
+    consumers : list
+        Consumers of the network (dicts with name, main, needed_pressure).
+    Tamb : float
+        Ambient temperature in °C used as reference for the exergy.
+
+    Returns
+    -------
+    tuple
+        Result record (`RESULT_DTYPE`) of the whole network, with the sums over all consumers 
+        in the heat sink fields, and a structured array with one `CONSUMER_DTYPE` record per consumer.
+        The allocation factor of a consumer is its share of the transferred heat of all consumers 
+        and the network condensation, `alloc_ex` its share of the exergy reduction.
+    """
+    t_amb = Tamb + 273.15
+    conn, comp = model.get_conn, model.get_comp
+    E = {label: _si(conn(label).E._val) for label in ['e_boil', 'e_pump', 'e_turb', 'e_turb_grid', 
+                                                      'e_nw_heat_sink', 'e_pi_sink']}
+    mains = sorted({consumer['main'] for consumer in consumers}, reverse=True)
+
+    out = np.empty(len(consumers), dtype=CONSUMER_DTYPE)
+    for i, consumer in enumerate(consumers):
+        name = consumer['name']
+        out[i]['main'] = consumer['main']
+        out[i]['needed_pressure'] = consumer['needed_pressure']
+        out[i]['Q_hex'] = _si(comp(f'hex heat sink {name}').Q._val)
+        out[i]['E_heat_sink'] = _si(conn(f'e_heat_sink {name}').E._val)
+        out[i]['E_hs'] = _exergy_change(conn(f'c1_1 {name}'), conn(f'c0_1 {name}'), t_amb)
+
+    leakage_loss = 0
+    m_leak = 0
+    for name in [consumer['name'] for consumer in consumers] + ['network']:
+        c_leak = conn(f'c_leak {name}')
+        m_leak += _si(c_leak.m._val)
+        leakage_loss += _si(c_leak.m._val) * (_si(c_leak.h._val) - _si(conn(f'muw2 {name}').h._val))
+    # one turbine stage per main, the first stage starts at the boiler outlet:
+    stage_inlets = ['c1_6'] + [f'c_stage {main:g} bar' for main in mains[1:]]
+    E_bpt = sum(_exergy_change(conn(inlet), conn(f'c_main {main:g} bar'), t_amb) 
+                for inlet, main in zip(stage_inlets, mains))
+    E_nw_hs = _exergy_change(conn('cnw1'), conn('cnw2'), t_amb)
+    Q_nw = _si(comp('network condensation').Q._val)
+
+    E_heat_sink = out['E_heat_sink'].sum()
+    supplied = abs(E['e_boil']) - abs(E['e_turb']) + E['e_pump']
+    record = empty_record()
+    record['elec_factor'] = abs(E['e_turb_grid'] / E_heat_sink)
+    record['boiler_factor'] = abs(E['e_boil'] / E_heat_sink)
+    record['diss_losses'] = abs(E['e_pi_sink']) / supplied
+    record['leak_losses'] = abs(leakage_loss) / supplied
+    record['losses'] = 1 - (E_heat_sink + E['e_nw_heat_sink']) / (E['e_boil'] - E['e_turb'] + E['e_pump'])
+    record['watertreatment_factor'] = abs(_si(conn('muw').m._val) / E_heat_sink)
+    record['E_bpt'] = E_bpt
+    record['E_hs'] = out['E_hs'].sum()
+    record['E_nw_hs'] = E_nw_hs
+    record['alloc_ex'] = E_bpt / (record['E_hs'] + E_bpt + E_nw_hs)
+    record['E_boil'] = E['e_boil']
+    record['E_pump'] = E['e_pump']
+    record['E_turb'] = E['e_turb']
+    record['E_turb_grid'] = E['e_turb_grid']
+    record['E_heat_sink'] = E_heat_sink
+    record['E_nw_heat_sink'] = E['e_nw_heat_sink']
+    record['Q_hex'] = out['Q_hex'].sum()
+    record['Q_nw'] = Q_nw
+    record['m_leak'] = m_leak
+
+    out['allocationfactor'] = out['Q_hex'] / (record['Q_hex'] + Q_nw)
+    out['alloc_ex'] = out['E_hs'] / (record['E_hs'] + E_bpt + E_nw_hs)
+    return record, out
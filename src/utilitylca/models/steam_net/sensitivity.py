@@ -0,0 +1,232 @@
+"""
+Global sensitivity analysis of the steam net model.
+
+:func:`morris` screens the parameters by elementary effects along random
+trajectories on a grid, :func:`sobol` computes first order and total Sobol indices
+with the Saltelli design and the Jansen estimators. Both evaluate all points of
+their design with one call of :func:`batch.run_batch`. Points that occur several
+times in a design, or that were already solved in an earlier analysis with the same
+`solved` dict, are solved only once.
+"""
+
+import logging
+
+import numpy as np
+
+from . import batch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUTS = ['elec_factor', 'boiler_factor', 'losses', 'alloc_ex']
+
+# largest share of failed points of a design, the estimators are biased by missing points:
+MAX_FAILED = 0.05
+
+
+def default_bounds(bounds=None, fixed=None):
+    """
+    (min, max) of all parameters of `steam_net.parameters` with min and max, updated by `bounds`.
+    The default range of max_pressure starts at the highest main (of `fixed` or the default mains),
+    lower max pressures can not be solved.
+    """
+    from .steam_distribution_conventional import steam_net
+
+    result = {name: (parameter.min, parameter.max) for name, parameter in steam_net.parameters.items()
+              if getattr(parameter, 'min', None) is not None and getattr(parameter, 'max', None) is not None}
+    mains = (fixed or {}).get('mains', steam_net.parameters['mains'].default)
+    low, high = result['max_pressure']
+    result['max_pressure'] = (max(low, max(mains)), high)
+    result.update({name: tuple(value) for name, value in (bounds or {}).items()})
+    return result
+
+
+def _scale(z, bounds):
+    low = np.array([low for low, _ in bounds.values()], dtype=float)
+    high = np.array([high for _, high in bounds.values()], dtype=float)
+    return low + z * (high - low)
+
+
+def evaluate(x, bounds, outputs, fixed=None, solved=None, processes=None, cache=None, max_failed=MAX_FAILED):
+    """
+    Solve the parameter sets in the rows of x (in the order of `bounds`), each distinct set only once.
+
+    Parameters
+    ----------
+    solved : dict, optional
+        Results of earlier calls by parameter set. New results are added, so passing the
+        same dict to several analyses reuses their solved points.
+    max_failed : float, optional
+        Largest share of failed points. Default is `MAX_FAILED`.
+
+    Returns
+    -------
+    numpy.ndarray
+        Outputs with one row per row of x. Failed scenarios are NaN.
+
+    Raises
+    ------
+    ValueError
+        If more than `max_failed` of the points failed.
+    """
+    solved = {} if solved is None else solved
+    fixed = dict(fixed or {})
+    fixed_key = tuple(sorted((key, repr(value)) for key, value in fixed.items()))
+    keys = [(fixed_key, tuple(zip(bounds, np.round(row, 12)))) for row in x]
+    missing = list(dict.fromkeys(key for key in keys if key not in solved))
+    if missing:
+        scenarios = [{**fixed, **{name: float(value) for name, value in key[1]}} for key in missing]
+        table = batch.run_batch(scenarios, processes=processes, cache=cache)
+        for i, key in enumerate(missing):
+            solved[key] = {name: float(table[name][i]) if table['converged'][i] else np.nan
+                           for name in table if table[name].dtype != object}
+    logger.info(f'{len(x)} points, {len(missing)} solved, {len(x) - len(missing)} reused.')
+    y = np.array([[solved[key].get(name, np.nan) for name in outputs] for key in keys], dtype=float)
+    failed = np.isnan(y).any(axis=1).mean() if len(y) else 0
+    if failed > max_failed:
+        raise ValueError(f'{failed:.1%} of the points failed, more than {max_failed:.1%}. '
+                         'Narrow the bounds to the region that can be solved.')
+    return y
+
+
+def morris(bounds=None, outputs=None, trajectories=20, levels=4, fixed=None, seed=None,
+           solved=None, processes=None, cache=None, max_failed=MAX_FAILED):
+    """
+    Morris screening by elementary effects.
+
+    Parameters
+    ----------
+    bounds : dict, optional
+        (min, max) per varied parameter. Defaults to all parameters with min and max,
+        see :func:`default_bounds`. Parameters without min and max, e.g. insulation_thickness
+        or pipe_length, are varied when their bounds are given here.
+    outputs : list, optional
+        Result columns of :func:`batch.run_batch`. Default: elec_factor, boiler_factor, losses, alloc_ex.
+    trajectories : int, optional
+        Number of trajectories. Each needs number of parameters + 1 points.
+    levels : int, optional
+        Number of grid levels per parameter. Default is 4.
+    fixed : dict, optional
+        Parameters that are kept constant.
+    seed : int, optional
+        Seed of the random numbers.
+    solved : dict, optional
+        Solved points to reuse, see :func:`evaluate`.
+    processes : int, optional
+        Number of worker processes of :func:`batch.run_batch`.
+    cache : str, optional
+        Path of a :class:`cache.result_cache` database.
+    max_failed : float, optional
+        Largest share of failed points, see :func:`evaluate`. The remaining failed points 
+        are left out of the estimators.
+
+    Returns
+    -------
+    dict
+        Per output the dicts `mu`, `mu_star` and `sigma` of the elementary effects per parameter,
+        in units of the output per parameter range.
+    """
+    bounds = default_bounds(bounds, fixed)
+    outputs = list(outputs or DEFAULT_OUTPUTS)
+    rng = np.random.default_rng(seed)
+    k = len(bounds)
+    delta = levels / (2 * (levels - 1))
+
+    # each trajectory starts on the lower part of the grid and moves one parameter at a time by +delta:
+    z = []
+    steps = []
+    for _ in range(trajectories):
+        point = rng.integers(0, levels // 2, k) / (levels - 1)
+        order = rng.permutation(k)
+        z.append(point.copy())
+        for i in order:
+            point[i] += delta
+            z.append(point.copy())
+        steps.append(order)
+    y = evaluate(_scale(np.array(z), bounds), bounds, outputs, fixed, solved, processes, cache, max_failed)
+    y = y.reshape(trajectories, k + 1, len(outputs))
+
+    effects = np.empty((trajectories, k, len(outputs)))
+    for t, order in enumerate(steps):
+        effects[t, order] = (y[t, 1:] - y[t, :-1]) / delta
+
+    names = list(bounds)
+    result = {}
+    for j, output in enumerate(outputs):
+        ee = effects[:, :, j]
+        result[output] = {
+            'mu': dict(zip(names, np.nanmean(ee, axis=0))),
+            'mu_star': dict(zip(names, np.nanmean(np.abs(ee), axis=0))),
+            'sigma': dict(zip(names, np.nanstd(ee, axis=0, ddof=1))),
+        }
+    return result
+
+
+def sobol(bounds=None, outputs=None, n=256, fixed=None, seed=None, bootstrap=100,
+          solved=None, processes=None, cache=None, max_failed=MAX_FAILED):
+    """
+    First order and total Sobol indices by the Saltelli design and the Jansen estimators.
+
+    Parameters
+    ----------
+    bounds : dict, optional
+        (min, max) per varied parameter, see :func:`morris`.
+    outputs : list, optional
+        Result columns of :func:`batch.run_batch`. Default: elec_factor, boiler_factor, losses, alloc_ex.
+    n : int, optional
+        Number of base samples. The design has n * (number of parameters + 2) points.
+    fixed : dict, optional
+        Parameters that are kept constant.
+    seed : int, optional
+        Seed of the random numbers.
+    bootstrap : int, optional
+        Number of bootstrap resamples for the 95 % confidence intervals. 0 to skip.
+    solved : dict, optional
+        Solved points to reuse, see :func:`evaluate`.
+    processes : int, optional
+        Number of worker processes of :func:`batch.run_batch`.
+    cache : str, optional
+        Path of a :class:`cache.result_cache` database.
+    max_failed : float, optional
+        Largest share of failed points, see :func:`evaluate`. The remaining failed points 
+        are left out of the estimators.
+
+    Returns
+    -------
+    dict
+        Per output the dicts `S1`, `ST` and their half confidence widths `S1_conf` and `ST_conf` per parameter.
+    """
+    bounds = default_bounds(bounds, fixed)
+    outputs = list(outputs or DEFAULT_OUTPUTS)
+    rng = np.random.default_rng(seed)
+    k = len(bounds)
+    a = rng.random((n, k))
+    b = rng.random((n, k))
+    ab = np.repeat(a[None], k, axis=0)
+    for i in range(k):
+        ab[i, :, i] = b[:, i]
+    z = np.concatenate([a, b, ab.reshape(k * n, k)])
+    y = evaluate(_scale(z, bounds), bounds, outputs, fixed, solved, processes, cache, max_failed)
+    y_a, y_b, y_ab = y[:n], y[n:2 * n], y[2 * n:].reshape(k, n, len(outputs))
+
+    def indices(rows):
+        fa, fb, fab = y_a[rows], y_b[rows], y_ab[:, rows]
+        variance = np.nanvar(np.concatenate([fa, fb]), axis=0, ddof=1)
+        s1 = np.nanmean(fb[None] * (fab - fa[None]), axis=1) / variance
+        st = 0.5 * np.nanmean((fa[None] - fab) ** 2, axis=1) / variance
+        return s1, st
+
+    s1, st = indices(np.arange(n))
+    s1_conf = np.full_like(s1, np.nan)
+    st_conf = np.full_like(st, np.nan)
+    if bootstrap:
+        samples = [indices(rng.integers(0, n, n)) for _ in range(bootstrap)]
+        s1_conf = 1.96 * np.std([s[0] for s in samples], axis=0, ddof=1)
+        st_conf = 1.96 * np.std([s[1] for s in samples], axis=0, ddof=1)
+
+    names = list(bounds)
+    return {output: {
+        'S1': dict(zip(names, s1[:, j])),
+        'ST': dict(zip(names, st[:, j])),
+        'S1_conf': dict(zip(names, s1_conf[:, j])),
+        'ST_conf': dict(zip(names, st_conf[:, j])),
+    } for j, output in enumerate(outputs)}
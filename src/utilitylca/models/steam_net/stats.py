@@ -0,0 +1,105 @@
+"""
+Solver instrumentation of the steam net model.
+
+Each :class:`steam_net` has a :class:`solver_stats` object in `model.stats` that
+records every solve (phase, wall time, Newton iterations, final residual and
+convergence status) and the time spent in named sections such as the property
+calls. Hooks receive every record as dict, e.g. to send it to a metrics system.
+"""
+
+from contextlib import contextmanager
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def solver_info(network):
+    """
+    Read iteration count, final residual and status of the last solve of a tespy network.
+    Values that are not available in the installed tespy version are None.
+    """
+    iterations = getattr(network, 'iter', None)
+    if iterations is not None:
+        iterations = int(iterations) + 1
+    residual = None
+    history = getattr(network, 'residual_history', None)
+    if history is not None and len(history):
+        residual = float(history[-1])
+    elif getattr(network, 'residual', None) is not None:
+        residual = float(np.linalg.norm(network.residual))
+    status = getattr(network, 'status', None)
+    # status 1: converged with parameters out of their bounds, as `Network.converged` of tespy
+    converged = status in (0, 1) if status is not None else None
+    return {'iterations': iterations, 'residual': residual, 'status': status, 'converged': converged}
+
+
+class solver_stats:
+    """
+    Statistics of the solves and timed sections of one model.
+
+    Parameters
+    ----------
+    hooks : list, optional
+        Callables that are called with each record (dict) of a solve or timed section.
+    """
+
+    def __init__(self, hooks=None):
+        self.solves = []
+        self.timers = {}
+        self.hooks = list(hooks or [])
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def _emit(self, record):
+        for hook in self.hooks:
+            try:
+                hook(record)
+            except Exception as e:
+                logger.warning(f'Stats hook {hook} failed: {e}')
+
+    def record_solve(self, phase, network, wall_time, error=None):
+        """
+        Add the record of a solve of the network.
+        """
+        record = {'type': 'solve', 'phase': phase, 'wall_time': wall_time, **solver_info(network)}
+        if error is not None:
+            record['converged'] = False
+            record['error'] = str(error)
+        self.solves.append(record)
+        self._emit(record)
+        return record
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Context manager adding the wall time of the block to the section `name`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start
+            timer = self.timers.setdefault(name, {'calls': 0, 'time': 0.0})
+            timer['calls'] += 1
+            timer['time'] += wall_time
+            self._emit({'type': 'timer', 'name': name, 'wall_time': wall_time})
+
+    def summary(self):
+        """
+        Totals of all solves and timed sections.
+        """
+        return {
+            'solves': len(self.solves),
+            'solve_time': sum(s['wall_time'] for s in self.solves),
+            'iterations': sum(s['iterations'] or 0 for s in self.solves),
+            'failed_solves': sum(s['converged'] is False for s in self.solves),
+            **{f'{name}_time': timer['time'] for name, timer in self.timers.items()},
+        }
+
+    def reset(self):
+        self.solves = []
+        self.timers = {}
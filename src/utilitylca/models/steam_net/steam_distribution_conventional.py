@@ -1,20 +1,23 @@
 
 from tespy.networks import Network
-from tespy.connections import  Ref
 
 from simodin import interface as link
 from . import steam_network_model as snwm
+from . import properties as props
+from . import results
+from . import stats
 
-from CoolProp.CoolProp import PropsSI
 import numpy as np 
-import matplotlib.pyplot as plt
-from fluprodia import FluidPropertyDiagram
 
 
 import copy
 import logging
+import os
+import tempfile
+import time
 
 logger = logging.getLogger(__name__)
+
 class steam_net(link.SimModel):
     """
     Class to implement a steam distribution model for conventional steam networks. The model is based on the
@@ -135,8 +138,33 @@ class steam_net(link.SimModel):
         self.alloc_ex=0
         self.E_bpt =0
         self.E_hs=0
+        self.record = results.empty_record()
 
+        self.stats = stats.solver_stats()
         self.converged = False
+        self.warm_start = None # network state of a solved scenario used as starting values, see snwm.network_state
+        self.converged_state = None
+        self.use_templates = True # start from the converged template of the topology, see snwm.create_steam_net_from_template
+        self.result_cache = None # cache.result_cache to look up and store results by parameters
+        self.from_cache = False # True if the results were read from the result cache, the network is not solved then
+        self.design_path = None # design point of the offdesign solves, see calculate_design
+        self._design_dir = None # temporary directory of the design point if no path is given
+        # solver settings, see snwm.solve. Solves that did not converge after probe_iter 
+        # iterations are aborted if the residuals diverge. The standard solve is only probed 
+        # if probe_iter is set (e.g. for warm started scenarios of a batch), the retries of 
+        # the recovery ladder with retry_probe_iter:
+        self.max_iter = 50
+        self.probe_iter = None
+        self.retry_probe_iter = snwm.PROBE_ITER
+        # budget of all solves of one calculate_model, the time in s is not limited by default:
+        self.max_total_iter = 4 * self.max_iter
+        self.max_time = None
+        self._iteration_limit = None
+        self._deadline = None
+        self.solve_options = {}
+        self.guesses = None # starting values applied after the warm start, see snwm.alternative_guesses
+        self.converged_params = None
+        self.design_params = None
         self._init_mains()
         #self._calc_mains()
         self.model= Network()
@@ -156,23 +184,107 @@ class steam_net(link.SimModel):
 
         self._validate_params()
         self._calc_mains()
-        i=0
-        while i < 3:
-            try:
-                snwm.create_steam_net(self)
-            except Exception as e:
-                logger.info(f'Calculation failed: {e}')
-                raise Exception(f'Calculation failed: {e}')
-            else:
-                self.converged=True
-                self._result()
-                break
-
-            i+=1
+        self.from_cache = False
+        if self.result_cache is not None:
+            cached = self.result_cache.get(self._cache_params())
+            if cached is not None:
+                self.record, self.cond_inj, self.trap = cached
+                self._set_result_attributes()
+                self.model = Network()
+                self.converged = True
+                self.from_cache = True
+                return
+        failures = []
+        if self.max_total_iter:
+            self._iteration_limit = self.stats.summary()['iterations'] + self.max_total_iter
+        self._deadline = time.perf_counter() + self.max_time if self.max_time else None
+        try:
+            for step, attempt in self._recovery_ladder(failures):
+                try:
+                    attempt()
+                except Exception as e:
+                    logger.info(f'Calculation failed ({step}): {e}')
+                    failures.append((step, e))
+                    self.model = Network()
+                    if isinstance(e, snwm.BudgetError):
+                        break
+                else:
+                    if step != 'standard':
+                        logger.info(f'Calculation recovered by {step}.')
+                    self.converged=True
+                    self.converged_state = snwm.network_state(self.model)
+                    self.converged_params = copy.deepcopy(self.params)
+                    self._result()
+                    if self.result_cache is not None:
+                        self.result_cache.put(self._cache_params(), self.record, self.cond_inj, self.trap)
+                    return
+        finally:
+            self._iteration_limit = None
+            self._deadline = None
+        raise Exception('Steam net calculation failed. Check the parameter and try again! '
+                        + '; '.join(f'{step}: {e}' for step, e in failures))
+
+    def _recovery_ladder(self, failures):
+        """
+        Attempts of calculate_model in order: the standard calculation, alternative 
+        starting values, a relaxed solve with more iterations and a continuation from 
+        the last converged parameters (or the defaults). The retries are aborted after 
+        `retry_probe_iter` iterations if they diverge. The relaxed solve is skipped if all 
+        attempts before diverged, more iterations do not help then. All attempts share the 
+        budget of `max_total_iter` iterations and `max_time` seconds.
+        """
+        if self.use_templates:
+            yield 'standard', lambda: snwm.create_steam_net_from_template(self)
         else:
-            raise Exception('Steam net calculation failed. Check the parameter and try again!')
-        
-        #self.define_flows()
+            yield 'standard', lambda: snwm.create_steam_net(self)
+        for i, guesses in enumerate(snwm.alternative_guesses(self), start=1):
+            yield f'initial guesses {i}', lambda guesses=guesses: self._with_attrs(
+                snwm.create_steam_net, guesses=guesses, warm_start=None, probe_iter=self.retry_probe_iter)
+        if failures[1:] and all(isinstance(e, snwm.DivergenceError) for _, e in failures[1:]):
+            logger.info('Relaxed solve skipped, all alternative starting values diverged.')
+        else:
+            yield 'relaxed solve', lambda: self._with_attrs(
+                snwm.create_steam_net, probe_iter=self.retry_probe_iter, max_iter=2 * self.max_iter,
+                solve_options={**self.solve_options, 'robust_relax': True})
+        yield 'continuation', lambda: self._with_attrs(
+            lambda model: model._continuation(), probe_iter=self.retry_probe_iter)
+
+    def _with_attrs(self, func, **attrs):
+        """
+        Call func(self) with temporarily changed attributes.
+        """
+        old = {key: getattr(self, key) for key in attrs}
+        for key, value in attrs.items():
+            setattr(self, key, value)
+        try:
+            func(self)
+        finally:
+            for key, value in old.items():
+                setattr(self, key, value)
+
+    def _continuation(self, steps=4):
+        """
+        Solve the last converged parameters (or the defaults) and move the numeric 
+        parameters in steps to the current parameters with :meth:`recalculate_model`.
+        """
+        target = copy.deepcopy(self.params)
+        start = self.converged_params or {name: parameter.default for name, parameter in self.parameters.items()}
+        numeric = [key for key, value in target.items()
+                   if isinstance(value, (int, float)) and not isinstance(value, bool) 
+                   and isinstance(start.get(key), (int, float)) and start[key] != value]
+        if not numeric:
+            raise Exception('No converged parameters to start the continuation from')
+        try:
+            self.params = {**copy.deepcopy(target), **{key: start[key] for key in numeric}}
+            self._validate_params()
+            self._calc_mains()
+            snwm.create_steam_net(self)
+            for t in np.linspace(0, 1, steps + 1)[1:]:
+                self.params.update({key: start[key] + t * (target[key] - start[key]) for key in numeric})
+                self.recalculate_model()
+        finally:
+            self.params = target
+            self._calc_mains()
     
     
     def define_flows(self):
@@ -184,12 +296,16 @@ class steam_net(link.SimModel):
         if not self.converged:
             self.calculate_model()
 
+        # the flows read from the numeric result record of _result, the units are parsed once:
+        ureg = self.model.units.ureg
+        self._flow_units = {name: ureg.parse_units(unit) for name, (_, _, unit) in results.FLOW_SCHEMA.items()}
+
         self.technosphere={
             'steam generation': link.technosphere_edge(
                 name='steam generation',
                 source= None,
                 target=self,
-                amount= lambda:self.model.get_conn("e_boil").E._val*self.model.units.ureg.second ,
+                amount= lambda:self._flow_amount('steam generation'),
                 type= link.technosphereTypes.input,
                 description= f'Steam generation for high pressure steam of 100 bar in large chemical plants. Without any distribution losses. If distribution losses are assumed in original dataset, correct them in this flow.',
                 default_name='heat production, natural gas, at industrial furnace >100kW'
@@ -198,7 +314,7 @@ class steam_net(link.SimModel):
                 name='electricity grid',
                 source= None,
                 target=self,
-                amount= lambda:self.model.get_conn("e_pump").E._val *self.model.units.ureg.second ,
+                amount= lambda:self._flow_amount('electricity grid'),
                 type= link.technosphereTypes.input,
                 description= 'Electricity from grid, medium voltage.',
                 default_name= 'market for electricity, medium'
@@ -207,19 +323,18 @@ class steam_net(link.SimModel):
                 name='electricity substitution',
                 source= self,
                 target= None,
-                amount= lambda:-self.model.get_conn("e_turb_grid").E._val*self.model.units.ureg.second ,
+                amount= lambda:self._flow_amount('electricity substitution'),
                 type= link.technosphereTypes.substitution,
                 default_name= 'market for electricity, medium'),
             'distributed steam':link.technosphere_edge(
                 name='distributed steam',
                 source= self,
                 target = None,
-                amount= lambda:(self.model.get_conn("e_heat_sink").E._val*self.model.units.ureg.second).to('megajoule'),
+                amount= lambda:self._flow_amount('distributed steam'),
                 functional = True,
                 reference = True,
                 type= link.technosphereTypes.product,
-                allocationfactor=lambda:((self.model.get_comp('hex heat sink').Q._val/
-                                  (self.model.get_comp('network condensation').Q._val +self.model.get_comp('hex heat sink').Q._val)).m),
+                allocationfactor=lambda:results.allocation_factors(self.record)['distributed steam'],
                 model_unit='MJ',
                 description='Distributed steam at condenser. Incl. distribution losses and multifunctionality ' \
                 'due to electricity generation in back pressure turbine taken into account.'),
@@ -227,12 +342,11 @@ class steam_net(link.SimModel):
                 name='network steam',
                 source= self,
                 target = None,
-                amount= lambda:(self.model.get_conn("e_nw_heat_sink").E._val*self.model.units.ureg.second).to('megajoule'),
+                amount= lambda:self._flow_amount('network steam'),
                 functional = True,
                 reference = False,
                 type= link.technosphereTypes.product,
-                allocationfactor=lambda:((self.model.get_comp('network condensation').Q._val/
-                                  (self.model.get_comp('network condensation').Q._val +self.model.get_comp('hex heat sink').Q._val)).m),
+                allocationfactor=lambda:results.allocation_factors(self.record)['network steam'],
                 model_unit='MJ',
                 description='Distributed steam at network.')
             
@@ -242,197 +356,152 @@ class steam_net(link.SimModel):
             name= 'steam leak',
             source= self,
             target= None,
-            amount= lambda:(self.model.get_conn("c_leak").m._val*
-                     self.model.units.ureg.second).to('tonne').m *self.model.units.ureg('m^3'),
+            amount= lambda:self._flow_amount('steam leak'),
             default_code= '51254820-3456-4373-b7b4-056cf7b16e01'
             )}
         
 
+    def _cache_params(self):
+        return {**self.params, 'desuperheat_steam': self.desuperheat_steam}
+
+    def _flow_amount(self, name):
+        return results.flow_amount(self.record, name) * self._flow_units[name]
+
     def recalculate_model(self, **params):
         """
+        Recalculate the model with changed parameters without creating the network again.
+        The condensate injection or condensate trap is added or removed in place if the 
+        changed parameters require another topology. 
         """
+        if len(self.model.conns) == 0:
+            self.calculate_model()
+            return
+        self._validate_params()
         self._calc_mains()
-        try:
-            self.change_parameters()
-        except Exception as e:
-            raise Exception(e)
+        self.change_parameters()
 
         self.converged = False
         try:
-            self.model.solve('design')
+            snwm.solve(self, 'recalculation')
         except Exception as e:
-            raise Exception(e)
+            if snwm.current_topology(self) == 'plain':
+                raise Exception(e)
+            # the previous topology can not be solved with the new parameters:
+            logger.info(f'Recalculation failed, retry without {snwm.current_topology(self)}: {e}')
+            snwm.set_topology(self, 'plain')
+            snwm.set_parameters(self)
+            snwm.solve(self, 'recalculation')
+        snwm.update_topology(self, 'recalculation')
         self._result()
         #self.calculate_impact()
         self.converged=True
+        self.converged_state = snwm.network_state(self.model)
+        self.converged_params = copy.deepcopy(self.params)
         self.old_nw = self.model
 
 
-    def change_parameters(self):
-        # makeup_factor:
-
-        c1_6 = self.model.get_conn('c1_6')
-        c1_4 = self.model.get_conn('c1_4')
-        muw= self.model.get_conn('muw')
-        
-        muw2=self.model.get_conn('muw2')
-
-        self.model.get_comp('steam pipe').set_attr(
-            Tamb = self.params['Tamb'], 
-            L = self.params['pipe_length'],
-            insulation_thickness= self.params['insulation_thickness'],
-            wind_velocity=self.params['wind_velocity'],
-            )
-        self.model.get_comp('condensate pipe').set_attr(
-            Tamb = self.params['Tamb'], 
-            L = self.params['pipe_length'],
-            insulation_thickness= self.params['insulation_thickness'],
-            wind_velocity=self.params['wind_velocity'],
-            )
-        
-        self.model.get_comp('hex heat sink').set_attr(Q=-self.params['heat'])
-
-        #muw
-        muw.set_attr(m=Ref(c1_6, self.params['makeup_factor'], 0),)
-        muw2.set_attr(T= self.params['Tamb'])
+    def calculate_design(self, path=None):
+        """
+        Calculate the model in design mode at the current (nominal) parameters and store
+        the design point for :meth:`calculate_offdesign`. The pipe diameters and the 
+        characteristics of turbine and pumps are fixed to the design afterwards.
 
-        #leakage_factor:
-        self.model.get_conn('c_leak').set_attr(m=Ref(c1_4, self.params['leakage_factor'], 0))
+        Parameters
+        ----------
+        path : str, optional
+            File of the design point. Defaults to a file in a temporary directory that 
+            is removed with the model or by the next calculate_design.
+        """
+        # the network is needed, so the result cache is not used:
+        result_cache, self.result_cache = self.result_cache, None
+        try:
+            self.calculate_model()
+        finally:
+            self.result_cache = result_cache
+        if self._design_dir is not None:
+            self._design_dir.cleanup()
+            self._design_dir = None
+        if path is None:
+            self._design_dir = tempfile.TemporaryDirectory(prefix='steam_net_design_')
+            path = os.path.join(self._design_dir.name, 'design.json')
+        self.design_path = snwm.save_design(self, path)
+        self.design_params = copy.deepcopy(self.params)
+        self.design_main_pressure = self.main_pressure
+        snwm.set_offdesign(self)
+
+    def calculate_offdesign(self):
+        """
+        Calculate the part load or ambient variation of the current parameters with the 
+        plant of :meth:`calculate_design`, e.g. after changing heat, heat_capacity_pipe_network, 
+        Tamb or wind_velocity. The topology of the design is kept.
+        """
+        if self.design_path is None:
+            raise ValueError('No design point. Call calculate_design first.')
+        self._validate_params()
+        self._calc_mains()
+        for key in ['mains', 'max_pressure', 'pipe_length']:
+            if self.params[key] != self.design_params[key]:
+                raise ValueError(f'{key} can not be changed in offdesign, calculate a new design.')
+        if self.main_pressure != self.design_main_pressure:
+            raise ValueError('The needed temperature requires another main than the design, calculate a new design.')
+        self.change_parameters()
+        self.converged = False
+        snwm.solve(self, 'offdesign', 'offdesign', design_path=self.design_path)
+        self._result()
+        self.converged = True
+        self.converged_state = snwm.network_state(self.model)
 
-        #needed pressure:
-        self.model.get_conn('c1_1').set_attr(p = self.needed_pressure)
+    def change_parameters(self):
+        """
+        Update all parameter dependent attributes of the created network.
+        """
+        snwm.set_parameters(self)
 
     def _result(self):
-        c_leak = self.model.get_conn('c_leak')
-        c1_4 = self.model.get_conn('c1_4')
-        c1_5 = self.model.get_conn('c1_5')
-        c1_6 = self.model.get_conn('c1_6')
-        
-        c1_1 = self.model.get_conn('c1_1')
-        c0_2 = self.model.get_conn('c0_1')
-        c0_3 = self.model.get_conn('c0_3')
-        muw= self.model.get_conn('muw')
-        muw2=self.model.get_conn('muw2')
-        
-        boiler=self.model.get_conn("e_boil")
-        hex_heat_sink=self.model.get_conn("e_heat_sink")
-        net_heat_sink=self.model.get_conn("e_nw_heat_sink")
-        turbine_grid = self.model.get_conn('e_turb_grid')
-
-        leakage_loss= c_leak.m._val *(c_leak.h._val - muw2.h._val)
-        pipe_loss = self.model.get_conn('e_pi_sink').E._val 
-        #(abs(c1_4.m._val *c1_5.h._val - c1_4.m._val * c1_4.h._val )
-        #            + abs(c0_2.m._val * c0_2.h._val - c0_3.m._val * c0_3.h._val)
-        #)
-        self.elec_factor= abs((turbine_grid.E._val/hex_heat_sink.E._val).to_base_units().m )
-        self.boiler_factor = abs((boiler.E._val/hex_heat_sink.E._val).to_base_units().m)
-        self.diss_losses=(abs(pipe_loss)/
-                     (abs(boiler.E._val)-abs(self.model.get_conn('e_turb').E._val)+self.model.get_conn('e_pump').E._val)
-                     ).to_base_units().m
-        self.leak_losses=(abs(leakage_loss)/
-                     (abs(boiler.E._val)-abs(self.model.get_conn('e_turb').E._val)+self.model.get_conn('e_pump').E._val)
-                     ).to_base_units().m
-        
-        self.losses=1-(
-            (self.model.get_conn('e_heat_sink').E._val + 
-             self.model.get_conn('e_nw_heat_sink').E._val
-             )/
-            (self.model.get_conn('e_boil').E._val- self.model.get_conn('e_turb').E._val +self.model.get_conn('e_pump').E._val) 
-            )
-        
-        self.watertreatment_factor = abs(muw.m._val/hex_heat_sink.E._val).m
-        #calc exergy reduction:
-        t_amb= self.model.units.ureg.Quantity(self.params['Tamb'],'degC').to('kelvin')
-        self.E_bpt=((c1_5.h._val -c1_6.h._val) 
-                    - t_amb * (c1_5.s._val - c1_6.s._val))* c1_5.m._val
-
-        if self.cond_inj:
-            cond_5 = self.model.get_conn('cond_5')
-            cond_1 = self.model.get_conn('cond_1')
-            self.E_hs= ((cond_1.h._val -cond_5.h._val) 
-                        - t_amb * (cond_1.s._val - cond_5.s._val))* cond_5.m._val
-        else:
-            self.E_hs= ((c0_2.h._val -c1_1.h._val) 
-                        - t_amb * (c0_2.s._val - c1_1.s._val))* c1_1.m._val
-        self.E_nw_hs= ((self.model.get_conn('cnw2').h._val -self.model.get_conn('cnw1').h._val) 
-                        - t_amb * (self.model.get_conn('cnw2').s._val - self.model.get_conn('cnw1').s._val))* self.model.get_conn('cnw1').m._val
-        
-        self.alloc_ex = (self.E_bpt /(self.E_hs + self.E_bpt + self.E_nw_hs)).m
+        with self.stats.timer('postprocessing'):
+            states = results.network_states(self.model, self.cond_inj)
+            self.record = results.postprocess(states, self.params['Tamb'])[0]
+        self._set_result_attributes()
+
+    def _set_result_attributes(self):
+        for key in ['elec_factor', 'boiler_factor', 'losses', 'diss_losses', 'leak_losses',
+                    'watertreatment_factor', 'alloc_ex', 'E_bpt', 'E_hs', 'E_nw_hs']:
+            setattr(self, key, float(self.record[key]))
 
     def _calc_pressure(self):
-        self.needed_pressure= PropsSI('P','Q',0,'T',self.params['needed_temperature']+273,'IF97::water')*1E-5
+        with self.stats.timer('properties'):
+            self.needed_pressure= props.saturation_pressure(self.params['needed_temperature']+273)*1E-5
         
     def _init_mains(self):
-        self.params['mains'].sort()
+        self.params['mains'] = sorted(self.params['mains']) # new list, the default list may be shared
         self.main_dict={}
-        for pres in self.params['mains']:
-            self.main_dict[str(pres)] = {}
-            self.main_dict[str(pres)]['pressure'] = pres
-            self.main_dict[str(pres)]['temperature'] =PropsSI('T', 'P', pres*1E5, 'Q', 1, 'IF97::water') - 273.15 # in °C
-            self.main_dict[str(pres)]['impact'] = None
+        with self.stats.timer('properties'):
+            for pres in self.params['mains']:
+                self.main_dict[str(pres)] = {}
+                self.main_dict[str(pres)]['pressure'] = pres
+                self.main_dict[str(pres)]['temperature'] =props.saturation_temperature(pres*1E5) - 273.15 # in °C
+                self.main_dict[str(pres)]['impact'] = None
     def _calc_mains(self): 
-        self.params['mains'].sort()
+        self.params['mains'] = sorted(self.params['mains']) # new list, the default list may be shared
         self._calc_pressure()
-        s_superheating_max_pressure=  PropsSI('S','P',self.params['mains'][0]*1E5,'Q',1,'IF97::water') 
-        self.h_superheating_max_pressure=  PropsSI('H','P',self.params['max_pressure']*1E5,'S',s_superheating_max_pressure,'IF97::water') *1E-3
+        with self.stats.timer('properties'):
+            self.h_superheating_max_pressure=  props.superheating_enthalpy(self.params['mains'][0]*1E5, self.params['max_pressure']*1E5) *1E-3
         if self.needed_pressure*1.05 > self.params['mains'][-1]:
-            print('needed pressure larger than net pressure!')
+            logger.warning('needed pressure larger than net pressure!')
         self.main_pressure = min((x for x in self.params['mains'] if x >= self.needed_pressure*1.01), default=None) 
 
-        for pres in self.params['mains']:
-            self.main_dict[str(pres)]['pressure'] = pres
-            self.main_dict[str(pres)]['temperature'] =PropsSI('T', 'P', pres*1E5, 'Q', 1, 'IF97::water') - 273.15 # in °C
+        with self.stats.timer('properties'):
+            for pres in self.params['mains']:
+                self.main_dict[str(pres)]['pressure'] = pres
+                self.main_dict[str(pres)]['temperature'] =props.saturation_temperature(pres*1E5) - 273.15 # in °C
 
     def plot_Ts(self):
-        # Initial Setup
-        diagram = FluidPropertyDiagram('water')
-        diagram.set_unit_system(T='°C', p='bar', h='kJ/kg')
-
-        # Storing the model result in the dictionary
-        result_dict = {}
-        result_dict.update(
-            {cp.label: cp.get_plotting_data()[1] for cp in self.model.comps['object']
-            if cp.get_plotting_data() is not None})
-
-        # Iterate over the results obtained from TESPy simulation
-        for key, data in result_dict.items():
-            # Calculate individual isolines for T-s diagram
-            result_dict[key]['datapoints'] = diagram.calc_individual_isoline(**data)
-
-        # Create a figure and axis for plotting T-s diagram
-        fig, ax = plt.subplots(1, figsize=(20, 10))
-        isolines = {
-            'Q': np.linspace(0, 1, 2),
-            'p': np.array([1, 2, 5, 10, 20, 50, 100, 300]),
-            'v': np.array([]),
-            'h': np.arange(500, 3501, 500)
-        }
+        """
+        T-s diagram of the calculated model. The isolines are calculated once and 
+        reused, see :func:`ts_diagram.diagram`.
+        """
+        # plotting libraries are only imported when needed:
+        from . import ts_diagram
 
-        # Set isolines for T-s diagram
-        diagram.set_isolines(**isolines)
-        diagram.calc_isolines()
-
-        # Draw isolines on the T-s diagram
-        diagram.draw_isolines(fig, ax, 'Ts', x_min=1000, x_max=8000, y_min=20, y_max=600)
-
-        # Adjust the font size of the isoline labels
-        for text in ax.texts:
-            text.set_fontsize(10)
-
-        # Plot T-s curves for each component
-        for key in result_dict.keys():
-            datapoints = result_dict[key]['datapoints']
-            _ = ax.plot(datapoints['s'], datapoints['T'], color='#ff0000', linewidth=2)
-            _ = ax.scatter(datapoints['s'][0], datapoints['T'][0], color='#ff0000')
-
-        # Set labels and title for the T-s diagram
-        ax.set_xlabel('Entropy, s in J/kgK', fontsize=16)
-        ax.set_ylabel('Temperature, T in °C', fontsize=16)
-        ax.set_title('T-s Diagram of steam net', fontsize=20)
-
-        # Set font size for the x-axis and y-axis ticks
-        ax.tick_params(axis='x', labelsize=12)
-        ax.tick_params(axis='y', labelsize=12)
-        plt.tight_layout()
-        return fig
+        return ts_diagram.draw([ts_diagram.process_lines(self)])
     
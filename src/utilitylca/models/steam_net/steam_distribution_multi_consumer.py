@@ -0,0 +1,169 @@
+from simodin import interface as link
+from .steam_distribution_conventional import steam_net
+from . import steam_network_model as snwm
+from . import properties as props
+from . import results
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class steam_net_multi(steam_net):
+    """
+    Steam distribution model of a conventional steam network with several process heat sinks.
+    All consumers are calculated in one network and solve. Each consumer has its own needed
+    temperature, heat, main and pipe length, the results are allocated per consumer by 
+    transferred heat. The parameters `needed_temperature` and `heat` of :class:`steam_net`
+    are not used.
+
+    Parameters
+        ----------
+        Name : str
+            Name of the model.
+        **parameter
+            Parameters of the model. See parameters section for details.
+    
+    """
+
+    description='This SiModIn model can be used to calculate the temperature dependent impact of process heat from steam ' \
+    'for several consumers of one steam network. ' \
+    'The model considers physical, dissipative and pressure losses in the steam network.'
+
+    parameters={
+        **steam_net.parameters,
+        'consumers':link.parameter(
+            name='consumers',
+            default=[{'name': 'consumer 1', 'needed_temperature': 180, 'heat': 1e6},
+                     {'name': 'consumer 2', 'needed_temperature': 140, 'heat': 5e5}],
+            description='Consumers of the steam net as list of dicts with the keys name, needed_temperature (°C) ' \
+            'and heat (W) and the optional keys main (bar, default: lowest main above the needed pressure) ' \
+            'and pipe_length (m, default: pipe_length).',),
+    }
+
+    def __init__(self):
+        # the parameters are set by the __init__ wrapper of SimModel.__init_subclass__. The 
+        # inherited __init__ of steam_net is wrapped already and must not be wrapped twice.
+        pass
+
+    def init_model(self, **params):
+        """
+        Initialising of the model.
+        
+        """
+        super().init_model(**params)
+        self.consumers = []
+        self.consumer_records = None
+        self._layout = None
+
+    def _validate_params(self):
+        if self.params['max_pressure'] < self.params['mains'][-1]:
+            raise ValueError('max pressure must be larger than the highest main pressure')
+        if not self.params['consumers']:
+            raise ValueError('At least one consumer is needed')
+        names = [consumer['name'] for consumer in self.params['consumers']]
+        if len(set(names)) != len(names) or 'network' in names:
+            raise ValueError('Consumer names must be unique and must not be "network"')
+        if self.params['heat_capacity_pipe_network'] < sum(consumer['heat'] for consumer in self.params['consumers']):
+            raise ValueError('Heat capacity of the pipe network must be larger than the transferred heat of all consumers')
+
+    def _calc_mains(self):
+        super()._calc_mains()
+        self._calc_consumers()
+
+    def _calc_consumers(self):
+        """
+        Complete the consumers with their needed pressure, main and pipe length.
+        """
+        self.consumers = []
+        for consumer in self.params['consumers']:
+            consumer = {'pipe_length': self.params['pipe_length'], **consumer}
+            with self.stats.timer('properties'):
+                consumer['needed_pressure'] = props.saturation_pressure(consumer['needed_temperature']+273)*1E-5
+            if consumer.get('main') is None:
+                consumer['main'] = min((x for x in self.params['mains'] if x >= consumer['needed_pressure']*1.01), 
+                                       default=None)
+            if consumer['main'] not in self.params['mains']:
+                raise ValueError(f"No main found for consumer {consumer['name']}")
+            if consumer['needed_pressure'] > consumer['main']:
+                raise ValueError(f"Needed pressure of consumer {consumer['name']} larger than its main pressure")
+            self.consumers.append(consumer)
+
+    def _consumer_layout(self):
+        return [(consumer['name'], consumer['main'], snwm.condensate_valve(self, consumer)) 
+                for consumer in self.consumers]
+
+    def calculate_model(self, **params):
+        """
+        Method to calculate the steam net model with all consumers.
+        The result cache of :class:`steam_net` is not used.
+        """
+        self._validate_params()
+        self._calc_mains()
+        try:
+            snwm.create_multi_consumer_net(self)
+        except Exception as e:
+            logger.info(f'Calculation failed: {e}')
+            raise Exception(f'Calculation failed: {e}')
+        self._layout = self._consumer_layout()
+        self.converged=True
+        self.converged_state = snwm.network_state(self.model)
+        self._result()
+
+    def recalculate_model(self, **params):
+        """
+        Recalculate the model with changed parameters without creating the network again.
+        The network is created again if a consumer was added or removed or changed its main 
+        or the condensate of a consumer changes between pump and valve.
+        """
+        self._validate_params()
+        self._calc_mains()
+        if len(self.model.conns) == 0 or self._consumer_layout() != self._layout:
+            self.calculate_model()
+            return
+        self.change_parameters()
+        self.converged = False
+        snwm.solve(self, 'recalculation')
+        self._result()
+        self.converged=True
+        self.converged_state = snwm.network_state(self.model)
+
+    def change_parameters(self):
+        """
+        Update all parameter dependent attributes of the created network.
+        """
+        snwm.set_multi_consumer_parameters(self)
+
+    def _result(self):
+        with self.stats.timer('postprocessing'):
+            self.record, self.consumer_records = results.multi_consumer_postprocess(
+                self.model, self.consumers, self.params['Tamb'])
+        self._set_result_attributes()
+
+    def define_flows(self):
+        """
+        Define the technosphere and biosphere flows of the model based on the calculated model. 
+        The flow 'distributed steam' of :class:`steam_net` is replaced by one functional flow 
+        'distributed steam <consumer name>' per consumer, the first consumer is the reference flow.
+        """
+        super().define_flows()
+        del self._technosphere['distributed steam']
+        for i, consumer in enumerate(self.consumers):
+            name = f"distributed steam {consumer['name']}"
+            self._technosphere[name] = link.technosphere_edge(
+                name=name,
+                source= self,
+                target = None,
+                amount= lambda i=i: self._consumer_flow_amount(i),
+                functional = True,
+                reference = i == 0,
+                type= link.technosphereTypes.product,
+                allocationfactor=lambda i=i: float(self.consumer_records[i]['allocationfactor']),
+                model_unit='MJ',
+                description=f"Distributed steam at condenser of consumer {consumer['name']} at "
+                f"{consumer['needed_temperature']} °C. Incl. distribution losses and multifunctionality " \
+                'due to electricity generation in back pressure turbine taken into account.')
+
+    def _consumer_flow_amount(self, i):
+        _, factor, _ = results.FLOW_SCHEMA['distributed steam']
+        return factor * float(self.consumer_records[i]['E_heat_sink']) * self._flow_units['distributed steam']
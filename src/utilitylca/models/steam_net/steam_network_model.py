@@ -7,15 +7,138 @@ from tespy.components import (
 )
 
 from tespy.connections import Connection, Ref, PowerConnection
+from tespy.networks import Network
+import inspect
 import logging
+import math
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# converged network states of the first solved network of each topology, 
+# see create_steam_net_from_template. The states are never changed after they are stored:
+_templates = {}
+_templates_lock = threading.Lock()
+
+# starting value of the variable pipe diameters in m:
+PIPE_D0 = 0.2
+
+def network_state(network):
+    """
+    Return the state (p, h, m) of all material connections of a solved network by connection label.
+    """
+    state = {}
+    for conn in network.conns['object']:
+        if not hasattr(conn, 'h'):
+            continue
+        state[conn.label] = {'p': float(conn.p.val), 'h': float(conn.h.val), 'm': float(conn.m.val)}
+    return state
+
+def apply_state(network, state, conns=None):
+    """
+    Use a state from :func:`network_state` as starting values for the next solve.
+    Only connections with a matching label are changed, a state may contain only some of p, h and m. 
+    """
+    if conns is None:
+        conns = [conn for conn in network.conns['object'] if hasattr(conn, 'h')]
+    for conn in conns:
+        if conn.label in state:
+            conn.set_attr(**{f'{key}0': value for key, value in state[conn.label].items()})
+
 def create_steam_net(steam_lca):
-    
-    logging.basicConfig(filename='logs.log', 
-                        filemode="w",
-                        level=logging.INFO)
+    """
+    Create the steam net and solve it from the initial guesses. Needs up to three solves.
+    """
+    _build_network(steam_lca)
+    if steam_lca.warm_start:
+        apply_state(steam_lca.model, steam_lca.warm_start)
+    if getattr(steam_lca, 'guesses', None):
+        apply_state(steam_lca.model, steam_lca.guesses)
+    solve(steam_lca, 'first')
+
+    #2. Run: 
+    muw = steam_lca.model.get_conn('muw')
+    muw.set_attr(T=None)
+    muw.set_attr(T=Ref(steam_lca.model.get_conn('c0_3'), 1, -20))
+    solve(steam_lca, 'second')
+
+    #3. Run: implement condensate injection or condensate trap if needed:
+    update_topology(steam_lca, 'third')
+
+
+def template_topology(steam_lca):
+    """
+    Topology of the template a new network starts from: the topology of the warm start 
+    if it has a condensate trap, 'cond_inj' if the steam is desuperheated and 'plain' otherwise.
+    """
+    if steam_lca.warm_start and 'c_trap_in' in steam_lca.warm_start:
+        return 'trap'
+    return 'cond_inj' if steam_lca.desuperheat_steam else 'plain'
+
+
+def create_steam_net_from_template(steam_lca):
+    """
+    Create the steam net in the topology of a template (see :func:`template_topology`) and 
+    solve it once, starting from the converged state of the template. Falls back to the 
+    plain template if there is no template of the topology yet and to :func:`create_steam_net` 
+    if no template is available or the solve fails. 
+    The first converged network of each topology (plain, cond_inj, trap) is stored as template.
+    """
+    with _templates_lock:
+        topology = template_topology(steam_lca)
+        if topology not in _templates:
+            topology = 'plain'
+        template = _templates.get(topology)
+    if template is None:
+        create_steam_net(steam_lca)
+    else:
+        try:
+            _build_network(steam_lca)
+            steam_lca.model.get_conn('muw').set_attr(
+                T=Ref(steam_lca.model.get_conn('c0_3'), 1, -20))
+            set_topology(steam_lca, topology)
+            apply_state(steam_lca.model, template)
+            if steam_lca.warm_start:
+                apply_state(steam_lca.model, steam_lca.warm_start)
+            solve(steam_lca, 'template')
+            update_topology(steam_lca, 'template topology')
+        except Exception as e:
+            logger.info(f'Solve from {topology} template failed: {e}')
+            steam_lca.model = Network()
+            create_steam_net(steam_lca)
+    state = network_state(steam_lca.model)
+    with _templates_lock:
+        _templates.setdefault(current_topology(steam_lca), state)
+
+
+def alternative_guesses(steam_lca):
+    """
+    Alternative starting values of the plain topology for retries of a failed solve, 
+    as states for :func:`apply_state` (p in bar, h in kJ/kg, m in kg/s).
+    """
+    params = steam_lca.params
+    # mass flows from the heat and an enthalpy of evaporation of about 2000 kJ/kg:
+    m_hs = params['heat'] / 2E6
+    m_nw = (params['heat_capacity_pipe_network'] - params['heat']) / 2E6
+    m_total = (m_hs + m_nw) * (1 + params['leakage_factor'] + params['makeup_factor'])
+    mass_flows = {
+        'c1_6': {'m': m_total}, 'c1_5': {'m': m_total}, 'c0_7': {'m': m_total},
+        'c1_1': {'m': m_hs}, 'c0_1': {'m': m_hs}, 'cnw1': {'m': m_nw}, 'cnw2': {'m': m_nw},
+    }
+    # steam close to saturation in the network and saturated condensate:
+    saturated = {
+        'c1_5': {'h': 2800}, 'c1_4': {'h': 2780}, 'c1_1': {'h': 2760},
+        'c0_1': {'h': 500}, 'cnw2': {'h': 600}, 'c0_5': {'p': steam_lca.main_pressure},
+    }
+    return [mass_flows, saturated, {label: {**mass_flows.get(label, {}), **saturated.get(label, {})}
+                                    for label in {**mass_flows, **saturated}}]
+
+
+def _build_network(steam_lca):
+    """
+    Create components and connections of the plain topology and set all attributes.
+    """
     steam_lca.cond_inj = False
     steam_lca.trap=False
     steam_lca.converged =False
@@ -40,7 +163,6 @@ def create_steam_net(steam_lca):
     
     makeup=Source("Make-up water")
     blowdown= Sink("blowdown wastewater")
-    cond_waste= Sink("pipe condensate wastewater")
     merge = Merge("Makeup water feed", num_in=3)
     
     split= Splitter("remove wastewater")
@@ -48,7 +170,6 @@ def create_steam_net(steam_lca):
     conflation= Merge("conflation condensate to network")
     network_heat_sink = SimpleHeatExchanger('network condensation', dissipative=False)
     valve_cond_nw = Valve('relax_cond_network')
-    valve_cond = Valve('relax_cond')
 
     #create connections:
     c0_7 = Connection(cycl, 'out1', boiler, 'in1', label='c0_7') #c05
@@ -87,76 +208,47 @@ def create_steam_net(steam_lca):
                               muw, wawa, muw2)
     #set attributes:
     boiler.set_attr(pr = 1, power_connector_location="inlet")
-    c1_6.set_attr(fluid={"H2O": 1}, 
-                    h= steam_lca.h_superheating_max_pressure)
+    c1_6.set_attr(fluid={"H2O": 1})
     c0_7.set_attr(p0=steam_lca.main_pressure,)
     bpt.set_attr(eta_s = 0.85, )
-    c1_5.set_attr(p=steam_lca.main_pressure, 
-                 h0=steam_lca.h_superheating_max_pressure, 
-                 )
+    c1_5.set_attr(h0=steam_lca.h_superheating_max_pressure)
     pipe_warm.set_attr(pr=0.95, 
-        Tamb = steam_lca.params['Tamb'], 
-        L=steam_lca.params['pipe_length'], 
         D='var', ks=4.57e-5,
         power_connector_location="outlet",
-        insulation_thickness=steam_lca.params['insulation_thickness'] ,
         insulation_tc= 0.035, pipe_thickness=0.004,material='Steel', 
-        wind_velocity=steam_lca.params['wind_velocity'], 
-        environment_media = steam_lca.params['environment_media']
             ) 
-    c_leak.set_attr(m=Ref(c1_4, steam_lca.params['leakage_factor'], 0))
-    c1_1.set_attr(p = steam_lca.needed_pressure,
-                 h0=steam_lca.h_superheating_max_pressure,
-                 )
-    hex_heat_sink.set_attr(pr=1,
-                           Q=-steam_lca.params['heat'], 
-                           power_connector_location="outlet")
-    
-    mains_sorted = sorted(steam_lca.params['mains'])
-    if steam_lca.main_pressure in mains_sorted:
-        idx = mains_sorted.index(steam_lca.main_pressure)
-        next_main = mains_sorted[idx - 1] if idx - 1 >= 0 else 1.013
-    else:
-        raise ValueError("Main pressure not found in mains list")
-    
-    c0_2.set_attr(p=steam_lca.main_pressure 
-                )
+    c1_1.set_attr(h0=steam_lca.h_superheating_max_pressure)
+    hex_heat_sink.set_attr(pr=1, power_connector_location="outlet")
     pipe_cold.set_attr(pr=0.95, 
-        Tamb = steam_lca.params['Tamb'],
-        L=steam_lca.params['pipe_length'], D='var',  ks=4.57e-5,
+        D='var',  ks=4.57e-5,
         power_connector_location="outlet",
-        insulation_thickness=steam_lca.params['insulation_thickness'] ,
         insulation_tc= 0.035, 
         pipe_thickness=0.004,material='Steel', 
-        wind_velocity= steam_lca.params['wind_velocity'], 
-        environment_media = steam_lca.params['environment_media']
             )
 
+    # starting value of the variable pipe diameters, tespy starts from NaN otherwise:
+    pipe_warm.D.val = PIPE_D0
+    pipe_cold.D.val = PIPE_D0
+
     c0_5.set_attr(p0=steam_lca.needed_pressure,
                 )
     
-    c0_6.set_attr(p=steam_lca.params['max_pressure'], 
-                h0=steam_lca.h_superheating_max_pressure,
-                )
+    c0_6.set_attr(h0=steam_lca.h_superheating_max_pressure)
 
-    muw.set_attr(m=Ref(c1_6, steam_lca.params['makeup_factor'], 0), 
-                    T=steam_lca.params['Tamb'],
-                    fluid={"H2O": 1},  
+    muw.set_attr(fluid={"H2O": 1},  
                     p0=1.013)
     muw2.set_attr(m=Ref(c_leak, 1, 0), 
-                    T=steam_lca.params['Tamb'],
                     fluid={"H2O": 1}, 
                     p0=1.013)
     
-    wawa.set_attr(m=Ref(c1_6, steam_lca.params['makeup_factor'], 0))
     feed_pump.set_attr(eta_s =0.95)
     condensate_pump.set_attr(eta_s=0.95)
-    network_heat_sink.set_attr(pr=1, 
-                               Q=-(steam_lca.params['heat_capacity_pipe_network']-steam_lca.params['heat']),
-                               power_connector_location="outlet",
-                               )
+    network_heat_sink.set_attr(pr=1, power_connector_location="outlet")
     cnw2.set_attr(x=0)
     c0_1.set_attr(x=0)
+    set_parameters(steam_lca)
+    # makeup water temperature is set to ambient temperature for the first run:
+    muw.set_attr(T=steam_lca.params['Tamb'])
     
     # create power connections:
     
@@ -193,62 +285,558 @@ def create_steam_net(steam_lca):
                            e_heat_sink, e_nw_heat_sink,
                            e_pump
     )
-    logger.info('Start first solve')
-    steam_lca.model.solve('design')
 
-    #2. Run: 
+class ConvergenceError(Exception):
+    """
+    A solve of the steam net did not converge or was aborted because it diverged.
+    """
 
-    muw.set_attr(T=None)
-    muw.set_attr(T=Ref(c0_3, 1, -20))
-    logger.info('Start second solve')
-    steam_lca.model.solve('design')
 
-    #3. Run: implement condensate injection:
-   # if superheated inject condensate:
+class DivergenceError(ConvergenceError):
+    """
+    A solve of the steam net was aborted after `probe_iter` iterations because its residuals diverged.
+    """
+
+
+class BudgetError(ConvergenceError):
+    """
+    The iteration or time budget of a calculation is used up, see :meth:`steam_net.calculate_model`.
+    """
+
+
+# iterations after which retries and warm started solves are aborted if they diverge:
+PROBE_ITER = 10
+
+
+def solve_kwargs(network, **kwargs):
+    """
+    Keyword arguments that are supported by the solve of the installed tespy version.
+    """
+    parameters = inspect.signature(network.solve).parameters
+    return {key: value for key, value in kwargs.items() if key in parameters}
+
+
+def diverging(network, window=3, growth=100):
+    """
+    Check the residuals of the last solve: True if they are not finite, grew by more 
+    than `growth` compared to the first iteration or did not decrease over the last `window` iterations.
+    """
+    history = getattr(network, 'residual_history', None)
+    history = [] if history is None else [float(r) for r in history]
+    if not history:
+        return False
+    if not all(math.isfinite(r) for r in history) or history[-1] > growth * history[0]:
+        return True
+    return len(history) > window and min(history[-window:]) >= history[-window - 1]
+
+
+def _solve(steam_lca, phase, mode, **kwargs):
+    logger.info(f'Start {phase} solve')
+    start = time.perf_counter()
+    try:
+        steam_lca.model.solve(mode, **solve_kwargs(steam_lca.model, **kwargs))
+    except Exception as e:
+        steam_lca.stats.record_solve(phase, steam_lca.model, time.perf_counter() - start, error=e)
+        raise
+    return steam_lca.stats.record_solve(phase, steam_lca.model, time.perf_counter() - start)
+
+
+def _budget(steam_lca, max_iter):
+    """
+    Iterations left for the next solve within the budget of the running calculation.
+    """
+    deadline = getattr(steam_lca, '_deadline', None)
+    if deadline is not None and time.perf_counter() > deadline:
+        raise BudgetError('time budget of the calculation used up')
+    limit = getattr(steam_lca, '_iteration_limit', None)
+    if limit is None:
+        return max_iter
+    remaining = limit - steam_lca.stats.summary()['iterations']
+    if remaining <= 0:
+        raise BudgetError('iteration budget of the calculation used up')
+    return min(max_iter, remaining)
+
+
+def solve(steam_lca, phase, mode='design', **kwargs):
+    """
+    Solve the network of the steam net model, by default in design mode. 
+    Further keyword arguments and `steam_lca.solve_options` are passed to the solve of 
+    the network, e.g. `design_path`. The solves are recorded in `steam_lca.stats`.
+
+    The solve runs up to `steam_lca.max_iter` iterations, less if the iteration budget of
+    the calculation is nearly used up. If `steam_lca.probe_iter` is set (e.g. to `PROBE_ITER`
+    for retries and warm started solves), it starts with `probe_iter` iterations and is 
+    aborted if they did not converge and the residuals diverge.
+
+    Raises
+    ------
+    DivergenceError
+        If the residuals diverged after `probe_iter` iterations.
+    BudgetError
+        If the iteration or time budget of the calculation is used up.
+    ConvergenceError
+        If the solve did not converge.
+    """
+    options = {**getattr(steam_lca, 'solve_options', {}), **kwargs}
+    max_iter = _budget(steam_lca, options.pop('max_iter', getattr(steam_lca, 'max_iter', 50)))
+    probe_iter = getattr(steam_lca, 'probe_iter', None)
+    if probe_iter and probe_iter < max_iter:
+        record = _solve(steam_lca, phase, mode, max_iter=probe_iter, **options)
+        if record['converged'] is False:
+            if diverging(steam_lca.model):
+                raise DivergenceError(f'{phase} solve diverged after {probe_iter} iterations')
+            # continue from the last iteration:
+            record = _solve(steam_lca, f'{phase} continued', mode,
+                            max_iter=_budget(steam_lca, max_iter - probe_iter), **options)
+    else:
+        record = _solve(steam_lca, phase, mode, max_iter=max_iter, **options)
+    if record['converged'] is False:
+        raise ConvergenceError(f'{phase} solve did not converge')
+
+
+def save_design(steam_lca, path):
+    """
+    Save the solved network as design point for offdesign solves.
+    """
+    steam_lca.model.save(path)
+    return path
+
+
+def set_offdesign(steam_lca):
+    """
+    Fix the plant of a network solved in design mode for offdesign solves:
+    the pipe diameters keep their design values and the pressure ratio of the pipes 
+    follows from the flow (it is unset, a fixed diameter and pressure ratio would 
+    over-determine the pipe), turbine and pumps use their efficiency characteristics.
+    """
+    for comp in steam_lca.model.comps['object']:
+        if isinstance(comp, Pipe):
+            comp.set_attr(D=float(comp.D.val), pr=None, design=['pr'])
+        elif isinstance(comp, (Turbine, Pump)):
+            comp.set_attr(design=['eta_s'], offdesign=['eta_s_char'])
+
+
+def set_parameters(steam_lca):
+    """
+    Set all parameter dependent attributes of a created steam net. 
+    Works for all topologies, see :func:`set_topology`.
+    """
+    nw = steam_lca.model
+    params = steam_lca.params
+
+    if steam_lca.main_pressure not in params['mains']:
+        raise ValueError("Main pressure not found in mains list")
+
+    c1_4 = nw.get_conn('c1_4')
+    c1_6 = nw.get_conn('c1_6')
+    c1_6.set_attr(h= steam_lca.h_superheating_max_pressure)
+    nw.get_conn('c1_5').set_attr(p=steam_lca.main_pressure)
+    nw.get_conn('c0_2').set_attr(p=steam_lca.main_pressure)
+    nw.get_conn('c0_6').set_attr(p=params['max_pressure'])
+    nw.get_conn('c1_1').set_attr(p = steam_lca.needed_pressure)
+
+    for label in ['steam pipe', 'condensate pipe']:
+        nw.get_comp(label).set_attr(
+            Tamb = params['Tamb'], 
+            L=params['pipe_length'], 
+            insulation_thickness=params['insulation_thickness'] ,
+            wind_velocity=params['wind_velocity'], 
+            environment_media = params['environment_media']
+            )
+    
+    nw.get_comp('hex heat sink').set_attr(Q=-params['heat'])
+    nw.get_comp('network condensation').set_attr(
+        Q=-(params['heat_capacity_pipe_network']-params['heat']))
+
+    #leakage and makeup:
+    nw.get_conn('c_leak').set_attr(m=Ref(c1_4, params['leakage_factor'], 0))
+    nw.get_conn('muw').set_attr(m=Ref(c1_6, params['makeup_factor'], 0))
+    nw.get_conn('c_blowdown').set_attr(m=Ref(c1_6, params['makeup_factor'], 0))
+    nw.get_conn('muw2').set_attr(T=params['Tamb'])
+    if steam_lca.trap:
+        nw.get_conn('muw3').set_attr(T=params['Tamb'])
+
+
+def required_topology(steam_lca):
+    """
+    Return the topology needed for the state of the steam at the end of the steam pipe
+    of the solved network: 'cond_inj' (superheated steam and desuperheating by condensate 
+    injection), 'trap' (wet steam and condensate trap) or 'plain'.
+    """
+    c1_4 = steam_lca.model.get_conn('c1_4')
     if c1_4.x.val in [-1,1] and steam_lca.desuperheat_steam:
-        steam_lca.model.del_conns(c1_1, c0_1)
-        merge_injection = Merge("Injection")
-        dummy_sink2= Sink('dummy sink2')
-        injection_source =Source('injection_source')
-        condensate_split= Splitter("split condensate")
-        
-        c1_1= Connection(valve, 'out1', merge_injection, 'in1', label='c1_1')
-        cond_3 = Connection(injection_source, 'out1', merge_injection, 'in2')
-        cond_5 = Connection(merge_injection, 'out1', hex_heat_sink, 'in1', label= 'cond_5')
-
-        cond_1 = Connection(hex_heat_sink, 'out1', condensate_split, 'in1', label='cond_1')
-        cond_2 = Connection(condensate_split, 'out2', dummy_sink2, 'in1')
-        c0_1 = Connection(condensate_split, 'out1', valve_cond, 'in1', label='c0_1')
-        steam_lca.model.add_conns(cond_1, cond_2, cond_3,cond_5,c1_1,c0_1)
-
-        c1_1.set_attr(p = steam_lca.needed_pressure)
-        cond_1.set_attr(x=0)
-        c0_1.set_attr(m=Ref(c1_1,1,0))
-        cond_3.set_attr(x=0, 
-                        fluid={"H2O": 1}, 
-                        )
-        cond_5.set_attr(x=1)
-        logger.info('Start third solve')
-        steam_lca.model.solve('design')
-        steam_lca.cond_inj =True
+        return 'cond_inj'
     # when steam is not saturated trap condensate (experimental): 
     elif 0< c1_4.x.val <1:
-        merge.set_attr(num_in=4)
-        steam_lca.model.del_conns(c1_2)
-        makeup_trap =Source('trap makeup')
-        cond_trap= DropletSeparator('condensate trap') 
-
-        muw3 = Connection(makeup_trap, 'out1', merge, 'in4', label='muw3')
-        c023= Connection(steam_leak, 'out1', cond_trap, 'in1')
-        c024= Connection(cond_trap, 'out2', valve, 'in1')
-        c_trap_waste = Connection(cond_trap, 'out1', cond_waste, 'in1', 'c_trap_waste ')
-        
-        steam_lca.model.add_conns(c023, c024, c_trap_waste, muw3)
-
-        muw3.set_attr(m=Ref(c_trap_waste, 1, 0), T=steam_lca.params['Tamb'],
-                      fluid={"H2O": 1}, 
-                      )
-        logger.info('Start third solve')
-        steam_lca.model.solve('design')
-        steam_lca.trap =True
+        return 'trap'
+    return 'plain'
+
+
+def current_topology(steam_lca):
+    if steam_lca.cond_inj:
+        return 'cond_inj'
+    if steam_lca.trap:
+        return 'trap'
+    return 'plain'
+
+
+def set_topology(steam_lca, topology):
+    """
+    Change the topology of the created network in place by adding or removing 
+    the condensate injection or the condensate trap.
+
+    Returns
+    -------
+    bool
+        True if the topology was changed.
+    """
+    if topology == current_topology(steam_lca):
+        return False
+    if steam_lca.cond_inj:
+        _remove_injection(steam_lca)
+    elif steam_lca.trap:
+        _remove_trap(steam_lca)
+
+    if topology == 'cond_inj':
+        _add_injection(steam_lca)
+    elif topology == 'trap':
+        _add_trap(steam_lca)
+    return True
+
+
+def update_topology(steam_lca, phase):
+    """
+    Switch to the topology required by the solved network and solve again if it changed.
+    """
+    if set_topology(steam_lca, required_topology(steam_lca)):
+        solve(steam_lca, phase)
+
+
+def _add_injection(steam_lca):
+    nw = steam_lca.model
+    valve = nw.get_comp('controlvalve')
+    hex_heat_sink = nw.get_comp('hex heat sink')
+    condensate_pump = nw.get_comp('condensate pump')
+    nw.del_conns(nw.get_conn('c1_1'), nw.get_conn('c0_1'))
+
+    merge_injection = Merge("Injection")
+    dummy_sink2= Sink('dummy sink2')
+    injection_source =Source('injection_source')
+    condensate_split= Splitter("split condensate")
+    
+    c1_1= Connection(valve, 'out1', merge_injection, 'in1', label='c1_1')
+    cond_3 = Connection(injection_source, 'out1', merge_injection, 'in2', label='cond_3')
+    cond_5 = Connection(merge_injection, 'out1', hex_heat_sink, 'in1', label= 'cond_5')
+
+    cond_1 = Connection(hex_heat_sink, 'out1', condensate_split, 'in1', label='cond_1')
+    cond_2 = Connection(condensate_split, 'out2', dummy_sink2, 'in1', label='cond_2')
+    c0_1 = Connection(condensate_split, 'out1', condensate_pump, 'in1', label='c0_1')
+    nw.add_conns(cond_1, cond_2, cond_3,cond_5,c1_1,c0_1)
+
+    c1_1.set_attr(p = steam_lca.needed_pressure)
+    cond_1.set_attr(x=0)
+    c0_1.set_attr(m=Ref(c1_1,1,0))
+    cond_3.set_attr(x=0, 
+                    fluid={"H2O": 1}, 
+                    )
+    cond_5.set_attr(x=1)
+    if steam_lca.warm_start:
+        apply_state(nw, steam_lca.warm_start, [c1_1, cond_1, cond_2, cond_3, cond_5, c0_1])
+    steam_lca.cond_inj =True
+
+
+def _remove_injection(steam_lca):
+    nw = steam_lca.model
+    valve = nw.get_comp('controlvalve')
+    hex_heat_sink = nw.get_comp('hex heat sink')
+    condensate_pump = nw.get_comp('condensate pump')
+    nw.del_conns(*[nw.get_conn(label) for label in ['c1_1', 'cond_3', 'cond_5', 'cond_1', 'cond_2', 'c0_1']])
+
+    c1_1= Connection(valve, 'out1', hex_heat_sink, 'in1', label='c1_1')
+    c0_1 = Connection(hex_heat_sink, 'out1', condensate_pump, 'in1', label='c0_1')
+    nw.add_conns(c1_1, c0_1)
+    c1_1.set_attr(p = steam_lca.needed_pressure)
+    c0_1.set_attr(x=0)
+    steam_lca.cond_inj = False
+
+
+def _add_trap(steam_lca):
+    nw = steam_lca.model
+    merge = nw.get_comp('Makeup water feed')
+    diversion = nw.get_comp('divert steam from network')
+    valve = nw.get_comp('controlvalve')
+    merge.set_attr(num_in=4)
+    nw.del_conns(nw.get_conn('c1_2'))
+    makeup_trap =Source('trap makeup')
+    cond_trap= DropletSeparator('condensate trap') 
+    cond_waste= Sink("pipe condensate wastewater")
+
+    muw3 = Connection(makeup_trap, 'out1', merge, 'in4', label='muw3')
+    c_trap_in= Connection(diversion, 'out2', cond_trap, 'in1', label='c_trap_in')
+    c_trap_out= Connection(cond_trap, 'out2', valve, 'in1', label='c_trap_out')
+    c_trap_waste = Connection(cond_trap, 'out1', cond_waste, 'in1', label='c_trap_waste')
+    
+    nw.add_conns(c_trap_in, c_trap_out, c_trap_waste, muw3)
+
+    muw3.set_attr(m=Ref(c_trap_waste, 1, 0), T=steam_lca.params['Tamb'],
+                  fluid={"H2O": 1}, 
+                  )
+    if steam_lca.warm_start:
+        apply_state(nw, steam_lca.warm_start, [c_trap_in, c_trap_out, c_trap_waste, muw3])
+    steam_lca.trap =True
+
+
+def _remove_trap(steam_lca):
+    nw = steam_lca.model
+    merge = nw.get_comp('Makeup water feed')
+    diversion = nw.get_comp('divert steam from network')
+    valve = nw.get_comp('controlvalve')
+    nw.del_conns(*[nw.get_conn(label) for label in ['c_trap_in', 'c_trap_out', 'c_trap_waste', 'muw3']])
+    merge.set_attr(num_in=3)
+    c1_2 = Connection(diversion, 'out2', valve, 'in1',label='c1_2')
+    nw.add_conns(c1_2)
+    steam_lca.trap = False
+
+
+def consumer_mains(steam_lca):
+    """
+    Mains of the consumers of a multi consumer steam net, from highest to lowest pressure.
+    """
+    return sorted({consumer['main'] for consumer in steam_lca.consumers}, reverse=True)
+
+
+def condensate_valve(steam_lca, consumer):
+    """
+    True if the condensate of a consumer flows through a valve into the condensate return 
+    at the lowest consumer main, False if it is pumped because its pressure is lower.
+    """
+    return consumer['needed_pressure'] >= consumer_mains(steam_lca)[-1]
+
+
+def create_multi_consumer_net(steam_lca):
+    """
+    Create a steam net with one branch per consumer of `steam_lca.consumers` and solve it 
+    from the initial guesses. Needs two solves for all consumers together.
+    """
+    _build_multi_consumer_network(steam_lca)
+    if steam_lca.warm_start:
+        apply_state(steam_lca.model, steam_lca.warm_start)
+    solve(steam_lca, 'first')
+
+    #2. Run: 
+    muw = steam_lca.model.get_conn('muw')
+    muw.set_attr(T=None)
+    muw.set_attr(T=Ref(steam_lca.model.get_conn('c0_3'), 1, -20))
+    solve(steam_lca, 'second')
+
+
+def _build_multi_consumer_network(steam_lca):
+    """
+    Create components and connections of a steam net with several consumers and set all attributes.
+
+    The back pressure turbine expands in one stage per used main. Each main feeds the
+    branches (steam pipe, steam leak, control valve, heat sink and condensate pump or valve) 
+    of its consumers, the lowest main also feeds the network condensation. The condensate 
+    of all branches returns in one condensate pipe at the pressure of the lowest main, 
+    condensate above this pressure is relieved by a valve, see :func:`condensate_valve`. 
+    Condensate injection and condensate trap are not available for the consumer branches.
+    """
+    steam_lca.cond_inj = False
+    steam_lca.trap=False
+    steam_lca.converged =False
+
+    nw = steam_lca.model
+    nw.set_attr(iterinfo=False)
+    nw.units.set_defaults(temperature='degC', pressure='bar', enthalpy='kJ / kg')
+
+    consumers = steam_lca.consumers
+    mains = consumer_mains(steam_lca)
+    branches = [(consumer['name'], consumer['main']) for consumer in consumers] + [('network', mains[-1])]
+    h_sup = steam_lca.h_superheating_max_pressure
+
+    # create components
+    boiler = SimpleHeatExchanger('steam boiler' , dissipative=False)
+    pipe_cold= Pipe('condensate pipe',dissipative=True)
+    feed_pump= Pump('feedpump')
+    cycl=CycleCloser('CycleCloser')
+    makeup=Source("Make-up water")
+    blowdown= Sink("blowdown wastewater")
+    merge = Merge("Makeup water feed", num_in=2 + len(branches))
+    split= Splitter("remove wastewater")
+    conflation= Merge("conflation condensate to network", num_in=len(branches))
+
+    c0_7 = Connection(cycl, 'out1', boiler, 'in1', label='c0_7')
+    conns = [c0_7]
+
+    # turbine stages and main headers, the first outlet of a header feeds the next stage:
+    turbines = []
+    headers = {}
+    inlet, inlet_label = (boiler, 'out1'), 'c1_6'
+    for j, main in enumerate(mains):
+        bpt = Turbine(f'back pressure turbine {main:g} bar')
+        bpt.set_attr(eta_s = 0.85, )
+        header = Splitter(f'main {main:g} bar', 
+                          num_out=1 + sum(consumer['main'] == main for consumer in consumers))
+        c_main = Connection(bpt, 'out1', header, 'in1', label=f'c_main {main:g} bar')
+        c_main.set_attr(h0=h_sup)
+        conns += [Connection(*inlet, bpt, 'in1', label=inlet_label), c_main]
+        turbines.append(bpt)
+        headers[main] = [header, 1]
+        if j < len(mains) - 1:
+            inlet, inlet_label = (header, 'out1'), f'c_stage {mains[j + 1]:g} bar'
+            headers[main][1] = 2
+
+    pipes = []
+    heat_sinks = []
+    for k, (name, main) in enumerate(branches, start=1):
+        header, port = headers[main]
+        headers[main][1] += 1
+        pipe_warm =  Pipe(f'steam pipe {name}', dissipative=True)
+        steam_leak= Splitter(f"steam leak {name}")
+        steam_losses = Sink(f'steam losses {name}')
+        makeup_leak =Source(f'leak makeup {name}')
+        pipes.append(pipe_warm)
+
+        c1_5 = Connection(header, f'out{port}', pipe_warm, 'in1', label=f'c1_5 {name}')
+        c1_4 = Connection(pipe_warm, 'out1', steam_leak, 'in1', label=f'c1_4 {name}')
+        c_leak = Connection(steam_leak, 'out2', steam_losses, 'in1', label=f'c_leak {name}')
+        muw2 = Connection(makeup_leak, 'out1', merge, f'in{2 + k}', label=f'muw2 {name}')
+        muw2.set_attr(m=Ref(c_leak, 1, 0), fluid={"H2O": 1}, p0=1.013)
+        conns += [c1_5, c1_4, c_leak, muw2]
+
+        if name == 'network':
+            network_heat_sink = SimpleHeatExchanger('network condensation', dissipative=False)
+            valve_cond_nw = Valve('relax_cond_network')
+            cnw1= Connection(steam_leak, 'out1', network_heat_sink, 'in1',label='cnw1')
+            cnw2= Connection(network_heat_sink, 'out1', valve_cond_nw, 'in1',label='cnw2')
+            cnw3= Connection(valve_cond_nw, 'out1', conflation, f'in{k}',label='cnw3')
+            network_heat_sink.set_attr(pr=1, power_connector_location="outlet")
+            cnw2.set_attr(x=0)
+            conns += [cnw1, cnw2, cnw3]
+            continue
+
+        valve = Valve(f'controlvalve {name}')
+        hex_heat_sink = SimpleHeatExchanger(f'hex heat sink {name}', dissipative=False)
+        if condensate_valve(steam_lca, consumers[k - 1]):
+            condensate_return = Valve(f'condensate valve {name}')
+        else:
+            condensate_return = Pump(f'condensate pump {name}')
+            condensate_return.set_attr(eta_s=0.95)
+        heat_sinks.append(hex_heat_sink)
+
+        c1_2 = Connection(steam_leak, 'out1', valve, 'in1',label=f'c1_2 {name}')
+        c1_1= Connection(valve, 'out1', hex_heat_sink, 'in1', label=f'c1_1 {name}')
+        c0_1 = Connection(hex_heat_sink, 'out1', condensate_return, 'in1', label=f'c0_1 {name}')
+        c0_11 = Connection(condensate_return, 'out1', conflation, f'in{k}', label=f'c0_11 {name}')
+        c1_1.set_attr(h0=h_sup)
+        hex_heat_sink.set_attr(pr=1, power_connector_location="outlet")
+        c0_1.set_attr(x=0)
+        conns += [c1_2, c1_1, c0_1, c0_11]
+
+    c0_2 = Connection(conflation, 'out1', pipe_cold, 'in1', label='c0_2')
+    c0_3 = Connection(pipe_cold, 'out1', split, 'in1', label='c0_3')
+    c0_4 = Connection(split, 'out1', merge, 'in1', label='c0_4')
+    c0_5 = Connection(merge, 'out1', feed_pump, 'in1', label='c0_5')
+    c0_6 = Connection(feed_pump, 'out1', cycl, 'in1', label='c0_6')
+    muw = Connection(makeup, 'out1', merge, 'in2', label='muw')
+    wawa = Connection(split, 'out2', blowdown, 'in1', 'c_blowdown')
+    conns += [c0_2, c0_3, c0_4, c0_5, c0_6, muw, wawa]
+    nw.add_conns(*conns)
+
+    #set attributes:
+    boiler.set_attr(pr = 1, power_connector_location="inlet")
+    nw.get_conn('c1_6').set_attr(fluid={"H2O": 1})
+    c0_7.set_attr(p0=mains[0])
+    for pipe in pipes + [pipe_cold]:
+        pipe.set_attr(pr=0.95, 
+            D='var', ks=4.57e-5,
+            power_connector_location="outlet",
+            insulation_tc= 0.035, pipe_thickness=0.004,material='Steel', 
+                )
+        pipe.D.val = PIPE_D0
+    c0_5.set_attr(p0=min(consumer['needed_pressure'] for consumer in consumers))
+    c0_6.set_attr(h0=h_sup)
+    muw.set_attr(fluid={"H2O": 1}, p0=1.013)
+    feed_pump.set_attr(eta_s =0.95)
+    set_multi_consumer_parameters(steam_lca)
+    # makeup water temperature is set to ambient temperature for the first run:
+    muw.set_attr(T=steam_lca.params['Tamb'])
+
+    # create power connections:
+    fuel_bus = PowerSource('boiler powersource')
+    e_boil = PowerConnection(fuel_bus, 'power', boiler, 'heat', label= 'e_boil')
+
+    turbine_bus = PowerBus('turbine bus', num_in=len(turbines), num_out=1)
+    turbine_gen = Generator('turbines')
+    turbine_gen.set_attr(eta= 0.9)
+    turbine_grid = PowerSink('grid')
+    e_turb_stages = [PowerConnection(bpt, 'power', turbine_bus, f'power_in{j}', label=f'e_turb {main:g} bar')
+                     for j, (bpt, main) in enumerate(zip(turbines, mains), start=1)]
+    e_turb = PowerConnection(turbine_bus, 'power_out1', turbine_gen, 'power_in', label='e_turb')
+    e_turb_grid =PowerConnection(turbine_gen, 'power_out', turbine_grid, 'power', 
+                                label='e_turb_grid')
+
+    pipe_diss_sink =PowerSink('pipe dissipative losses sink')
+    pipe_diss_bus = PowerBus('pipe dissipative losses bus', num_in =len(pipes) + 1, num_out=1)
+    e_pipes = [PowerConnection(pipe, 'heat', pipe_diss_bus, f'power_in{j}')
+               for j, pipe in enumerate(pipes + [pipe_cold], start=1)]
+    e_pi_sink = PowerConnection(pipe_diss_bus, 'power_out1', pipe_diss_sink, 'power', label='e_pi_sink')
+
+    e_heat_sinks = [PowerConnection(hex_heat_sink, 'heat', PowerSink(f'heat sink {consumer["name"]}'), 'power',
+                                    label=f'e_heat_sink {consumer["name"]}')
+                    for hex_heat_sink, consumer in zip(heat_sinks, consumers)]
+    nw_heat_sink =PowerSink('nw heat sink')
+    e_nw_heat_sink =PowerConnection( network_heat_sink,'heat',nw_heat_sink, 'power', label='e_nw_heat_sink')
+
+    pump_psource = PowerSource('feedpump powersource')
+    e_pump = PowerConnection(pump_psource, 'power', feed_pump, 'power', label='e_pump')
+
+    nw.add_conns(e_boil, 
+                 *e_turb_stages, e_turb, e_turb_grid,
+                 *e_pipes, e_pi_sink,
+                 *e_heat_sinks, e_nw_heat_sink,
+                 e_pump
+    )
+
+
+def set_multi_consumer_parameters(steam_lca):
+    """
+    Set all parameter dependent attributes of a created multi consumer steam net.
+    The consumers must be on the same mains as when the network was created.
+    """
+    nw = steam_lca.model
+    params = steam_lca.params
+    consumers = steam_lca.consumers
+    mains = consumer_mains(steam_lca)
+
+    c1_6 = nw.get_conn('c1_6')
+    c1_6.set_attr(h= steam_lca.h_superheating_max_pressure)
+    for main in mains:
+        nw.get_conn(f'c_main {main:g} bar').set_attr(p=main)
+    nw.get_conn('c0_2').set_attr(p=mains[-1])
+    nw.get_conn('c0_6').set_attr(p=params['max_pressure'])
+
+    pipe_lengths = {f'steam pipe {consumer["name"]}': consumer['pipe_length'] for consumer in consumers}
+    pipe_lengths['steam pipe network'] = params['pipe_length']
+    pipe_lengths['condensate pipe'] = params['pipe_length']
+    for label, length in pipe_lengths.items():
+        nw.get_comp(label).set_attr(
+            Tamb = params['Tamb'], 
+            L=length, 
+            insulation_thickness=params['insulation_thickness'] ,
+            wind_velocity=params['wind_velocity'], 
+            environment_media = params['environment_media']
+            )
+
+    for consumer in consumers:
+        nw.get_conn(f'c1_1 {consumer["name"]}').set_attr(p = consumer['needed_pressure'])
+        nw.get_comp(f'hex heat sink {consumer["name"]}').set_attr(Q=-consumer['heat'])
+    nw.get_comp('network condensation').set_attr(
+        Q=-(params['heat_capacity_pipe_network']-sum(consumer['heat'] for consumer in consumers)))
 
+    #leakage and makeup:
+    for name in [consumer['name'] for consumer in consumers] + ['network']:
+        nw.get_conn(f'c_leak {name}').set_attr(m=Ref(nw.get_conn(f'c1_4 {name}'), params['leakage_factor'], 0))
+        nw.get_conn(f'muw2 {name}').set_attr(T=params['Tamb'])
+    nw.get_conn('muw').set_attr(m=Ref(c1_6, params['makeup_factor'], 0))
+    nw.get_conn('c_blowdown').set_attr(m=Ref(c1_6, params['makeup_factor'], 0))
@@ -0,0 +1,207 @@
+"""
+Surrogate of the steam net model for fast LCI queries.
+
+A polynomial response surface (total degree, least squares) is trained on solved
+scenarios of :mod:`batch`, one per main, as the results jump where the steam net
+changes the main. Each prediction comes with a local error estimate from the
+leave-one-out residuals of the nearest training scenarios. Queries outside the trust
+region (training bounds, a main without fit or estimated error above the tolerance)
+are answered by solving the model.
+"""
+
+import itertools
+import logging
+
+import numpy as np
+
+from . import batch
+from .impact_curve import needed_main
+
+logger = logging.getLogger(__name__)
+
+class surrogate:
+    """
+    Polynomial surrogate of the steam net model.
+
+    Parameters
+    ----------
+    inputs : list
+        Names of the varied parameters.
+    bounds : dict, optional
+        (min, max) per input. Defaults to min and max of the parameter definition in
+        `steam_net.parameters`. Inputs without min and max must be given here.
+    outputs : list, optional
+        Result columns of :func:`batch.run_batch` to approximate. Defaults to the amounts
+        of all flows of `define_flows` and the allocation factors.
+    fixed : dict, optional
+        Parameters that are kept constant.
+    degree : int, optional
+        Total degree of the polynomial. Default is 2.
+    tolerance : float, optional
+        Maximum estimated relative error of a prediction inside the trust region.
+    neighbours : int, optional
+        Number of nearest training scenarios of the local error estimate. Default is 10.
+    """
+
+    def __init__(self, inputs, bounds=None, outputs=None, fixed=None, degree=2, tolerance=0.01, neighbours=10):
+        self.inputs = list(inputs)
+        self.outputs = list(outputs or batch.DEFAULT_OUTPUTS)
+        self.fixed = dict(fixed or {})
+        self.degree = degree
+        self.tolerance = tolerance
+        self.neighbours = neighbours
+        self.bounds = self._default_bounds(bounds or {})
+        self._exponents = np.array([e for e in itertools.product(range(degree + 1), repeat=len(self.inputs))
+                                    if sum(e) <= degree])
+        self.fits = None
+
+    def _default_bounds(self, bounds):
+        result = {}
+        for name in self.inputs:
+            if name in bounds:
+                result[name] = tuple(bounds[name])
+                continue
+            from .steam_distribution_conventional import steam_net
+            parameter = steam_net.parameters[name]
+            if getattr(parameter, 'min', None) is None or getattr(parameter, 'max', None) is None:
+                raise ValueError(f'Parameter {name} has no min and max. Pass its bounds.')
+            result[name] = (parameter.min, parameter.max)
+        return result
+
+    def _complete(self, params):
+        """
+        Parameter set with the fixed parameters and the defaults of the model for the missing ones.
+        """
+        from .steam_distribution_conventional import steam_net
+
+        defaults = {name: parameter.default for name, parameter in steam_net.parameters.items()}
+        return {**defaults, **self.fixed, **params}
+
+    def _main(self, params):
+        """
+        Main of a parameter set, the surrogate has one fit per main.
+        """
+        params = self._complete(params)
+        return needed_main(params['needed_temperature'], params['mains'])
+
+    def _normalize(self, x):
+        low = np.array([self.bounds[name][0] for name in self.inputs], dtype=float)
+        high = np.array([self.bounds[name][1] for name in self.inputs], dtype=float)
+        return 2 * (np.atleast_2d(x) - low) / (high - low) - 1
+
+    def _basis(self, z):
+        return np.prod(z[:, None, :] ** self._exponents[None, :, :], axis=2)
+
+    def sample(self, n, seed=None):
+        """
+        Latin hypercube sample of n parameter sets within the bounds.
+        """
+        rng = np.random.default_rng(seed)
+        u = (np.array([rng.permutation(n) for _ in self.inputs]).T + rng.random((n, len(self.inputs)))) / n
+        scenarios = []
+        for row in u:
+            params = dict(self.fixed)
+            for name, value in zip(self.inputs, row):
+                low, high = self.bounds[name]
+                params[name] = float(low + value * (high - low))
+            scenarios.append(params)
+        return scenarios
+
+    def train(self, n=200, seed=None, processes=None):
+        """
+        Solve n sampled scenarios with :func:`batch.run_batch` and fit the surrogate.
+
+        Returns
+        -------
+        dict
+            Results table of the solved scenarios.
+        """
+        table = batch.run_batch(self.sample(n, seed), processes=processes)
+        self.fit(table)
+        return table
+
+    def fit(self, table):
+        """
+        Fit the surrogate to a results table of :func:`batch.run_batch`, one polynomial per main.
+        Failed scenarios are ignored, mains with too few scenarios are not fitted.
+        """
+        mask = table['converged']
+        x = np.column_stack([table[name][mask] for name in self.inputs]).astype(float)
+        y = np.column_stack([table[name][mask] for name in self.outputs]).astype(float)
+        mains = np.array([self._main(dict(zip(self.inputs, row))) for row in x], dtype=float)
+        self.fits = {}
+        for main in np.unique(mains[~np.isnan(mains)]):
+            rows = mains == main
+            z = self._normalize(x[rows])
+            basis = self._basis(z)
+            if len(basis) <= basis.shape[1]:
+                logger.warning(f'Main {main:g} bar not fitted: {basis.shape[1]} coefficients need more than '
+                               f'{len(basis)} converged scenarios.')
+                continue
+            coefficients, *_ = np.linalg.lstsq(basis, y[rows], rcond=None)
+            covariance = np.linalg.pinv(basis.T @ basis)
+            leverage = np.einsum('ij,jk,ik->i', basis, covariance, basis)
+            residuals = (y[rows] - basis @ coefficients) / (1 - np.minimum(leverage, 1 - 1e-9))[:, None]
+            self.fits[float(main)] = {'coefficients': coefficients, 'covariance': covariance,
+                                      'points': z, 'residuals': residuals}
+            logger.info(f'Surrogate of main {main:g} bar fitted on {len(basis)} scenarios, leave-one-out errors: '
+                        f'{dict(zip(self.outputs, np.sqrt(np.mean(residuals ** 2, axis=0))))}')
+        if not self.fits:
+            raise ValueError('Not enough converged scenarios to fit any main.')
+
+    def predict(self, **params):
+        """
+        Predict the outputs for one parameter set with the fit of its main.
+
+        The error (one standard deviation) is the RMS of the leave-one-out residuals of 
+        the `neighbours` nearest training scenarios, scaled by the leverage of the query.
+        Outputs of a main without fit are NaN with infinite errors. Inputs that are not
+        given are taken from `fixed` or the defaults of the model.
+
+        Returns
+        -------
+        tuple
+            Dicts of the predicted values and their estimated errors.
+        """
+        if self.fits is None:
+            raise ValueError('Surrogate is not fitted. Call train or fit first.')
+        params = self._complete(params)
+        fit = self.fits.get(self._main(params))
+        if fit is None:
+            return dict.fromkeys(self.outputs, np.nan), dict.fromkeys(self.outputs, np.inf)
+        z = self._normalize([params[name] for name in self.inputs])
+        basis = self._basis(z)[0]
+        values = basis @ fit['coefficients']
+        nearest = np.argsort(np.linalg.norm(fit['points'] - z, axis=1))[:self.neighbours]
+        local_error = np.sqrt(np.mean(fit['residuals'][nearest] ** 2, axis=0))
+        errors = local_error * np.sqrt(1 + basis @ fit['covariance'] @ basis)
+        return dict(zip(self.outputs, values)), dict(zip(self.outputs, errors))
+
+    def in_trust_region(self, values, errors, **params):
+        """
+        Check if the parameters are within the bounds, their main is fitted and all errors are 
+        below the tolerance. Inputs that are not given are taken from `fixed` or the defaults.
+        """
+        params = self._complete(params)
+        if any(not self.bounds[name][0] <= params[name] <= self.bounds[name][1] for name in self.inputs):
+            return False
+        return all(errors[key] <= self.tolerance * max(abs(values[key]), 1e-12) for key in self.outputs)
+
+    def query(self, **params):
+        """
+        Answer a query by the surrogate or, outside the trust region, by solving the model.
+
+        Returns
+        -------
+        dict
+            `values` and `errors` of the outputs and the `source` ('surrogate' or 'model').
+        """
+        values, errors = self.predict(**params)
+        if self.in_trust_region(values, errors, **params):
+            return {'values': values, 'errors': errors, 'source': 'surrogate'}
+        row, _ = batch.solve_scenario({**self.fixed, **params})
+        if not row['converged']:
+            raise Exception(f'Steam net calculation failed for {params}.')
+        return {'values': {key: row[key] for key in self.outputs},
+                'errors': dict.fromkeys(self.outputs, 0.0),
+                'source': 'model'}
@@ -0,0 +1,130 @@
+"""
+Time series simulation of the steam net model, e.g. with hourly profiles of one year.
+
+The steps are quantized to buckets of heat demand, ambient temperature and wind
+velocity. Each bucket is solved once with :meth:`steam_net.recalculate_model`,
+starting from the network of the previous bucket. The buckets are solved in
+sorted order, so that neighbouring buckets follow each other.
+"""
+
+import logging
+
+import numpy as np
+
+from . import results
+
+logger = logging.getLogger(__name__)
+
+# fields of the result record that are rates and can be summed over time:
+EXTENSIVE_FIELDS = ['E_boil', 'E_pump', 'E_turb', 'E_turb_grid', 'E_heat_sink', 'E_nw_heat_sink',
+                    'Q_hex', 'Q_nw', 'm_leak']
+
+
+def quantize(values, step):
+    """
+    Round the values to the bucket centers of the step.
+    """
+    values = np.asarray(values, dtype=float)
+    if not step:
+        return values
+    return np.round(values / step) * step
+
+
+def _solve_bucket(model, params):
+    model.params.update(params)
+    try:
+        if model.converged:
+            model.recalculate_model()
+        else:
+            model.calculate_model()
+    except Exception as e:
+        logger.info(f'Recalculation of {params} failed, create the network again: {e}')
+        try:
+            model.calculate_model()
+        except Exception as e:
+            logger.warning(f'Time step bucket {params} failed: {e}')
+            model.converged = False
+            return None
+    return model.record.copy()
+
+
+def simulate(model, heat, Tamb=None, wind_velocity=None, dt=3600, heat_step=None, Tamb_step=1, wind_step=0.5,
+             standby_heat=None):
+    """
+    Simulate the model over the steps of the profiles and sum the flows.
+
+    Parameters
+    ----------
+    model : steam_net
+        Initialised model. Its parameters are used for everything that is not a profile.
+        The profile parameters of the model are changed by the simulation.
+    heat : numpy.ndarray
+        Transferred heat at the process in W per time step, e.g. 8760 hourly values.
+        Steps below `standby_heat`, e.g. without heat demand, are simulated at the standby point.
+    Tamb, wind_velocity : numpy.ndarray or float, optional
+        Profiles of the ambient temperature in °C and the wind velocity in m/s.
+        Defaults to the parameters of the model.
+    dt : float, optional
+        Length of a time step in s. Default is 3600.
+    heat_step : float, optional
+        Bucket size of the heat in W. Defaults to 1 % of the maximum heat.
+    Tamb_step, wind_step : float, optional
+        Bucket sizes of the ambient temperature in K and of the wind velocity in m/s.
+        Default is 1 K and 0.5 m/s. 0 to solve every distinct value.
+    standby_heat : float, optional
+        Smallest heat in W that is solved. Steps with less heat are simulated with this 
+        heat, so the network condensation, losses and leakage of the standby are included.
+        Defaults to `heat_step`.
+
+    Returns
+    -------
+    dict
+        `totals` of all flows of `define_flows` over all steps (in the unit of
+        `results.FLOW_SCHEMA` times dt in s, e.g. MJ), the `allocation factors` of the
+        summed heat, the summed result `record` (extensive fields only), the result
+        `records` per step, the number of solved `buckets`, the `standby` steps and the 
+        `failed` steps. If any step failed, `totals`, `allocation factors` and `record` 
+        are None, as the totals would miss the flows of these steps.
+    """
+    heat = np.asarray(heat, dtype=float)
+    n = len(heat)
+    profiles = {
+        'heat': heat,
+        'Tamb': np.broadcast_to(np.asarray(model.params['Tamb'] if Tamb is None else Tamb, dtype=float), n),
+        'wind_velocity': np.broadcast_to(
+            np.asarray(model.params['wind_velocity'] if wind_velocity is None else wind_velocity, dtype=float), n),
+    }
+    if heat_step is None:
+        heat_step = 0.01 * np.max(heat)
+    if standby_heat is None:
+        standby_heat = heat_step
+    steps = {'heat': heat_step, 'Tamb': Tamb_step, 'wind_velocity': wind_step}
+    quantized = np.column_stack([quantize(profiles[name], steps[name]) for name in profiles])
+    standby = np.flatnonzero(quantized[:, 0] < standby_heat)
+    quantized[standby, 0] = standby_heat
+    buckets, inverse = np.unique(quantized, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    logger.info(f'{n} time steps in {len(buckets)} buckets.')
+
+    bucket_records = np.full(len(buckets), np.nan, dtype=results.RESULT_DTYPE)
+    # np.unique sorts the buckets by heat, then Tamb, then wind velocity:
+    for i, bucket in enumerate(buckets):
+        record = _solve_bucket(model, dict(zip(profiles, (float(value) for value in bucket))))
+        if record is not None:
+            bucket_records[i] = record
+
+    records = bucket_records[inverse]
+    failed = np.flatnonzero(np.isnan(records['E_boil']))
+    result = {'totals': None, 'allocation factors': None, 'record': None, 'records': records,
+              'buckets': len(buckets), 'standby': standby, 'failed': failed}
+    if len(failed):
+        logger.warning(f'{len(failed)} of {n} time steps failed, no totals are calculated.')
+        return result
+
+    total = results.empty_record()
+    for field in EXTENSIVE_FIELDS:
+        total[field] = np.sum(records[field]) * dt
+    result['totals'] = {name: results.flow_amount(total, name) for name in results.FLOW_SCHEMA}
+    result['allocation factors'] = results.allocation_factors(total)
+    result['record'] = total
+    return result
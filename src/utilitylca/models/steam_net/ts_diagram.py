@@ -0,0 +1,213 @@
+"""
+T-s diagrams of the steam net.
+
+The isolines of the diagram background do not depend on the model, they are
+calculated once, stored as JSON with `FluidPropertyDiagram.to_json` and reused from
+memory and disk. :func:`plot_batch` solves many scenarios and draws their process
+lines into one overlay figure or writes one figure per scenario, both in parallel
+into figures with an Agg canvas, without changing the pyplot backend of the caller.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ISOLINES = {
+    'Q': np.linspace(0, 1, 2),
+    'p': np.array([1, 2, 5, 10, 20, 50, 100, 300]),
+    'v': np.array([]),
+    'h': np.arange(500, 3501, 500),
+}
+UNITS = {'T': '°C', 'p': 'bar', 'h': 'kJ/kg'}
+LIMITS = {'x_min': 1000, 'x_max': 8000, 'y_min': 20, 'y_max': 600}
+
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'utilitylca')
+
+_diagrams = {}
+
+
+def _diagram_path():
+    from importlib.metadata import version
+    import CoolProp
+
+    content = json.dumps({'isolines': {key: value.tolist() for key, value in ISOLINES.items()}, 'units': UNITS,
+                          'CoolProp': CoolProp.__version__, 'fluprodia': version('fluprodia')}, sort_keys=True)
+    name = hashlib.sha256(content.encode()).hexdigest()[:16]
+    directory = os.environ.get('UTILITYLCA_CACHE_DIR', DEFAULT_DIR)
+    return os.path.join(directory, f'Ts_water_{name}.json')
+
+
+def diagram(path=None):
+    """
+    FluidPropertyDiagram of water with the calculated isolines of `ISOLINES`.
+
+    The diagram is kept in memory and stored in a JSON file at `path`, defaults to a file
+    in `~/.cache/utilitylca` (or `UTILITYLCA_CACHE_DIR`) named by a hash of the isolines
+    and the versions of CoolProp and fluprodia. The isolines are only calculated if the
+    file does not exist.
+    """
+    from fluprodia import FluidPropertyDiagram
+
+    path = path or _diagram_path()
+    if path not in _diagrams:
+        if os.path.exists(path):
+            _diagrams[path] = FluidPropertyDiagram.from_json(path)
+        else:
+            result = FluidPropertyDiagram('water')
+            result.set_unit_system(**UNITS)
+            result.set_isolines(**ISOLINES)
+            result.calc_isolines()
+            try:
+                result.to_json(path)
+            except OSError as e:
+                logger.warning(f'T-s diagram could not be stored in {path}: {e}')
+            _diagrams[path] = result
+    return _diagrams[path]
+
+
+def process_lines(model, path=None):
+    """
+    Datapoints (arrays of s and T) of the process lines of all components of a calculated model.
+    """
+    if getattr(model, 'from_cache', False):
+        raise ValueError('The results of the model were read from the result cache, its network is not solved. '
+                         'Calculate it without result_cache to plot it.')
+    plotting = {cp.label: cp.get_plotting_data() for cp in model.model.comps['object']}
+    background = diagram(path)
+    return {label: {key: np.asarray(value) for key, value in
+                    background.calc_individual_isoline(**data[1]).items() if key in ('s', 'T')}
+            for label, data in plotting.items() if data is not None}
+
+
+def _agg_figure(**kwargs):
+    # figure with its own Agg canvas, independent of pyplot and its backend:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def draw(lines, ax=None, labels=None, path=None, agg=False):
+    """
+    Draw the isolines and the process lines of one or several scenarios.
+
+    Parameters
+    ----------
+    lines : list
+        Process lines per scenario, see :func:`process_lines`.
+    ax : matplotlib.axes.Axes, optional
+        Axes to draw in. A new figure is created if not given.
+    labels : list, optional
+        Legend label per scenario.
+    path : str, optional
+        Path of the stored diagram, see :func:`diagram`.
+    agg : bool, optional
+        Without `ax`, draw into a figure with an Agg canvas instead of a pyplot figure,
+        e.g. to write files without changing the pyplot backend. Default is False.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+    """
+    import matplotlib
+
+    if ax is None:
+        if agg:
+            ax = _agg_figure(figsize=(20, 10)).subplots(1)
+        else:
+            import matplotlib.pyplot as plt
+            _, ax = plt.subplots(1, figsize=(20, 10))
+    fig = ax.figure
+    diagram(path).draw_isolines(fig, ax, 'Ts', **LIMITS)
+    # Adjust the font size of the isoline labels
+    for text in ax.texts:
+        text.set_fontsize(10)
+
+    colors = ['#ff0000'] if len(lines) == 1 else matplotlib.colormaps['viridis'](np.linspace(0, 1, len(lines)))
+    for i, scenario in enumerate(lines):
+        for j, datapoints in enumerate(scenario.values()):
+            label = labels[i] if labels is not None and j == 0 else None
+            ax.plot(datapoints['s'], datapoints['T'], color=colors[i], linewidth=2, label=label)
+            ax.scatter(datapoints['s'][0], datapoints['T'][0], color=colors[i])
+    if labels is not None:
+        ax.legend(fontsize=12)
+
+    ax.set_xlabel('Entropy, s in J/kgK', fontsize=16)
+    ax.set_ylabel('Temperature, T in °C', fontsize=16)
+    ax.set_title('T-s Diagram of steam net', fontsize=20)
+    ax.tick_params(axis='x', labelsize=12)
+    ax.tick_params(axis='y', labelsize=12)
+    fig.tight_layout()
+    return fig
+
+
+def _scenario_lines(params, path=None):
+    from .steam_distribution_conventional import steam_net
+
+    try:
+        model = steam_net('steam net', **params)
+        model.init_model()
+        model.calculate_model()
+        return process_lines(model, path)
+    except Exception as e:
+        logger.info(f'Scenario {params} failed: {e}')
+        return None
+
+
+def _render(lines, file, label=None, path=None):
+    # runs in the worker processes of plot_batch only:
+    import matplotlib
+    matplotlib.use('Agg')
+
+    draw([lines], labels=None if label is None else [label], path=path, agg=True).savefig(file)
+    return file
+
+
+def plot_batch(scenarios, file, overlay=True, labels=None, processes=None):
+    """
+    Solve many scenarios and draw their T-s process lines into Agg figures.
+    The pyplot backend of this process is not changed.
+
+    Parameters
+    ----------
+    scenarios : list
+        List of parameter dicts, e.g. created by `batch.parameter_grid`.
+    file : str
+        File of the overlay figure, e.g. 'Ts.pdf', or with `overlay=False` a format string
+        of the file per scenario with the index of the scenario, e.g. 'Ts_{}.png'.
+    overlay : bool, optional
+        Draw all scenarios into one figure. Default is True.
+    labels : list, optional
+        Label per scenario. Defaults to the index of the scenario.
+    processes : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    list
+        Written files. Failed scenarios are left out.
+    """
+    labels = list(labels) if labels is not None else [str(i) for i in range(len(scenarios))]
+    # the isolines are calculated and stored once before the workers read them:
+    path = _diagram_path()
+    diagram(path)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        lines = list(executor.map(_scenario_lines, scenarios, [path] * len(scenarios)))
+        solved = [i for i, scenario_lines in enumerate(lines) if scenario_lines is not None]
+        if len(solved) < len(scenarios):
+            logger.warning(f'{len(scenarios) - len(solved)} of {len(scenarios)} scenarios failed and are not plotted.')
+        if not overlay:
+            return list(executor.map(_render, [lines[i] for i in solved], [file.format(i) for i in solved],
+                                     [labels[i] for i in solved], [path] * len(solved)))
+
+    fig = draw([lines[i] for i in solved], labels=[labels[i] for i in solved], path=path, agg=True)
+    fig.savefig(file)
+    return [file]
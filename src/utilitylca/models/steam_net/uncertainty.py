@@ -0,0 +1,166 @@
+"""
+Monte Carlo uncertainty propagation through the steam net model.
+
+Parameters are drawn from user distributions and solved in batches with
+:func:`batch.run_batch`. Sampling stops as soon as the confidence interval of the
+mean of every output is narrower than the requested relative width.
+"""
+
+import logging
+from statistics import NormalDist
+
+import numpy as np
+
+from . import batch
+
+logger = logging.getLogger(__name__)
+
+
+def _sampler(spec):
+    """
+    Return a function drawing n values of a distribution spec with a numpy Generator.
+    """
+    if hasattr(spec, 'rvs'):
+        # frozen scipy.stats distribution:
+        return lambda rng, n: spec.rvs(size=n, random_state=rng)
+    if callable(spec):
+        return spec
+    kind, *args = spec
+    if kind == 'normal':
+        return lambda rng, n: rng.normal(args[0], args[1], n)
+    if kind == 'lognormal':
+        return lambda rng, n: rng.lognormal(args[0], args[1], n)
+    if kind == 'uniform':
+        return lambda rng, n: rng.uniform(args[0], args[1], n)
+    if kind == 'triangular':
+        return lambda rng, n: rng.triangular(args[0], args[1], args[2], n)
+    raise ValueError(f'Unknown distribution {kind}')
+
+
+def _bounds(names):
+    from .steam_distribution_conventional import steam_net
+
+    bounds = {}
+    for name in names:
+        parameter = steam_net.parameters[name]
+        bounds[name] = (getattr(parameter, 'min', None), getattr(parameter, 'max', None))
+    return bounds
+
+
+def sample(distributions, n, rng, fixed=None, clip=True):
+    """
+    Draw n parameter sets.
+
+    Parameters
+    ----------
+    distributions : dict
+        Distribution per parameter name, see :func:`monte_carlo`.
+    n : int
+        Number of parameter sets.
+    rng : numpy.random.Generator
+    fixed : dict, optional
+        Parameters that are kept constant.
+    clip : bool, optional
+        Clip the values to min and max of the parameter definition in `steam_net.parameters`.
+
+    Returns
+    -------
+    list
+        List of parameter dicts.
+    """
+    values = {name: np.asarray(_sampler(spec)(rng, n), dtype=float) for name, spec in distributions.items()}
+    if clip:
+        for name, (low, high) in _bounds(distributions).items():
+            if low is not None or high is not None:
+                values[name] = np.clip(values[name], low, high)
+    return [{**(fixed or {}), **{name: float(values[name][i]) for name in values}} for i in range(n)]
+
+
+def _concat(tables):
+    # columns that are missing in a batch, e.g. when all its scenarios failed, are NaN:
+    keys = dict.fromkeys(key for table in tables for key in table)
+    return {key: np.concatenate([table[key] if key in table else np.full(len(table['converged']), np.nan)
+                                 for table in tables]) for key in keys}
+
+
+def _values(table, outputs):
+    # output columns that are not in the table yet are NaN:
+    missing = np.full(len(table['converged']), np.nan)
+    return np.column_stack([table.get(name, missing) for name in outputs])[table['converged']]
+
+
+def monte_carlo(distributions, outputs=None, fixed=None, confidence=0.95, rel_width=0.01,
+                batch_size=200, min_samples=200, max_samples=10000, processes=None, seed=None, cache=None):
+    """
+    Propagate parameter uncertainty by Monte Carlo sampling with early stopping.
+
+    Parameters
+    ----------
+    distributions : dict
+        Distribution per parameter name. Either a frozen scipy.stats distribution, a function
+        `f(rng, n)` or a tuple ('normal', mean, std), ('lognormal', mu, sigma),
+        ('uniform', low, high) or ('triangular', low, mode, high).
+    outputs : list, optional
+        Result columns of :func:`batch.run_batch` to watch. Defaults to the amounts of all
+        flows of `define_flows` and the allocation factors.
+    fixed : dict, optional
+        Parameters that are kept constant.
+    confidence : float, optional
+        Confidence level of the interval of the mean. Default is 0.95.
+    rel_width : float, optional
+        Maximum half width of the confidence interval relative to the mean. Default is 0.01.
+    batch_size : int, optional
+        Number of samples solved per batch.
+    min_samples, max_samples : int, optional
+        Minimum and maximum number of samples.
+    processes : int, optional
+        Number of worker processes of :func:`batch.run_batch`.
+    seed : int, optional
+        Seed of the random numbers.
+    cache : str, optional
+        Path of a :class:`cache.result_cache` database.
+
+    Returns
+    -------
+    dict
+        `table` of all samples (see :func:`batch.run_batch`), per output the `mean`, `std`,
+        `half_width` of the confidence interval and the `percentiles` (2.5, 50, 97.5) of the
+        converged samples, the number of samples `n` and `converged` (True if the width was reached).
+    """
+    outputs = list(outputs or batch.DEFAULT_OUTPUTS)
+    rng = np.random.default_rng(seed)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    tables = []
+    n = 0
+    reached = False
+    while n < max_samples:
+        size = min(batch_size, max_samples - n)
+        tables.append(batch.run_batch(sample(distributions, size, rng, fixed), processes=processes, cache=cache))
+        n += size
+        table = _concat(tables)
+        values = _values(table, outputs)
+        if len(values) < 2:
+            continue
+        mean = values.mean(axis=0)
+        half_width = z * values.std(axis=0, ddof=1) / np.sqrt(len(values))
+        reached = bool(np.all(half_width <= rel_width * np.abs(mean)))
+        logger.info(f'Monte Carlo: {n} samples, largest relative half width '
+                    f'{np.max(half_width / np.maximum(np.abs(mean), 1e-12)):.3g}')
+        if reached and n >= min_samples:
+            break
+    else:
+        logger.warning(f'Monte Carlo stopped at max_samples={max_samples} before reaching the confidence width.')
+
+    table = _concat(tables)
+    values = _values(table, outputs)
+    percentiles = np.percentile(values, [2.5, 50, 97.5], axis=0) if len(values) else np.full((3, len(outputs)), np.nan)
+    std = values.std(axis=0, ddof=1) if len(values) > 1 else np.full(len(outputs), np.nan)
+    return {
+        'table': table,
+        'mean': dict(zip(outputs, values.mean(axis=0) if len(values) else np.full(len(outputs), np.nan))),
+        'std': dict(zip(outputs, std)),
+        'half_width': dict(zip(outputs, z * std / np.sqrt(max(len(values), 1)))),
+        'percentiles': dict(zip(outputs, percentiles.T)),
+        'n': n,
+        'converged': reached,
+    }
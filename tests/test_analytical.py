@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from utilitylca.models.steam_net import analytical, batch, results
+
+
+def test_calculate_arrays():
+    records = analytical.calculate(Tamb=np.array([10, 20]), needed_temperature=np.array([[150], [200]]))
+    assert records.shape == (2, 2)
+    assert records.dtype == results.RESULT_DTYPE
+    assert np.isfinite(records['boiler_factor']).all()
+    # without a main for the needed temperature the scenario is NaN:
+    assert np.isnan(analytical.calculate(needed_temperature=300)['boiler_factor'])
+
+
+def test_flows():
+    table = analytical.flows(analytical.calculate(Tamb=np.array([10, 20, 30])))
+    assert set(batch.DEFAULT_OUTPUTS) <= set(table)
+    assert np.allclose(table['distributed steam allocationfactor'] + table['network steam allocationfactor'], 1)
+    assert np.allclose(table['distributed steam'], 1)
+
+
+def test_accuracy():
+    report = analytical.accuracy_report([{'Tamb': 10}, {'needed_temperature': 180}], processes=1)
+    for field in batch.RESULT_FIELDS + ['steam generation', 'electricity substitution']:
+        assert report[field]['max'] < 0.01, field
+    assert report['electricity grid']['max'] < 0.05
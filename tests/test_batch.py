@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from utilitylca.models.steam_net import batch
+
+# the last scenario fails, the maximum pressure is below the highest main:
+SCENARIOS = [{'Tamb': 10}, {'Tamb': 20}, {'max_pressure': 30}]
+
+
+@pytest.fixture(scope='module')
+def table():
+    return batch.run_batch(SCENARIOS, processes=1)
+
+
+def test_parameter_grid():
+    grid = batch.parameter_grid(Tamb=[10, 20], mains=[[4, 8], [4, 16]], heat=1e6)
+    assert len(grid) == 4
+    assert grid[0] == {'Tamb': 10, 'mains': [4, 8], 'heat': 1e6}
+    assert batch.parameter_grid(mains=[4, 8])[0]['mains'] == [4, 8]
+
+
+def test_table_of_failed_scenarios():
+    table = batch._to_table([{'mains': [4, 8]}, {'mains': [4, 16]}], [{'converged': False}, {}])
+    assert table['mains'].dtype == object and table['mains'][1] == [4, 16]
+    assert not table['converged'].any()
+    for column in batch.RESULT_COLUMNS:
+        assert len(table[column]) == 2
+    assert np.isnan(table['elec_factor']).all()
+
+
+def test_run_batch(table):
+    assert list(table['converged']) == [True, True, False]
+    assert np.array_equal(table['Tamb'][:2], [10, 20])
+    row, state = batch.solve_scenario(SCENARIOS[1])
+    assert row['converged'] and state is not None
+    assert table['elec_factor'][1] == pytest.approx(row['elec_factor'], rel=1e-6)
+    assert table['steam generation'][1] == pytest.approx(row['steam generation'], rel=1e-6)
+    assert np.isnan(table['steam generation'][2])
+
+
+def test_run_batch_to_disk(table, tmp_path):
+    on_disk = batch.run_batch(SCENARIOS, processes=2, out=str(tmp_path / 'table'))
+    assert isinstance(on_disk['elec_factor'], np.memmap)
+    assert list(on_disk['converged']) == [True, True, False]
+    for column in batch.RESULT_FIELDS + batch.DEFAULT_OUTPUTS:
+        assert np.allclose(on_disk[column], table[column], rtol=1e-6, equal_nan=True)
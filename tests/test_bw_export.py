@@ -0,0 +1,135 @@
+import bw2data as bd
+import numpy as np
+import pytest
+from simodin import interface as link
+
+from utilitylca.models.steam_net import background, bw_export
+from utilitylca.models.steam_net.steam_distribution_conventional import steam_net
+
+
+@pytest.fixture(scope='module')
+def interface(tmp_path_factory):
+    bd.projects.change_base_directories(base_dir=tmp_path_factory.mktemp('bw'), project_name='utilitylca',
+                                        update=False)
+    biosphere = bd.Database('biosphere')
+    biosphere.write({
+        ('biosphere', 'water'): {'name': 'water', 'unit': 'cubic meter', 'type': 'emission'},
+        ('biosphere', 'co2'): {'name': 'carbon dioxide', 'unit': 'kilogram', 'type': 'emission'},
+    })
+    background = bd.Database('background')
+    background.write({
+        ('background', 'heat'): {'name': 'heat', 'unit': 'megajoule', 'exchanges': [
+            {'input': ('background', 'heat'), 'amount': 1, 'type': 'production'},
+            {'input': ('biosphere', 'co2'), 'amount': 0.07, 'type': 'biosphere'}]},
+        ('background', 'electricity'): {'name': 'electricity', 'unit': 'kilowatt hour', 'exchanges': [
+            {'input': ('background', 'electricity'), 'amount': 1, 'type': 'production'},
+            {'input': ('biosphere', 'co2'), 'amount': 0.4, 'type': 'biosphere'}]},
+    })
+    method = bd.Method(('test', 'climate'))
+    method.register()
+    method.write([(('biosphere', 'co2'), 1), (('biosphere', 'water'), 0.5)])
+
+    model = steam_net('steam net')
+    model.init_model()
+    # the flows are defined without solving, the amounts are read from a results table:
+    model.converged = True
+    model.define_flows()
+    interface = link.modelInterface('steam net', model)
+    interface.add_dataset('steam generation', background.get('heat'))
+    interface.add_dataset('electricity grid', background.get('electricity'))
+    interface.add_dataset('electricity substitution', background.get('electricity'))
+    interface.add_dataset('steam leak', biosphere.get('water'))
+    interface.methods = [('test', 'climate')]
+    return interface
+
+
+SCENARIOS = [{'needed_temperature': 150, 'location': 'DE'}, {'needed_temperature': 200}, {'needed_temperature': 210}]
+
+
+def table():
+    return {
+        'converged': np.array([True, True, False]),
+        'steam generation': np.array([100., 120., np.nan]),
+        'electricity grid': np.array([1., 2., np.nan]),
+        'electricity substitution': np.array([-10., -12., np.nan]),
+        'distributed steam': np.array([3.6, 3.6, np.nan]),
+        'network steam': np.array([60., 60., np.nan]),
+        'steam leak': np.array([0.5, 0.6, np.nan]),
+        'distributed steam allocationfactor': np.array([0.05, 0.05, np.nan]),
+        'network steam allocationfactor': np.array([0.95, 0.95, np.nan]),
+    }
+
+
+def test_linked_flows(interface):
+    flows = {name: (kind, key, factor) for name, kind, key, factor in bw_export.linked_flows(interface)}
+    assert flows['steam generation'] == ('technosphere', ('background', 'heat'), 1)
+    assert flows['electricity grid'][2] == pytest.approx(1 / 3.6)
+    assert flows['steam leak'] == ('biosphere', ('biosphere', 'water'), 1)
+
+
+def test_scenario_activities(interface):
+    data = bw_export.scenario_activities(interface, SCENARIOS, table(), 'steam', identifiers=['a', 'b', 'c'])
+    # two converged scenarios with two functional flows:
+    assert sorted(code for _, code in data) == ['distributed steam_a', 'distributed steam_b',
+                                                'network steam_a', 'network steam_b']
+    activity = data[('steam', 'distributed steam_a')]
+    assert activity['parameters']['location'] == 'DE'
+    assert activity['parameters']['max_pressure'] == 130
+    assert 'location' not in activity
+    amounts = {ex['input']: ex['amount'] for ex in activity['exchanges']}
+    # per MJ of distributed steam with its allocation factor:
+    assert amounts[('background', 'heat')] == pytest.approx(100 * 0.05 / 3.6)
+    assert amounts[('biosphere', 'water')] == pytest.approx(0.5 * 0.05 / 3.6)
+
+
+def test_export_keeps_other_activities(interface):
+    bd.Database('steam').write({('steam', 'other'): {'name': 'other', 'unit': 'megajoule', 'exchanges': []}})
+    codes = bw_export.export_to_bw(interface, SCENARIOS, 'steam', identifiers=['a', 'b', 'c'], table=table())
+    assert len(codes) == 4
+    db = bd.Database('steam')
+    assert len(db) == 5
+    # exported again with changed amounts, the activities are replaced:
+    changed = table()
+    changed['steam generation'] *= 2
+    bw_export.export_to_bw(interface, SCENARIOS, 'steam', identifiers=['a', 'b', 'c'], table=changed)
+    assert len(db) == 5
+    activity = db.get('distributed steam_a')
+    assert len(activity.technosphere()) == 3
+    heat = [ex for ex in activity.technosphere() if ex.input.key == ('background', 'heat')][0]
+    assert heat['amount'] == pytest.approx(200 * 0.05 / 3.6)
+    assert db.get('other')['name'] == 'other'
+    assert len(db.search('distributed')) == 2
+    bw_export.export_to_bw(interface, SCENARIOS, 'steam', identifiers=['a', 'b', 'c'], table=table(),
+                           overwrite=True)
+    assert len(db) == 4
+
+
+def test_dataset_correction(interface):
+    model = interface.model
+    model._technosphere['steam generation'].dataset_correction = 0.9
+    model._biosphere['steam leak'].dataset_correction = 0.5
+    try:
+        flows = {name: factor for name, _, _, factor in bw_export.linked_flows(interface)}
+    finally:
+        model._technosphere['steam generation'].dataset_correction = None
+        model._biosphere['steam leak'].dataset_correction = None
+    assert flows['steam generation'] == pytest.approx(0.9)
+    assert flows['steam leak'] == 1
+
+
+def test_scenario_impacts(interface):
+    scores = background.unit_scores(interface)
+    method = ('test', 'climate')
+    assert scores['functional'] == ['distributed steam', 'network steam']
+    assert scores['reference'] == 'distributed steam'
+    unit = dict(zip(scores['flows'], scores['matrix'][:, 0]))
+    assert unit['steam generation'] == pytest.approx(0.07)
+    assert unit['electricity grid'] == pytest.approx(0.4 / 3.6)
+    assert unit['steam leak'] == pytest.approx(0.5)
+
+    impacts = background.scenario_impacts(table(), scores)
+    expected = 100 * 0.07 + (1 - 10) * 0.4 / 3.6 + 0.5 * 0.5
+    assert impacts['impact'][method][0] == pytest.approx(expected)
+    assert impacts['allocated'][method]['distributed steam'][0] == pytest.approx(expected * 0.05 / 3.6)
+    assert impacts['contributions'][method]['steam leak'][0] == pytest.approx(0.25)
+    assert np.isnan(impacts['impact'][method][2])
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from utilitylca.models.steam_net import cache, results, ts_diagram
+from utilitylca.models.steam_net.steam_distribution_conventional import steam_net
+
+
+def test_cache_key():
+    key = cache.cache_key({'heat': 1e6, 'mains': [8, 4]})
+    assert key == cache.cache_key({'heat': 1000000, 'mains': [4, 8]})
+    assert key != cache.cache_key({'heat': 1e6, 'mains': [4, 8]}, versions={})
+    assert cache._versions()['model'] == cache._source_hash()
+
+
+def test_put_get(tmp_path):
+    store = cache.result_cache(str(tmp_path / 'results.sqlite'))
+    record = results.empty_record()
+    record['losses'] = 0.1
+    assert store.get({'heat': 1e6}) is None
+    store.put({'heat': 1e6}, record, cond_inj=True)
+    cached, cond_inj, trap = store.get({'heat': 1e6})
+    assert cached['losses'] == 0.1
+    assert cond_inj and not trap
+    assert len(store) == 1
+    store.clear()
+    assert len(store) == 0
+
+
+def test_model_from_cache(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    model = steam_net('steam net')
+    model.init_model()
+    model.result_cache = cache.result_cache(path)
+    model.calculate_model()
+    assert not model.from_cache
+
+    cached = steam_net('steam net')
+    cached.init_model()
+    cached.result_cache = cache.result_cache(path)
+    cached.calculate_model()
+    assert cached.from_cache
+    assert cached.converged
+    assert cached.record.tobytes() == model.record.tobytes()
+    assert len(cached.model.conns) == 0
+    with pytest.raises(ValueError):
+        ts_diagram.process_lines(cached)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from utilitylca.models.steam_net import analytical, columnar
+
+
+def table():
+    mains = np.empty(3, dtype=object)
+    mains[:] = [[4, 8], [4, 16], [4, 40]]
+    return {'Tamb': np.array([10., 20., 30.]), 'mains': mains, 'converged': np.array([True, False, True]),
+            'steam generation': np.array([1.1, np.nan, 1.3])}
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'table')
+    columnar.write_table(table(), path)
+    loaded = columnar.load_table(path)
+    assert isinstance(loaded['Tamb'], np.memmap)
+    assert loaded['converged'].dtype == bool and list(loaded['converged']) == [True, False, True]
+    assert loaded['mains'].dtype == object and loaded['mains'][1] == [4, 16]
+    assert np.array_equal(loaded['steam generation'], table()['steam generation'], equal_nan=True)
+    assert list(columnar.load_table(path, mmap=False, columns=['Tamb'])) == ['Tamb']
+    assert not isinstance(columnar.load_table(path, mmap=False)['Tamb'], np.memmap)
+    assert columnar.units(path)['steam generation'] == columnar.COLUMN_UNITS['steam generation']
+    assert columnar.units(path)['Tamb'] is None
+
+
+def test_records(tmp_path):
+    records = analytical.calculate(Tamb=np.array([10, 20]))
+    columnar.write_table(records, str(tmp_path / 'records'))
+    loaded = columnar.load_table(str(tmp_path / 'records'))
+    assert np.array_equal(loaded['boiler_factor'], records['boiler_factor'])
+
+
+def test_partial_rows(tmp_path):
+    path = str(tmp_path / 'table')
+    with columnar.table_writer(path, 3) as writer:
+        writer.write_rows([2, 0], [{'converged': True, 'losses': 0.1}, {'converged': True, 'losses': 0.2}])
+    loaded = columnar.load_table(path)
+    assert list(loaded['converged']) == [True, False, True]
+    assert np.array_equal(loaded['losses'], [0.2, np.nan, 0.1], equal_nan=True)
+
+
+def test_parquet(tmp_path):
+    pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'table.parquet')
+    columnar.write_table(table(), path, format='parquet')
+    loaded = columnar.load_table(path, columns=['Tamb', 'converged'])
+    assert list(loaded) == ['Tamb', 'converged']
+    assert np.array_equal(loaded['Tamb'], table()['Tamb'])
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        columnar.write_table(table(), str(tmp_path / 'table'), format='csv')
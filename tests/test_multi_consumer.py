@@ -0,0 +1,33 @@
+import pytest
+
+from utilitylca.models.steam_net.steam_distribution_multi_consumer import steam_net_multi
+
+
+@pytest.fixture(scope='module')
+def model():
+    model = steam_net_multi('multi')
+    model.init_model()
+    model.calculate_model()
+    return model
+
+
+def test_default_two_consumers(model):
+    assert model.converged
+    assert len(model.consumer_records) == 2
+    assert model.consumer_records['Q_hex'].sum() == pytest.approx(-1.5e6)
+    assert 0 < model.losses < 1
+    assert model.consumer_records['allocationfactor'].sum() < 1
+
+
+def test_condensate_return(model):
+    # consumer 1 is above the return pressure of the lowest main, consumer 2 below:
+    assert model.model.get_comp('condensate valve consumer 1').pr.val <= 1
+    pump = model.model.get_comp('condensate pump consumer 2')
+    assert pump.pr.val > 1
+    assert pump.P.val > 0
+
+
+def test_recalculate(model):
+    model.recalculate_model(heat_capacity_pipe_network=15E6)
+    assert model.converged
+    assert model.record['Q_nw'] == pytest.approx(-13.5e6)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from utilitylca.models.steam_net import batch
+from utilitylca.models.steam_net import properties as props
+
+
+@pytest.fixture(scope='module')
+def table():
+    return props.property_table()
+
+
+def test_max_error(table):
+    assert table.max_error['saturation_pressure'] < 1e-4
+    assert table.max_error['saturation_temperature'] < 1e-4
+    assert table.max_error['superheating_enthalpy'] < 1e-3
+
+
+def test_interpolation(table):
+    assert table.saturation_pressure(453.15) == pytest.approx(props._saturation_pressure(453.15), rel=1e-4)
+    assert table.saturation_temperature(16E5) == pytest.approx(props._saturation_temperature(16E5), rel=1e-4)
+    assert table.superheating_enthalpy(4E5, 130E5) == pytest.approx(props._superheating_enthalpy(4E5, 130E5),
+                                                                      rel=1e-3)
+
+
+def test_invalid_isentrope_points(table):
+    # isentropes of low saturation pressures leave IF97 at high pressures:
+    assert table.invalid_points > 0
+    assert not table.in_isentrope_range(1.05E5, 199E5)
+    assert table.in_isentrope_range(4E5, 130E5)
+    assert not np.isnan(table.max_error['superheating_enthalpy'])
+
+
+def test_use_table(table):
+    props.use_table(table)
+    try:
+        assert props.saturation_pressure(453.15) == table.saturation_pressure(453.15)
+    finally:
+        props.use_table(None)
+    assert props.saturation_pressure(453.15) == props._saturation_pressure(453.15)
+
+
+def test_table_in_workers(table):
+    with batch._executor(1, table) as executor:
+        assert executor.submit(props.saturation_pressure, 453.15).result() == table.saturation_pressure(453.15)
+    with batch._local_table(table):
+        assert props._table is table
+    assert props._table is None
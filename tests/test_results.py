@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from utilitylca.models.steam_net import results
+
+
+def states(scale=1.0):
+    state = {f'{conn}.{prop}': 1.0 for conn, props in results.STATE_FIELDS.items() for prop in props}
+    state.update({
+        'e_boil.E': 10e6 * scale, 'e_turb.E': 1e6, 'e_pump.E': 0.1e6, 'e_turb_grid.E': 0.9e6,
+        'e_heat_sink.E': 1e6, 'e_nw_heat_sink.E': 7e6, 'e_pi_sink.E': 0.2e6,
+        'c_leak.m': 0.5, 'c_leak.h': 2.8e6, 'muw2.h': 0.1e6, 'muw.m': 1.0,
+        'Q_hex': -1e6, 'Q_nw': -7e6,
+    })
+    return state
+
+
+def test_postprocess_one():
+    record = results.postprocess(states(), 20)[0]
+    supplied = 10e6 - 1e6 + 0.1e6
+    assert record['boiler_factor'] == pytest.approx(10)
+    assert record['elec_factor'] == pytest.approx(0.9)
+    assert record['leak_losses'] == pytest.approx(0.5 * 2.7e6 / supplied)
+    assert record['losses'] == pytest.approx(1 - 8e6 / supplied)
+    assert results.flow_amount(record, 'steam generation') == pytest.approx(10)
+    assert results.flow_amount(record, 'electricity substitution') == pytest.approx(-0.9)
+    assert results.allocation_factors(record) == {'distributed steam': 0.125, 'network steam': 0.875}
+
+
+def test_postprocess_vectorized():
+    single = [results.postprocess(states(scale), 20)[0] for scale in (1, 1.5, 2)]
+    stacked = results.stack_states([states(scale) for scale in (1, 1.5, 2)])
+    records = results.postprocess(stacked, np.array([20, 20, 20]))
+    assert len(records) == 3
+    for record, expected in zip(records, single):
+        assert record.tobytes() == expected.tobytes()
+
+
+def test_postprocess_solved_model():
+    from utilitylca.models.steam_net.steam_distribution_conventional import steam_net
+
+    model = steam_net('steam net')
+    model.init_model()
+    model.calculate_model()
+    record = results.postprocess(results.network_states(model.model, model.cond_inj), 20)[0]
+    assert record.tobytes() == model.record.tobytes()
+    assert model.record['E_heat_sink'] == pytest.approx(1e6)
+    assert model.record['Q_hex'] == pytest.approx(-1e6)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from utilitylca.models.steam_net import sensitivity
+
+
+def linear_batch(scenarios, **kwargs):
+    """
+    Results table of y = 4 x + y with x and y in [0, 1], failed for x > limit.
+    """
+    x = np.array([params['x'] for params in scenarios])
+    y = np.array([params['y'] for params in scenarios])
+    converged = x <= linear_batch.limit
+    out = np.where(converged, 4 * x + y, np.nan)
+    return {'x': x, 'y': y, 'out': out, 'converged': converged}
+
+
+@pytest.fixture
+def batch(monkeypatch):
+    linear_batch.limit = 1
+    monkeypatch.setattr(sensitivity.batch, 'run_batch', linear_batch)
+    return linear_batch
+
+
+BOUNDS = {'x': (0, 1), 'y': (0, 1)}
+
+
+def test_default_bounds():
+    bounds = sensitivity.default_bounds()
+    assert bounds['max_pressure'][0] == 40
+    assert sensitivity.default_bounds(fixed={'mains': [2, 5]})['max_pressure'][0] == 10
+    assert sensitivity.default_bounds({'max_pressure': (20, 50)})['max_pressure'] == (20, 50)
+
+
+def test_morris(batch):
+    result = sensitivity.morris(BOUNDS, outputs=['out'], trajectories=10, seed=1, processes=1)
+    assert result['out']['mu_star']['x'] == pytest.approx(4)
+    assert result['out']['mu_star']['y'] == pytest.approx(1)
+    assert result['out']['sigma']['x'] == pytest.approx(0)
+
+
+def test_sobol(batch):
+    result = sensitivity.sobol(BOUNDS, outputs=['out'], n=4096, seed=1, bootstrap=0, processes=1)
+    assert result['out']['S1']['x'] == pytest.approx(16 / 17, abs=0.05)
+    assert result['out']['ST']['y'] == pytest.approx(1 / 17, abs=0.02)
+
+
+def test_reuse_solved(batch):
+    solved = {}
+    x = np.array([[0.5, 0.5], [0.5, 0.5], [0.25, 0]])
+    y = sensitivity.evaluate(x, BOUNDS, ['out'], solved=solved)
+    assert len(solved) == 2
+    assert y[:, 0] == pytest.approx([2.5, 2.5, 1])
+
+
+def test_too_many_failed(batch):
+    batch.limit = 0.5
+    with pytest.raises(ValueError):
+        sensitivity.sobol(BOUNDS, outputs=['out'], n=64, seed=1, bootstrap=0)
+    result = sensitivity.sobol(BOUNDS, outputs=['out'], n=64, seed=1, bootstrap=0, max_failed=1)
+    assert np.isfinite(result['out']['S1']['x'])
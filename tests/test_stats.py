@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from utilitylca.models.steam_net.stats import solver_info, solver_stats
+
+
+def network(status, iterations=9):
+    return SimpleNamespace(status=status, iter=iterations, residual_history=np.array([1e-2, 1e-9]))
+
+
+def test_solver_info_status():
+    assert solver_info(network(0))['converged'] is True
+    # converged with out of bounds warnings:
+    assert solver_info(network(1))['converged'] is True
+    assert solver_info(network(2))['converged'] is False
+    assert solver_info(network(3))['converged'] is False
+    info = solver_info(network(0))
+    assert info['iterations'] == 10
+    assert info['residual'] == 1e-9
+
+
+def test_solver_info_unavailable():
+    info = solver_info(SimpleNamespace())
+    assert info == {'iterations': None, 'residual': None, 'status': None, 'converged': None}
+
+
+def test_solver_stats_summary():
+    records = []
+    stats = solver_stats(hooks=[records.append])
+    stats.record_solve('design', network(1), 0.5)
+    stats.record_solve('offdesign', network(2), 0.25)
+    stats.record_solve('offdesign', network(0), 0.25, error=RuntimeError('crashed'))
+    with stats.timer('properties'):
+        pass
+    summary = stats.summary()
+    assert summary['solves'] == 3
+    assert summary['solve_time'] == 1.0
+    assert summary['iterations'] == 30
+    assert summary['failed_solves'] == 2
+    assert 'properties_time' in summary
+    assert [record['type'] for record in records] == ['solve', 'solve', 'solve', 'timer']
+    stats.reset()
+    assert stats.summary()['solves'] == 0
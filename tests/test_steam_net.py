@@ -0,0 +1,115 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from utilitylca.models.steam_net import stats
+from utilitylca.models.steam_net import steam_network_model as snwm
+from utilitylca.models.steam_net.steam_distribution_conventional import steam_net
+
+
+class fake_network:
+    """
+    Network whose solves never converge, the residuals diverge or decrease slowly.
+    """
+
+    def __init__(self, diverge=True):
+        self.diverge = diverge
+
+    def solve(self, mode, max_iter=50):
+        self.iter = max_iter - 1
+        self.residual_history = np.geomspace(1, 1e6, max_iter) if self.diverge else np.linspace(1, 0.5, max_iter)
+        self.status = 2
+
+
+def unsolvable(monkeypatch, diverge):
+    def create(steam_lca):
+        steam_lca.model = fake_network(diverge)
+        snwm.solve(steam_lca, 'design')
+
+    monkeypatch.setattr(snwm, 'create_steam_net', create)
+    monkeypatch.setattr(snwm, 'create_steam_net_from_template', create)
+
+
+@pytest.fixture(scope='module')
+def model():
+    model = steam_net('steam net')
+    model.init_model()
+    model.calculate_model()
+    return model
+
+
+def test_default_solves_first_attempt(model):
+    assert model.converged
+    summary = model.stats.summary()
+    assert summary['failed_solves'] == 0
+    # starts from the template of the topology if an earlier model of this process created it:
+    assert model.stats.solves[0]['phase'] in ('template', 'first')
+    assert all(solve['converged'] for solve in model.stats.solves)
+
+
+def test_default_results(model):
+    assert 0 < model.boiler_factor
+    assert 0 < model.losses < 1
+    assert model.E_hs < 0 and model.E_bpt < 0
+
+
+def test_design_offdesign():
+    model = steam_net('steam net')
+    model.init_model()
+    model.calculate_design()
+    pipe = model.model.get_comp('steam pipe')
+    assert pipe.D.is_set and not pipe.pr.is_set
+    directory = os.path.dirname(model.design_path)
+    model.params['heat'] = 8e5
+    model.calculate_offdesign()
+    assert model.converged
+    assert model.record['Q_hex'] == pytest.approx(-8e5)
+    model._design_dir.cleanup()
+    assert not os.path.exists(directory)
+
+
+def test_template_topology():
+    model = SimpleNamespace(warm_start=None, desuperheat_steam=False)
+    assert snwm.template_topology(model) == 'plain'
+    model.desuperheat_steam = True
+    assert snwm.template_topology(model) == 'cond_inj'
+    model.warm_start = {'c_trap_in': {'p': 40, 'h': 2700, 'm': 10}}
+    assert snwm.template_topology(model) == 'trap'
+
+
+def test_start_from_template(model):
+    assert 'plain' in snwm._templates
+    other = steam_net('steam net', needed_temperature=200)
+    other.init_model()
+    other.calculate_model()
+    assert [solve['phase'] for solve in other.stats.solves] == ['template']
+
+
+def test_probe_stops_diverging_solve():
+    steam_lca = SimpleNamespace(model=fake_network(), stats=stats.solver_stats(), max_iter=50, probe_iter=10)
+    with pytest.raises(snwm.DivergenceError):
+        snwm.solve(steam_lca, 'design')
+    assert [solve['iterations'] for solve in steam_lca.stats.solves] == [10]
+
+
+def test_ladder_stops_diverging_retries(monkeypatch):
+    unsolvable(monkeypatch, diverge=True)
+    model = steam_net('steam net', Tamb=10)
+    model.init_model()
+    with pytest.raises(Exception, match='diverged'):
+        model.calculate_model()
+    phases = [solve['phase'] for solve in model.stats.solves]
+    assert 'relaxed solve' not in ' '.join(phases)
+    # the standard solve is not probed, the retries and the continuation stop after probe_iter:
+    assert [solve['iterations'] for solve in model.stats.solves] == [50] + [10] * (len(phases) - 1)
+
+
+def test_ladder_budget(monkeypatch):
+    unsolvable(monkeypatch, diverge=False)
+    model = steam_net('steam net')
+    model.init_model()
+    with pytest.raises(Exception, match='budget'):
+        model.calculate_model()
+    assert model.stats.summary()['iterations'] == model.max_total_iter
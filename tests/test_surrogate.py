@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from utilitylca.models.steam_net import batch
+from utilitylca.models.steam_net.impact_curve import needed_main, switch_temperatures
+from utilitylca.models.steam_net.surrogate import surrogate
+
+MAINS = [4, 8, 16, 40]
+
+
+def response(temperature, heat):
+    # quadratic within each main, with a jump at each main switch:
+    return 1e-4 * temperature ** 2 + heat * 1e-6 + needed_main(temperature, MAINS)
+
+
+def training_table(model, n=120):
+    scenarios = model.sample(n, seed=1)
+    return {
+        'needed_temperature': np.array([params['needed_temperature'] for params in scenarios]),
+        'heat': np.array([params['heat'] for params in scenarios]),
+        'out': np.array([response(params['needed_temperature'], params['heat']) for params in scenarios]),
+        'converged': np.ones(n, dtype=bool),
+    }
+
+
+@pytest.fixture
+def model():
+    model = surrogate(['needed_temperature', 'heat'], bounds={'heat': (5e5, 2e6)}, outputs=['out'],
+                      fixed={'mains': MAINS})
+    model.fit(training_table(model))
+    return model
+
+
+def test_fit_per_main(model):
+    assert set(model.fits) == {4.0, 8.0, 16.0, 40.0}
+    switch = switch_temperatures(MAINS)[1]
+    for temperature in [switch - 0.5, switch + 0.5]:
+        values, errors = model.predict(needed_temperature=temperature, heat=1e6)
+        assert values['out'] == pytest.approx(response(temperature, 1e6), rel=1e-6)
+        assert errors['out'] < 1e-6
+        assert model.in_trust_region(values, errors, needed_temperature=temperature, heat=1e6)
+
+
+def test_main_without_fit():
+    model = surrogate(['needed_temperature'], outputs=['out'], fixed={'mains': MAINS})
+    # only scenarios of the 4 bar main:
+    temperatures = np.linspace(100, 135, 20)
+    model.fit({'needed_temperature': temperatures, 'out': temperatures ** 2,
+               'converged': np.ones(20, dtype=bool)})
+    assert set(model.fits) == {4.0}
+    values, errors = model.predict(needed_temperature=200)
+    assert np.isnan(values['out'])
+    assert not model.in_trust_region(values, errors, needed_temperature=200)
+
+
+def test_query_outside_bounds(model, monkeypatch):
+    calls = []
+
+    def solve_scenario(params):
+        calls.append(params)
+        return {'converged': True, 'out': 1.0}, None
+    monkeypatch.setattr(batch, 'solve_scenario', solve_scenario)
+    assert model.query(needed_temperature=150, heat=1e6)['source'] == 'surrogate'
+    result = model.query(needed_temperature=150, heat=3e6)
+    assert result['source'] == 'model'
+    assert calls == [{'mains': MAINS, 'needed_temperature': 150, 'heat': 3e6}]
+
+
+def test_missing_inputs_use_defaults(model):
+    # heat is left out, the default of 1 MW is used:
+    result = model.query(needed_temperature=150)
+    assert result['source'] == 'surrogate'
+    assert result['values']['out'] == pytest.approx(response(150, 1e6), rel=1e-6)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from utilitylca.models.steam_net import results, timeseries
+from utilitylca.models.steam_net.steam_distribution_conventional import steam_net
+
+
+class failing_model:
+    """
+    Model that fails above a heat of 1 MW and returns a constant record otherwise.
+    """
+
+    def __init__(self):
+        self.params = {'Tamb': 20, 'wind_velocity': 3}
+        self.converged = False
+        self.record = results.empty_record()
+        for field in timeseries.EXTENSIVE_FIELDS:
+            self.record[field] = 1.0
+
+    def calculate_model(self):
+        if self.params['heat'] > 1e6:
+            raise Exception('not solved')
+        self.converged = True
+
+    recalculate_model = calculate_model
+
+
+def test_quantize():
+    assert np.array_equal(timeseries.quantize([0.4, 1.6, 2.2], 1), [0, 2, 2])
+    assert np.array_equal(timeseries.quantize([0.4, 1.6], 0), [0.4, 1.6])
+
+
+def test_failed_steps_without_totals():
+    out = timeseries.simulate(failing_model(), np.array([5e5, 1e6, 2e6]), heat_step=5e5)
+    assert list(out['failed']) == [2]
+    assert out['totals'] is None and out['record'] is None
+    assert np.isfinite(out['records']['E_boil'][:2]).all()
+
+
+def test_standby_steps():
+    out = timeseries.simulate(failing_model(), np.array([0, 1e5, 1e6]), heat_step=5e5, dt=10)
+    assert list(out['standby']) == [0, 1]
+    assert len(out['failed']) == 0
+    assert out['buckets'] == 2
+    assert out['record']['E_boil'] == pytest.approx(30)
+
+
+def test_simulate_steam_net():
+    model = steam_net('steam net')
+    model.init_model()
+    out = timeseries.simulate(model, np.array([0, 1e6, 1e6]), heat_step=5e5)
+    assert len(out['failed']) == 0
+    assert out['buckets'] == 2
+    # the standby step has network condensation and losses:
+    assert out['records']['Q_nw'][0] < 0
+    assert out['totals']['distributed steam'] > 0
+    assert out['record']['E_heat_sink'] == pytest.approx(2.5e6 * 3600)
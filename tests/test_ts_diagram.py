@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from utilitylca.models.steam_net import ts_diagram
+
+
+def test_plot_batch_keeps_backend(tmp_path, monkeypatch):
+    matplotlib = pytest.importorskip('matplotlib')
+    pytest.importorskip('fluprodia')
+    monkeypatch.setenv('UTILITYLCA_CACHE_DIR', str(tmp_path))
+    backend = matplotlib.get_backend()
+    matplotlib.use('svg')
+    try:
+        files = ts_diagram.plot_batch([{'Tamb': 10}, {'Tamb': 20}], str(tmp_path / 'Ts.png'), processes=1)
+        assert matplotlib.get_backend() == 'svg'
+    finally:
+        matplotlib.use(backend)
+    assert files == [str(tmp_path / 'Ts.png')] and os.path.getsize(files[0]) > 0
+
+
+def test_draw_agg(tmp_path, monkeypatch):
+    pytest.importorskip('fluprodia')
+    monkeypatch.setenv('UTILITYLCA_CACHE_DIR', str(tmp_path))
+    lines = {'pipe': {'s': [1000, 2000], 'T': [100, 200]}}
+    fig = ts_diagram.draw([lines], agg=True)
+    assert type(fig.canvas).__name__ == 'FigureCanvasAgg'
+    fig.savefig(tmp_path / 'Ts.png')
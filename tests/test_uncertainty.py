@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from utilitylca.models.steam_net import batch, uncertainty
+
+
+def test_sample_clip():
+    rng = np.random.default_rng(1)
+    scenarios = uncertainty.sample({'Tamb': ('normal', 25, 10), 'heat': ('uniform', 1e5, 1e6)}, 100, rng,
+                                   fixed={'mains': [4, 8]})
+    temperatures = np.array([params['Tamb'] for params in scenarios])
+    assert temperatures.min() >= 0 and temperatures.max() <= 30
+    assert all(params['mains'] == [4, 8] for params in scenarios)
+
+
+def test_first_batch_failed(monkeypatch):
+    calls = []
+
+    def run_batch(scenarios, **kwargs):
+        calls.append(len(scenarios))
+        n = len(scenarios)
+        if len(calls) == 1:
+            # all scenarios of the first batch failed, only the parameters and the flag are in the table:
+            return {'heat': np.array([params['heat'] for params in scenarios]), 'converged': np.zeros(n, dtype=bool)}
+        return {'heat': np.array([params['heat'] for params in scenarios]), 'converged': np.ones(n, dtype=bool),
+                'out': np.array([params['heat'] for params in scenarios]) * 1e-6}
+    monkeypatch.setattr(batch, 'run_batch', run_batch)
+
+    result = uncertainty.monte_carlo({'heat': ('uniform', 0.9e6, 1.1e6)}, outputs=['out'], rel_width=0.01,
+                                     batch_size=50, min_samples=100, seed=1)
+    assert calls[0] == 50
+    assert result['converged']
+    assert result['mean']['out'] == pytest.approx(1, rel=0.01)
+    assert np.isnan(result['table']['out'][:50]).all()
+
+
+def test_batch_result_columns():
+    table = batch._to_table([{'heat': 1e6}], [{'converged': False}])
+    for name in batch.RESULT_COLUMNS:
+        assert name in table
+    assert np.isnan(table['distributed steam'][0])
+    assert not table['trap'][0]